@@ -1,9 +1,11 @@
 import os
 import sys
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 import tempfile # Import tempfile for temporary file handling
 import json # Import json to handle structured_data_dict
+from concurrent.futures import ThreadPoolExecutor
 
 # Setup sys.path for imports (ensure PROJECT_ROOT is correctly added)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,9 +15,14 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 # Import necessary modules based on your architecture
-from Backend.utils.ocr_utils import extract_text_from_file
-from Backend.gemini.gemini_client import call_gemini_api # Corrected import name
+from Backend.utils.ocr_utils import extract_text_with_metadata, extract_text_from_bytes, ocr_settings
+from Backend.gemini.gemini_client import call_gemini_api, call_gemini_api_multi, gemini_extraction_version # Corrected import name
 from Backend.utils.model_utils import predict_from_text # Import the ML prediction helper
+from Backend.utils.report_cache import report_cache, file_sha256, disease_key, text_key, version_hash
+from Backend.utils.model_registry import model_registry
+from Backend.utils.report_jobs import report_jobs, validate_callback_url
+from Backend.utils.field_extractor import extract_fields, extractor_version, LOCAL_EXTRACTOR_ENABLED, LOCAL_EXTRACTOR_MIN_COVERAGE
+from Backend.gemini.response_cache import gemini_response_cache
 
 report_bp = Blueprint('report_ocr', __name__, url_prefix='/predict') # Added url_prefix for clarity
 
@@ -23,8 +30,353 @@ report_bp = Blueprint('report_ocr', __name__, url_prefix='/predict') # Added url
 UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, 'backend', 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True) # Ensure the upload directory exists
 
+# Upper bound on concurrent per-disease predictions for one multi-disease upload
+REPORT_PREDICTION_WORKERS = int(os.getenv('REPORT_PREDICTION_WORKERS', '4'))
+# Uploads up to this size are OCR'd straight from memory; larger ones are spooled to a temporary file
+UPLOAD_IN_MEMORY_MAX_BYTES = int(os.getenv('UPLOAD_IN_MEMORY_MAX_BYTES', str(25 * 1024 * 1024)))
+
+def _check_known(disease_ids):
+    unknown = [d for d in disease_ids if d not in model_registry.disease_ids]
+    if unknown:
+        raise ValueError(f"Unknown disease_ids: {', '.join(unknown)}. Valid values: {', '.join(model_registry.disease_ids)} or 'all'.")
+    return disease_ids
+
+
+def _parse_disease_ids(form):
+    """
+    Reads the diseases to screen for from the form data.
+    Returns (disease_ids, multi). multi is True when the caller used 'disease_ids' or 'all'
+    and expects a response keyed by disease. Raises ValueError on unknown disease ids.
+    """
+    raw_values = form.getlist('disease_ids')
+    if not raw_values:
+        disease_id = form.get('disease_id')
+        if not disease_id:
+            return [], False
+        if disease_id.strip().lower() != 'all':
+            # Original single-disease request
+            return _check_known([disease_id.strip()]), False
+        raw_values = ['all']
+
+    disease_ids = []
+    for raw in raw_values:
+        raw = raw.strip()
+        # Accept a JSON array ('["diabetes", "ckd"]'), a comma-separated list or repeated form fields
+        if raw.startswith('['):
+            try:
+                values = json.loads(raw)
+            except json.JSONDecodeError:
+                raise ValueError(f"Invalid disease_ids list: {raw}")
+        else:
+            values = raw.split(',')
+        for value in values:
+            value = str(value).strip()
+            if value.lower() == 'all':
+                disease_ids.extend(model_registry.disease_ids)
+            elif value:
+                disease_ids.append(value)
+
+    # Drop duplicates, keep the requested order
+    return _check_known(list(dict.fromkeys(disease_ids))), True
+
+
+# Cache key versions: every layer's key includes a hash of the settings and artifacts its value
+# depends on, including those of the layers it was built from, so an OCR_MODE change, a prompt edit
+# or a retrained model is never answered from an older entry.
+_TEXT_VERSION = version_hash(ocr_settings())
+
+
+def _structured_version(disease_id):
+    return version_hash(_TEXT_VERSION, gemini_extraction_version(disease_id))
+
+
+def _prediction_version(disease_id):
+    return version_hash(_structured_version(disease_id), extractor_version(disease_id), model_registry.version(disease_id))
+
+
+def _read_upload(file):
+    """
+    Hashes the upload in chunks. Returns (sha256, size, data): data holds the file bytes when
+    size <= UPLOAD_IN_MEMORY_MAX_BYTES, otherwise None and the file is left to be spooled to disk.
+    """
+    stream = file.stream
+    stream.seek(0)
+    report_sha = file_sha256(stream)
+    size = stream.tell()
+    data = None
+    if size <= UPLOAD_IN_MEMORY_MAX_BYTES:
+        stream.seek(0)
+        data = stream.read()
+    return report_sha, size, data
+
+
+def _extract_report_text(file, data, report_sha):
+    """
+    Step 1: OCR / PDF text extraction, cached by file hash.
+    Uploads held in memory (data is not None) are read with fitz.open(stream=...) / cv2.imdecode.
+    Only larger uploads are written to a temporary file, and only when OCR actually has to run.
+    Returns (text, extraction metadata with per-page method and timing).
+    """
+    cached = report_cache.get('text', text_key(report_sha, _TEXT_VERSION))
+    if isinstance(cached, dict):
+        print("♻️ Step 1: OCR text cache hit.")
+        return cached['text'], dict(cached['extraction'], cached=True)
+
+    if data is not None:
+        print("Step 1: Extracting text using OCR (in memory)...")
+        extracted_text, extraction = extract_text_from_bytes(data, file.filename)
+        print(f"OCR page methods: {[(page['page'], page['method'], page['seconds']) for page in extraction['pages']]}")
+        report_cache.set('text', text_key(report_sha, _TEXT_VERSION), {'text': extracted_text, 'extraction': extraction})
+        return extracted_text, dict(extraction, cached=False)
+
+    temp_filepath = None # Initialize to None for cleanup in finally block
+    try:
+        # Create a temporary file to save the uploaded content
+        # Use tempfile.NamedTemporaryFile to get a unique, safely handled file
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
+            file.stream.seek(0)
+            file.save(temp_file)
+            temp_filepath = temp_file.name # Store the actual path
+        print(f"File saved temporarily to: {temp_filepath}")
+
+        print("Step 1: Extracting text using OCR...")
+        # Pass the temporary file's path to the OCR utility
+        extracted_text, extraction = extract_text_with_metadata(temp_filepath)
+        print(f"OCR page methods: {[(page['page'], page['method'], page['seconds']) for page in extraction['pages']]}")
+        report_cache.set('text', text_key(report_sha, _TEXT_VERSION), {'text': extracted_text, 'extraction': extraction})
+        return extracted_text, dict(extraction, cached=False)
+    finally:
+        # Ensure the temporary file is cleaned up in all cases
+        if temp_filepath and os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+            print(f"Cleaned up temporary file: {temp_filepath}")
+
+
+def _extract_structured_data(extracted_text, report_sha, disease_ids):
+    """
+    Step 2: structured parameters per disease. For each disease, in order:
+      - the Gemini result cached for (file hash, disease_id),
+      - the local regex/dictionary extractor, when it finds at least LOCAL_EXTRACTOR_MIN_COVERAGE
+        of the disease's fields,
+      - Gemini; every disease still missing is extracted together in one call.
+    Returns ({disease_id: structured_data_dict}, {disease_id: source}), where source records the
+    path used: 'local', 'gemini', 'mock' (no API key), 'degraded' (Gemini unreachable) or 'error'.
+    """
+    structured = {}
+    sources = {}
+    missing = []
+    for disease_id in disease_ids:
+        cached = report_cache.get('gemini', disease_key(report_sha, disease_id, _structured_version(disease_id)))
+        if cached is not None:
+            print(f"♻️ Step 2: Gemini structured data cache hit for {disease_id}.")
+            structured[disease_id] = cached
+            sources[disease_id] = {"path": "gemini", "cached": True}
+            continue
+
+        local = extract_fields(extracted_text, disease_id) if LOCAL_EXTRACTOR_ENABLED else None
+        if local is not None and local['coverage'] >= LOCAL_EXTRACTOR_MIN_COVERAGE:
+            print(f"⚡ Step 2: Local extractor covered {local['coverage']:.0%} of {disease_id} fields, skipping Gemini.")
+            structured[disease_id] = local['data']
+            sources[disease_id] = {"path": "local", "coverage": local['coverage'], "missing": local['missing']}
+            continue
+
+        missing.append(disease_id)
+        sources[disease_id] = {"path": "gemini", "cached": False}
+        if local is not None:
+            sources[disease_id]["local_coverage"] = local['coverage']
+
+    if missing:
+        print(f"Step 2: Calling Gemini API for structuring data ({', '.join(missing)})...")
+        if len(missing) == 1:
+            fresh = {missing[0]: call_gemini_api(extracted_text, missing[0])}
+        else:
+            fresh = call_gemini_api_multi(extracted_text, missing)
+        for disease_id, structured_data_dict in fresh.items():
+            if 'error' in structured_data_dict:
+                sources[disease_id]["path"] = 'error'
+            elif structured_data_dict.get('degraded'):
+                sources[disease_id]["path"] = 'degraded'
+            elif not os.getenv("GEMINI_API_KEY"):
+                sources[disease_id]["path"] = 'mock'
+            else:
+                # Failed, degraded and mock responses are never cached, so they are retried next time
+                report_cache.set('gemini', disease_key(report_sha, disease_id, _structured_version(disease_id)),
+                                 structured_data_dict)
+        structured.update(fresh)
+
+    print(f"Gemini Structured Data (Python dict): {structured}")
+    return structured, sources
+
+
+def _predict_disease(report_sha, disease_id, structured_data_dict, source, page_extraction):
+    """
+    Step 3: ML prediction for one disease, cached per (file hash, disease_id, version) together with
+    the field source and page extraction details, so a later cache hit can report the same 'extraction'.
+    Only predictions made from real parameters (local extractor or Gemini) are cached.
+    """
+    prediction_result = predict_from_text(structured_data_dict, disease_id)
+    print(f"ML Prediction Result ({disease_id}): {prediction_result}")
+    if structured_data_dict.get('degraded'):
+        # Gemini was unreachable: the prediction ran on placeholder parameters, say so and don't cache it
+        prediction_result = dict(prediction_result or {}, degraded=True,
+                                 degraded_reason=structured_data_dict.get('degraded_reason'))
+    elif prediction_result and prediction_result.get('risk_level') != 'Error' and source['path'] in ('local', 'gemini'):
+        report_cache.set('prediction', disease_key(report_sha, disease_id, _prediction_version(disease_id)),
+                         {'result': prediction_result, 'fields': source, 'extraction': page_extraction})
+    return prediction_result
+
+
+def _analyze_report(file, disease_ids, on_stage=None):
+    """
+    Runs OCR once, one Gemini extraction for every disease that is not cached yet,
+    then the per-disease predictions concurrently.
+    on_stage(name), if given, is called as the pipeline enters each stage (async jobs).
+    Returns ({disease_id: prediction_result}, extraction metadata). The metadata has the same
+    keys whether or not the predictions came from the cache.
+    """
+    on_stage = on_stage or (lambda stage: None)
+
+    # Every cache layer is keyed by the SHA-256 of the file bytes, so re-uploads of the same report are free
+    on_stage('reading')
+    report_sha, size, data = _read_upload(file)
+    print(f"Report SHA-256: {report_sha} ({size} bytes, {'in memory' if data is not None else 'spooled to disk'})")
+
+    results = {}
+    fields = {}
+    page_extraction = None
+    pending = []
+    for disease_id in disease_ids:
+        cached = report_cache.get('prediction', disease_key(report_sha, disease_id, _prediction_version(disease_id)))
+        if isinstance(cached, dict) and 'result' in cached:
+            print(f"♻️ Prediction cache hit for {disease_id}: {cached['result']}")
+            results[disease_id] = cached['result']
+            fields[disease_id] = dict(cached['fields'], prediction_cached=True)
+            page_extraction = page_extraction or cached['extraction']
+        else:
+            pending.append(disease_id)
+    if not pending:
+        # Nothing was extracted for this request; report the pages as they were read the first time
+        extraction = dict(page_extraction, cached=True, prediction_cached=True,
+                          fields={disease_id: fields[disease_id] for disease_id in disease_ids})
+        return results, extraction
+
+    on_stage('ocr')
+    extracted_text, extraction = _extract_report_text(file, data, report_sha)
+    print(f"OCR Extracted Text (first 200 chars): {extracted_text[:200]}...")
+
+    on_stage('gemini')
+    structured, sources = _extract_structured_data(extracted_text, report_sha, pending)
+    page_extraction = {key: value for key, value in extraction.items() if key != 'cached'}
+
+    on_stage('prediction')
+    print(f"Step 3: Running ML prediction for {', '.join(pending)}...")
+    if len(pending) == 1:
+        results[pending[0]] = _predict_disease(report_sha, pending[0], structured[pending[0]], sources[pending[0]],
+                                               page_extraction)
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(REPORT_PREDICTION_WORKERS, len(pending)))) as pool:
+            futures = {d: pool.submit(_predict_disease, report_sha, d, structured[d], sources[d], page_extraction)
+                       for d in pending}
+            for disease_id, future in futures.items():
+                results[disease_id] = future.result()
+
+    # Record which path (local extractor, Gemini, cache) produced each disease's parameters
+    for disease_id in pending:
+        fields[disease_id] = dict(sources[disease_id], prediction_cached=False)
+    extraction = dict(extraction, prediction_cached=False,
+                      fields={disease_id: fields[disease_id] for disease_id in disease_ids})
+
+    # Keep the response in the requested order
+    return {disease_id: results[disease_id] for disease_id in disease_ids}, extraction
+
+
+def _is_valid_prediction(prediction_result):
+    return bool(prediction_result) and 'risk_level' in prediction_result and 'reason' in prediction_result
+
+
+def _run_analysis(file, disease_ids, multi, on_stage=None):
+    """
+    Runs the full pipeline and builds the upload response. Returns (body, http_status).
+    Shared by the synchronous upload and the async job workers.
+    """
+    try:
+        results, extraction = _analyze_report(file, disease_ids, on_stage)
+
+        if multi:
+            response = {"results": results, "extraction": extraction}
+            print(f"Backend returning JSON: {json.dumps(response, indent=2)}")
+            return response, 200
+
+        prediction_result = results[disease_ids[0]]
+        # Directly return the prediction_result, which should contain 'risk_level' and 'reason'
+        if _is_valid_prediction(prediction_result):
+            response = dict(prediction_result, extraction=extraction)
+            print(f"Backend returning JSON: {json.dumps(response, indent=2)}")
+            return response, 200 # Return the expected format
+        else:
+            print("Error: Final prediction result from model_utils.py was malformed (missing risk_level or reason).")
+            return {
+                'error': 'Final prediction result from AI was malformed (missing risk_level or reason).',
+                'risk_level': 'Error',
+                'reason': 'AI model did not return a valid prediction format.'
+            }, 500
+
+    except ValueError as ve:
+        # Handle specific data/file processing errors
+        print(f"ValueError during processing: {ve}")
+        return {
+            'error': str(ve),
+            'risk_level': 'Error',
+            'reason': f'File processing error: {str(ve)}'
+        }, 400
+    except Exception as e:
+        # Catch any other unexpected errors during processing
+        print(f"🔥 Unhandled Exception during report upload and prediction: {e}")
+        return {
+            "error": f"Internal server error during report analysis: {str(e)}",
+            "risk_level": "Error",
+            "reason": "An internal server error occurred during report analysis. Please check backend logs for details."
+        }, 500
+
+
+def _wants_async():
+    value = request.args.get('async', request.form.get('async', ''))
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+
+def _detach_upload(file):
+    """
+    Copies the upload out of the request so a background job can read it after the response.
+    Small files stay in memory; larger ones roll over to a temporary file.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_IN_MEMORY_MAX_BYTES)
+    file.stream.seek(0)
+    while True:
+        chunk = file.stream.read(1024 * 1024)
+        if not chunk:
+            break
+        spooled.write(chunk)
+    spooled.seek(0)
+    return FileStorage(stream=spooled, filename=file.filename, content_type=file.content_type)
+
+
 @report_bp.route('/upload', methods=['POST'])
 def upload_report_and_predict():
+    """
+    Analyzes an uploaded report (PDF or image).
+    Form fields: 'file', plus either 'disease_id' (one disease; responds with
+    {risk_level, reason}) or 'disease_ids' (a comma-separated list, JSON array or 'all';
+    responds with {"results": {disease_id: {risk_level, reason}}}).
+    Both responses carry an 'extraction' object describing how each page was read
+    ('text' layer or 'ocr') and how long it took, and in 'fields' which path produced each
+    disease's parameters ('local' extractor, 'gemini', 'mock', 'degraded' or 'error'). Results
+    served from the prediction cache carry the same 'extraction', with prediction_cached set.
+
+    With async=1 (query string or form field) the analysis runs in the background: the
+    response is 202 with a job id, progress is polled at GET /predict/jobs/<job_id>, and an
+    optional 'callback_url' form field receives the finished job as a JSON POST (public hosts
+    only, unless REPORT_JOB_CALLBACK_HOSTS lists the allowed hosts).
+    """
     print("--- Entered upload_report_and_predict function ---")
     print("🔁 Request received.")
     print("📁 request.files:", request.files)
@@ -39,7 +391,6 @@ def upload_report_and_predict():
         }), 400
 
     file = request.files['file']
-    disease_id = request.form.get('disease_id') # Extract disease_id from form data
 
     print("✅ File received:", file.filename)
 
@@ -51,7 +402,17 @@ def upload_report_and_predict():
             "reason": "No file selected for upload."
         }), 400
 
-    if not disease_id:
+    try:
+        disease_ids, multi = _parse_disease_ids(request.form)
+    except ValueError as ve:
+        print(f"Error: {ve}")
+        return jsonify({
+            "error": str(ve),
+            "risk_level": "Error",
+            "reason": "One or more requested disease types are not supported."
+        }), 400
+
+    if not disease_ids:
         print("Error: 'disease_id' not provided in form data.")
         return jsonify({
             "error": "Disease ID not provided.",
@@ -59,63 +420,56 @@ def upload_report_and_predict():
             "reason": "Disease type not specified for report analysis."
         }), 400
 
-    temp_filepath = None # Initialize to None for cleanup in finally block
-    try:
-        # Create a temporary file to save the uploaded content
-        # Use tempfile.NamedTemporaryFile to get a unique, safely handled file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            file.save(temp_file.name)
-            temp_filepath = temp_file.name # Store the actual path
-        print(f"File saved temporarily to: {temp_filepath}")
+    if _wants_async():
+        callback_url = request.form.get('callback_url') or None
+        if callback_url:
+            try:
+                validate_callback_url(callback_url)
+            except ValueError as ve:
+                return jsonify({"error": str(ve)}), 400
 
-        # Step 1: Extract raw text using OCR
-        print("Step 1: Extracting text using OCR...")
-        # Pass the temporary file's path to the OCR utility
-        extracted_text = extract_text_from_file(temp_filepath, disease_id) 
-        print(f"OCR Extracted Text (first 200 chars): {extracted_text[:200]}...")
+        job_file = _detach_upload(file)
 
-        # Step 2: Pass to Gemini to get structured data (Python dictionary)
-        print("Step 2: Calling Gemini API for structuring data...")
-        structured_data_dict = call_gemini_api(extracted_text, disease_id)
-        print(f"Gemini Structured Data (Python dict): {structured_data_dict}")
+        def run_job(on_stage):
+            try:
+                return _run_analysis(job_file, disease_ids, multi, on_stage)
+            finally:
+                job_file.close()
 
-        # Step 3: Run prediction on structured data
-        print("Step 3: Running ML prediction...")
-        prediction_result = predict_from_text(structured_data_dict, disease_id)
-        print(f"ML Prediction Result: {prediction_result}")
+        job_id = report_jobs.submit(
+            run_job,
+            disease_ids=disease_ids,
+            callback_url=callback_url,
+        )
+        print(f"📨 Report analysis queued as job {job_id}")
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": url_for('report_ocr.get_report_job', job_id=job_id),
+        }), 202
 
-        # Directly return the prediction_result, which should contain 'risk_level' and 'reason'
-        if prediction_result and 'risk_level' in prediction_result and 'reason' in prediction_result:
-            # --- ADDED THIS PRINT STATEMENT ---
-            print(f"Backend returning JSON: {json.dumps(prediction_result, indent=2)}")
-            # --- END ADDITION ---
-            return jsonify(prediction_result), 200 # Return the expected format
-        else:
-            print("Error: Final prediction result from model_utils.py was malformed (missing risk_level or reason).")
-            return jsonify({
-                'error': 'Final prediction result from AI was malformed (missing risk_level or reason).',
-                'risk_level': 'Error',
-                'reason': 'AI model did not return a valid prediction format.'
-            }), 500
+    body, http_status = _run_analysis(file, disease_ids, multi)
+    return jsonify(body), http_status
 
-    except ValueError as ve:
-        # Handle specific data/file processing errors
-        print(f"ValueError during processing: {ve}")
-        return jsonify({
-            'error': str(ve),
-            'risk_level': 'Error',
-            'reason': f'File processing error: {str(ve)}'
-        }), 400
-    except Exception as e:
-        # Catch any other unexpected errors during processing
-        print(f"🔥 Unhandled Exception during report upload and prediction: {e}", exc_info=True)
-        return jsonify({
-            "error": f"Internal server error during report analysis: {str(e)}",
-            "risk_level": "Error",
-            "reason": "An internal server error occurred during report analysis. Please check backend logs for details."
-        }), 500
-    finally:
-        # Ensure the temporary file is cleaned up in all cases
-        if temp_filepath and os.path.exists(temp_filepath):
-            os.remove(temp_filepath)
-            print(f"Cleaned up temporary file: {temp_filepath}")
\ No newline at end of file
+
+@report_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """
+    Status of an async report analysis: status (queued/running/succeeded/failed), the current
+    stage with per-stage timings, and the upload response in 'result' once finished.
+    """
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found or expired."}), 404
+    return jsonify(job), 200
+
+
+@report_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """
+    Hit/miss counters of this worker process for the report cache layers and the Gemini response cache.
+    """
+    return jsonify({
+        "report_cache": report_cache.stats(),
+        "gemini_response_cache": gemini_response_cache.stats(),
+    }), 200
@@ -15,14 +15,10 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..'))
 sys.path.insert(0, PROJECT_ROOT) # Add project root to sys.path for module imports
 
 
-# --- ML Model Inference Imports ---
-# Make sure this path is correct relative to PROJECT_ROOT
-try:
-    from ml_model.inference.image_predict import predict_disease_from_image
-    print("✅ Successfully imported predict_disease_from_image.")
-except ImportError as e:
-    print(f"❌ Error importing predict_disease_from_image: {e}")
-    print("Ensure 'ml_model/inference/image_predict.py' exists and is correctly configured.")
+# --- ML Model Inference ---
+# The image backend (ml_model.inference.image_predict with torch, or onnx_predict with
+# onnxruntime when CV_BACKEND=onnx) is imported lazily by cv_routes and utils/model_warmup.py,
+# so a cold start only binds routes.
 
 # === Route Blueprints ===
 # Import your data blueprint (assuming it's in the same directory as app.py)
@@ -39,6 +35,7 @@ from .tabular_routes.liver_disease import liver_bp
 from .tabular_routes.thyroid import thyroid_bp
 from .Routes.report_ocr_route import report_bp # Note: inconsistent capitalization here, usually 'routes'
 from .tabular_routes.cancer import cancer_bp
+from .utils.model_warmup import MODEL_WARMUP, start_background_warmup, preload_models, readiness_report
 
 def create_app():
     """
@@ -49,6 +46,18 @@ def create_app():
     # Enable CORS for all routes and origins, allowing frontend to connect
     CORS(app, resources={r"/*": {"origins": "*"}})
 
+    # === Model Warm-up ===
+    # Tabular and CV models load on first use. Unless MODEL_WARMUP=lazy, a background
+    # thread also loads them right away so early requests rarely wait. /ready reports progress.
+    # MODEL_WARMUP=preload is for pre-forking servers:
+    #   MODEL_WARMUP=preload gunicorn --preload -w 4 "Backend.app:create_app()"
+    # The master maps the forest node tables (shared by all workers through the page cache);
+    # each worker loads the remaining models, including the CV model, after fork.
+    if MODEL_WARMUP == 'preload':
+        preload_models()
+    elif MODEL_WARMUP != 'lazy':
+        start_background_warmup()
+
     # === Text Chatbot Setup ===
     # Define paths to chatbot model files relative to PROJECT_ROOT
     TEXT_MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'model.pkl')
@@ -122,6 +131,14 @@ def create_app():
         """
         return "Medi-Link Backend Server is Running! 🚀"
 
+    @app.route('/ready')
+    def ready():
+        """
+        Readiness probe. Reports which models are loaded; returns 503 until warm-up finishes.
+        """
+        report = readiness_report()
+        return jsonify(report), 200 if report['ready'] else 503
+
     # === Register All Blueprints ===
     # Each blueprint registration now includes a url_prefix for better API organization.
     # Frontend fetch calls must match these prefixes.
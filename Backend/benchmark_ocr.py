@@ -0,0 +1,87 @@
+import os
+import re
+import sys
+import time
+import difflib
+import fitz  # PyMuPDF
+
+# Benchmark: fixed 300-DPI full-page OCR vs adaptive ROI OCR (OCR_MODE=adaptive).
+#
+# Sample reports with a digital text layer are rasterized into image-only "scanned" pages,
+# so the original text layer serves as ground truth for character accuracy.
+# Run from the project root (Tesseract must be installed):
+#   python Backend/benchmark_ocr.py [report.pdf ...]
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Backend.utils import ocr_utils
+
+# Resolution the "scanned" copies are rasterized at
+SCAN_DPI = 200
+DEFAULT_REPORTS = [
+    os.path.join(PROJECT_ROOT, 'Backend', 'sample_report.pdf'),
+    os.path.join(PROJECT_ROOT, 'Backend', 'uploads', '1746624948628-971390113.pdf'),
+]
+
+
+def normalize(text):
+    # Drop the page markers and collapse whitespace so only recognized characters are compared
+    text = re.sub(r'--- End of Page \d+ ---', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def char_accuracy(truth, text):
+    truth, text = normalize(truth), normalize(text)
+    if not truth:
+        return 1.0 if not text else 0.0
+    return difflib.SequenceMatcher(None, truth, text, autojunk=False).ratio()
+
+
+def scanned_copy(doc):
+    """
+    Image-only copy of doc: every page replaced by its raster at SCAN_DPI.
+    """
+    scanned = fitz.open()
+    for page in doc:
+        pix = page.get_pixmap(dpi=SCAN_DPI)
+        new_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(new_page.rect, pixmap=pix)
+    return scanned
+
+
+def run(report_path):
+    with fitz.open(report_path) as doc:
+        truths = [page.get_text() for page in doc]
+        if not any(t.strip() for t in truths):
+            print(f"⚠️ Skipping {report_path}: no text layer to use as ground truth.")
+            return None
+        scanned = scanned_copy(doc)
+
+    totals = {}
+    for mode in ('fixed', 'adaptive'):
+        seconds, accuracies = 0.0, []
+        for page_num, page in enumerate(scanned):
+            start = time.perf_counter()
+            text, _ = ocr_utils._ocr_page(page, ocr_utils.OCR_DPI, mode)
+            seconds += time.perf_counter() - start
+            accuracies.append(char_accuracy(truths[page_num], text))
+        totals[mode] = (seconds, sum(accuracies) / len(accuracies))
+    scanned.close()
+
+    name = os.path.basename(report_path)
+    for mode, (seconds, accuracy) in totals.items():
+        print(f"{name:40s} {mode:9s} {len(truths):3d} pages  {seconds:7.2f}s  "
+              f"{seconds / len(truths):6.2f}s/page  accuracy {accuracy:.3f}")
+    speedup = totals['fixed'][0] / max(totals['adaptive'][0], 1e-9)
+    print(f"{'':40s} adaptive speedup x{speedup:.2f}, accuracy Δ {totals['adaptive'][1] - totals['fixed'][1]:+.3f}\n")
+    return totals
+
+
+if __name__ == '__main__':
+    reports = sys.argv[1:] or DEFAULT_REPORTS
+    print(f"📊 OCR benchmark: fixed {ocr_utils.OCR_DPI} DPI vs adaptive "
+          f"(detect {ocr_utils.OCR_DETECT_DPI} DPI, ROI at {ocr_utils.OCR_DPI} DPI)\n")
+    for report in reports:
+        run(report)
@@ -7,11 +7,20 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-# Import the image prediction function from your ML model
-from ml_model.inference.image_predict import predict_disease_from_image
-
 cv_bp = Blueprint('cv_bp', __name__)
 
+# Limits for /predict-image/batch (all images of a visit go through one forward pass)
+CV_BATCH_MAX_IMAGES = int(os.getenv('CV_BATCH_MAX_IMAGES', '16'))
+CV_DEFAULT_TOP_K = int(os.getenv('CV_DEFAULT_TOP_K', '5'))
+
+def _image_predict():
+    """
+    Imports the image prediction backend (CV_BACKEND: torch or onnx) on first use, so binding
+    the routes does not pull in torch/onnxruntime or load the CV model.
+    """
+    from ml_model.inference.cv_backend import load_backend
+    return load_backend()
+
 @cv_bp.route('/predict-image', methods=['POST'])
 def predict_image_api():
     """
@@ -28,9 +37,13 @@ def predict_image_api():
 
     try:
         image_bytes = file.read()  # Read image content into bytes
-        prediction = predict_disease_from_image(image_bytes)
+        prediction = _image_predict().predict_disease_from_image(image_bytes)
         return jsonify({"prediction": prediction}), 200
 
+    except ImportError as ie:
+        # torch/torchvision (or onnxruntime) not available in this environment
+        return jsonify({"error": f"CV model dependencies not available: {str(ie)}"}), 503
+
     except RuntimeError as re:
         # Model loading errors
         return jsonify({"error": str(re)}), 503
@@ -42,3 +55,54 @@ def predict_image_api():
     except Exception as e:
         # Catch-all for unexpected errors
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@cv_bp.route('/predict-image/batch', methods=['POST'])
+def predict_image_batch_api():
+    """
+    API endpoint for several images in one request (e.g. all photos of a visit).
+    Expects one or more file uploads under 'images' (or 'image'). Optional form/query fields:
+    top_k (default CV_DEFAULT_TOP_K) and aggregate=1 for a combined per-visit ranking.
+    """
+    files = [f for f in request.files.getlist('images') + request.files.getlist('image') if f.filename]
+    if not files:
+        return jsonify({"error": "No image files provided"}), 400
+    if len(files) > CV_BATCH_MAX_IMAGES:
+        return jsonify({"error": f"Too many images: {len(files)} (max {CV_BATCH_MAX_IMAGES})"}), 413
+
+    try:
+        top_k = int(request.values.get('top_k', CV_DEFAULT_TOP_K))
+        if top_k < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "top_k must be a positive integer"}), 400
+    aggregate = request.values.get('aggregate', '0').strip().lower() in ('1', 'true', 'yes')
+
+    try:
+        images = [(f.filename, f.read()) for f in files]
+        result = _image_predict().predict_top_k_from_images(images, k=top_k, aggregate=aggregate)
+        if not result["decoded"]:
+            return jsonify(dict(result, error="None of the images could be decoded")), 400
+        return jsonify(result), 200
+
+    except ImportError as ie:
+        return jsonify({"error": f"CV model dependencies not available: {str(ie)}"}), 503
+
+    except RuntimeError as re:
+        return jsonify({"error": str(re)}), 503
+
+    except ValueError as ve:
+        return jsonify({"error": f"Invalid image or prediction error: {str(ve)}"}), 400
+
+    except Exception as e:
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@cv_bp.route('/predict-image/stats', methods=['GET'])
+def predict_image_stats_api():
+    """
+    Micro-batching metrics for /predict-image: queue depth, batch size histogram,
+    mean queue wait and forward-pass time.
+    """
+    try:
+        return jsonify(_image_predict().batching_stats()), 200
+    except ImportError as ie:
+        return jsonify({"error": f"CV model dependencies not available: {str(ie)}"}), 503
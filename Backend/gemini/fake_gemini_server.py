@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Gemini REST API (generateContent only), for tests and offline development.
+# Point the shared client at it with:
+#   GEMINI_API_ENDPOINT=http://127.0.0.1:8765 GEMINI_API_KEY=fake python ...
+# Run standalone: python Backend/gemini/fake_gemini_server.py [port]
+#
+# Responses are built from the request's responseSchema (numbers -> 0, enums -> first value),
+# or the text set with set_response(). fail_next() and delay script outages and slow responses.
+
+
+# The REST transport sends enums as integers ($alt=json;enum-encoding=int)
+_SCHEMA_TYPES = {1: 'STRING', 2: 'NUMBER', 3: 'INTEGER', 4: 'BOOLEAN', 5: 'ARRAY', 6: 'OBJECT'}
+
+
+def _value_for_schema(schema):
+    schema_type = schema.get('type', 'STRING')
+    schema_type = _SCHEMA_TYPES.get(schema_type, 'STRING') if isinstance(schema_type, int) else str(schema_type).upper()
+    if schema.get('enum'):
+        return schema['enum'][0]
+    if schema_type == 'OBJECT':
+        return {name: _value_for_schema(prop) for name, prop in schema.get('properties', {}).items()}
+    if schema_type == 'ARRAY':
+        return []
+    if schema_type in ('NUMBER', 'INTEGER'):
+        return 0
+    if schema_type == 'BOOLEAN':
+        return False
+    return ""
+
+
+class FakeGeminiServer:
+    """
+    Threaded HTTP server answering POST /v1beta/models/<model>:generateContent.
+    Usable as a context manager; `url` is the value for GEMINI_API_ENDPOINT.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.requests = []
+        self.delay = 0.0
+        self._failures = []
+        self._response_text = None
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fail_next(self, status=503, times=1):
+        """
+        The next `times` requests get an HTTP `status` error (e.g. 429 or 503).
+        """
+        with self._lock:
+            self._failures.extend([status] * times)
+
+    def set_response(self, text):
+        """
+        Fixed response text for every request; None goes back to schema-generated JSON.
+        """
+        self._response_text = text
+
+    def reset(self):
+        with self._lock:
+            self._failures.clear()
+            self.requests.clear()
+        self.delay = 0.0
+        self._response_text = None
+
+    def _next_failure(self):
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client timed out and hung up (deadline tests)
+                    pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server._lock:
+                    server.requests.append({"path": self.path, "body": body, "time": time.time()})
+                if server.delay:
+                    time.sleep(server.delay)
+
+                if not self.path.split('?')[0].endswith(':generateContent'):
+                    return self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                status = server._next_failure()
+                if status is not None:
+                    return self._send_json(status, {"error": {"code": status, "message": f"Fake error {status}",
+                                                              "status": "UNAVAILABLE"}})
+
+                text = server._response_text
+                if text is None:
+                    schema = body.get('generationConfig', {}).get('responseSchema')
+                    text = json.dumps(_value_for_schema(schema)) if schema else json.dumps({"text": "ok"})
+                self._send_json(200, {
+                    "candidates": [{
+                        "content": {"parts": [{"text": text}], "role": "model"},
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }],
+                })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else int(os.getenv('FAKE_GEMINI_PORT', '8765'))
+    server = FakeGeminiServer(port=port)
+    print(f"🧪 Fake Gemini server listening on {server.url} (set GEMINI_API_ENDPOINT to this URL)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,7 +1,12 @@
 import os
 import json
-import google.generativeai as genai
-import numpy as np # Import numpy for potential NaN or inf handling in mock response
+from functools import lru_cache
+
+from Backend.gemini.shared_client import gemini_client, GeminiUnavailable, GEMINI_MODEL_NAME
+from Backend.gemini.response_cache import gemini_response_cache, schema_version
+from Backend.gemini.text_compaction import (compact_report_text, GEMINI_COMPACTION_ENABLED, GEMINI_TEXT_TOKEN_BUDGET,
+                                            GEMINI_COMPACTION_MIN_TOKENS, GEMINI_COMPACTION_CONTEXT_LINES)
+from Backend.utils.feature_specs import FEATURE_SPECS, get_spec, merged_schema
 
 # --- IMPORTANT: Configure your Gemini API Key ---
 # It's highly recommended to set this as an environment variable:
@@ -11,6 +16,74 @@ import numpy as np # Import numpy for potential NaN or inf handling in mock resp
 # Or you can set it directly here for testing, but AVOID in production:
 # os.environ["GEMINI_API_KEY"] = "YOUR_API_KEY_HERE" # <-- Replace with actual key or rely on env var
 
+# Prompt templates; {subject} is the disease_id (or the list of them for 'multi').
+# Each is filled in and split around the report text once per subject, so a request only
+# concatenates three strings.
+_PROMPT_TEMPLATES = {
+    'generic': """
+            You are a medical report analysis assistant. From the following medical report text,
+            extract the relevant numerical and categorical parameters for {subject} and
+            return them as a JSON object. If a parameter is not explicitly found, use a
+            sensible default (e.g., 0, -1, or null, depending on the parameter).
+
+            **Report Text:**
+            \"\"\"{report_text}\"\"\"
+
+            Please provide ONLY the JSON object.
+            """,
+    'schema': """
+            You are a medical report analysis assistant. From the following medical report text,
+            extract the relevant numerical and categorical parameters for {subject} and
+            return them as a JSON object. Ensure the output strictly adheres to the provided JSON schema.
+            If a parameter is not explicitly found or is not applicable, use a sensible default (e.g., null, 0, or -1, depending on the parameter type).
+            For categorical fields, ensure the value is one of the allowed enum values.
+
+            **Report Text:**
+            \"\"\"{report_text}\"\"\"
+            """,
+    'multi': """
+        You are a medical report analysis assistant. From the following medical report text,
+        extract the relevant numerical and categorical parameters for each of these conditions:
+        {subject}.
+        Return one JSON object with one nested object per condition, keyed by the condition name.
+        Ensure the output strictly adheres to the provided JSON schema.
+        If a parameter is not explicitly found or is not applicable, use a sensible default (e.g., null, 0, or -1, depending on the parameter type).
+        For categorical fields, ensure the value is one of the allowed enum values.
+
+        **Report Text:**
+        \"\"\"{report_text}\"\"\"
+        """,
+}
+
+
+@lru_cache(maxsize=None)
+def _prompt_parts(kind, subject):
+    head, tail = _PROMPT_TEMPLATES[kind].format(subject=subject, report_text='\x00').split('\x00')
+    return head, tail
+
+
+def _build_prompt(kind, subject, report_text):
+    head, tail = _prompt_parts(kind, subject)
+    return head + report_text + tail
+
+
+@lru_cache(maxsize=None)
+def gemini_extraction_version(disease_id):
+    """
+    Everything besides the report text that shapes a Gemini extraction for disease_id: model,
+    prompt templates, response schema and text compaction settings. The report cache keys stored
+    extractions (and the predictions made from them) with it.
+    """
+    schema = _get_gemini_response_schema(disease_id)
+    return {
+        "model": GEMINI_MODEL_NAME,
+        "prompts": _PROMPT_TEMPLATES,
+        "schema": schema_version(schema) if schema else None,
+        "compaction": [GEMINI_COMPACTION_ENABLED, GEMINI_TEXT_TOKEN_BUDGET, GEMINI_COMPACTION_MIN_TOKENS,
+                       GEMINI_COMPACTION_CONTEXT_LINES],
+    }
+
+
 def call_gemini_api(extracted_text, disease_id):
     """
     Calls the Gemini API to extract structured information from raw text
@@ -26,70 +99,47 @@ def call_gemini_api(extracted_text, disease_id):
         # Fallback to mock if API key is not found
         return _get_mock_gemini_response(extracted_text, disease_id)
 
+    # Precompiled schema for Gemini's output, generated from the same feature spec that
+    # model_utils.py's convert_to_features uses, so it always matches what the ML models expect.
+    response_schema = _get_gemini_response_schema(disease_id)
+    # Diseases without a spec get JSON output without a schema ({}); the cache get and set use the same key
+    generic = not response_schema
+    if generic:
+        response_schema = {}
+    # Same (normalized) text, disease, model and schema version as an earlier call: reuse its result
+    cached = gemini_response_cache.get(extracted_text, disease_id, GEMINI_MODEL_NAME, response_schema)
+    if cached is not None:
+        print(f"♻️ Gemini response cache hit for {disease_id}.")
+        return cached
+
+    # Only the report lines relevant to this disease, within the prompt token budget
+    report_text, compaction = compact_report_text(extracted_text, [disease_id])
+    print(f"Report text compacted for Gemini: {compaction}")
+
+    gemini_raw_text = None
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash') # Using a faster model for text generation
-
-        # Define the expected schema for Gemini's output based on disease_id
-        # This is a critical part: the schema MUST match what your ML models expect
-        # in model_utils.py's convert_to_features function.
-        response_schema = _get_gemini_response_schema(disease_id)
-        if not response_schema:
+        if generic:
             print(f"Warning: No specific schema defined for disease_id '{disease_id}'. Using generic prompt.")
             # Fallback to generic prompt if no specific schema
-            prompt_text = f"""
-            You are a medical report analysis assistant. From the following medical report text,
-            extract the relevant numerical and categorical parameters for {disease_id} and
-            return them as a JSON object. If a parameter is not explicitly found, use a
-            sensible default (e.g., 0, -1, or null, depending on the parameter).
-
-            **Report Text:**
-            \"\"\"{extracted_text}\"\"\"
-
-            Please provide ONLY the JSON object.
-            """
-            generation_config = {
-                "response_mime_type": "application/json",
-            }
+            prompt_text = _build_prompt('generic', disease_id, report_text)
         else:
-            prompt_text = f"""
-            You are a medical report analysis assistant. From the following medical report text,
-            extract the relevant numerical and categorical parameters for {disease_id} and
-            return them as a JSON object. Ensure the output strictly adheres to the provided JSON schema.
-            If a parameter is not explicitly found or is not applicable, use a sensible default (e.g., null, 0, or -1, depending on the parameter type).
-            For categorical fields, ensure the value is one of the allowed enum values.
+            prompt_text = _build_prompt('schema', disease_id, report_text)
 
-            **Report Text:**
-            \"\"\"{extracted_text}\"\"\"
-            """
-            generation_config = {
-                "response_mime_type": "application/json",
-                "response_schema": response_schema
-            }
-
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt_text}
-                    ]
-                }
-            ],
-            "generationConfig": generation_config
-        }
-
-        # Make the API call
-        response = model.generate_content(payload["contents"], generation_config=payload["generationConfig"])
-        
+        # Shared client: cached model per schema, deadline, retries with backoff and a circuit breaker
         # Extract the text part of the response, which should be a JSON string
-        gemini_raw_text = response.text
+        gemini_raw_text = gemini_client.generate(prompt_text, response_schema)
         print(f"Gemini Raw Response Text: {gemini_raw_text}")
 
         # Parse the JSON string into a Python dictionary
         structured_data_dict = json.loads(gemini_raw_text)
         print(f"Gemini Parsed Structured Data: {structured_data_dict}")
+        if isinstance(structured_data_dict, dict):
+            gemini_response_cache.set(extracted_text, disease_id, GEMINI_MODEL_NAME, response_schema, structured_data_dict)
         return structured_data_dict
 
+    except GeminiUnavailable as e:
+        print(f"⚠️ Gemini unavailable, returning degraded response: {e}")
+        return _get_degraded_gemini_response(extracted_text, disease_id, str(e))
     except json.JSONDecodeError as e:
         print(f"❌ Gemini API returned invalid JSON: {gemini_raw_text} - Error: {e}")
         # Fallback to mock or return an error structure
@@ -100,7 +150,7 @@ def call_gemini_api(extracted_text, disease_id):
             "reason": "AI analysis failed due to malformed data from Gemini. Please try again or provide a clearer report."
         }
     except Exception as e:
-        print(f"❌ Exception calling Gemini API: {str(e)}", exc_info=True)
+        print(f"❌ Exception calling Gemini API: {str(e)}")
         # Fallback to mock or return an error structure
         return {
             "disease": disease_id,
@@ -110,333 +160,127 @@ def call_gemini_api(extracted_text, disease_id):
         }
 
 
+def call_gemini_api_multi(extracted_text, disease_ids):
+    """
+    Extracts the structured parameters for several diseases from one report in a single
+    Gemini call, using the merged schema from _get_merged_gemini_response_schema.
+
+    Returns a dictionary keyed by disease_id, each value shaped like call_gemini_api's result.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ Gemini API key is not set in environment variables. Using mock response.")
+        return {disease_id: _get_mock_gemini_response(extracted_text, disease_id) for disease_id in disease_ids}
+
+    # Entries are per disease, shared with call_gemini_api; only the uncached diseases go to Gemini
+    structured = {}
+    for disease_id in disease_ids:
+        cached = gemini_response_cache.get(extracted_text, disease_id, GEMINI_MODEL_NAME,
+                                           _get_gemini_response_schema(disease_id))
+        if cached is not None:
+            print(f"♻️ Gemini response cache hit for {disease_id}.")
+            structured[disease_id] = cached
+    missing = [disease_id for disease_id in disease_ids if disease_id not in structured]
+    if missing:
+        structured.update(_call_gemini_api_multi(extracted_text, missing))
+    return {disease_id: structured[disease_id] for disease_id in disease_ids}
+
+
+def _call_gemini_api_multi(extracted_text, disease_ids):
+    report_text, compaction = compact_report_text(extracted_text, disease_ids)
+    print(f"Report text compacted for Gemini: {compaction}")
+
+    gemini_raw_text = None
+    try:
+        response_schema = _get_merged_gemini_response_schema(disease_ids)
+        prompt_text = _build_prompt('multi', ", ".join(disease_ids), report_text)
+
+        gemini_raw_text = gemini_client.generate(prompt_text, response_schema)
+        print(f"Gemini Raw Multi-Disease Response Text: {gemini_raw_text}")
+
+        merged_data = json.loads(gemini_raw_text)
+        structured = {}
+        for disease_id in disease_ids:
+            disease_data = merged_data.get(disease_id)
+            if not isinstance(disease_data, dict):
+                disease_data = {
+                    "disease": disease_id,
+                    "error": f"Gemini response did not include parameters for {disease_id}.",
+                    "risk_level": "Error",
+                    "reason": "AI analysis did not return data for this condition. Please try again."
+                }
+            else:
+                gemini_response_cache.set(extracted_text, disease_id, GEMINI_MODEL_NAME,
+                                          _get_gemini_response_schema(disease_id), disease_data)
+            structured[disease_id] = disease_data
+        print(f"Gemini Parsed Multi-Disease Structured Data: {structured}")
+        return structured
+
+    except GeminiUnavailable as e:
+        print(f"⚠️ Gemini unavailable, returning degraded responses: {e}")
+        return {disease_id: _get_degraded_gemini_response(extracted_text, disease_id, str(e)) for disease_id in disease_ids}
+    except json.JSONDecodeError as e:
+        print(f"❌ Gemini API returned invalid JSON: {gemini_raw_text} - Error: {e}")
+        return {disease_id: {
+            "disease": disease_id,
+            "error": "Gemini returned invalid JSON. Check Gemini's output format.",
+            "risk_level": "Error",
+            "reason": "AI analysis failed due to malformed data from Gemini. Please try again or provide a clearer report."
+        } for disease_id in disease_ids}
+    except Exception as e:
+        print(f"❌ Exception calling Gemini API: {str(e)}")
+        return {disease_id: {
+            "disease": disease_id,
+            "error": f"Gemini API call failed: {str(e)}",
+            "risk_level": "Error",
+            "reason": "AI analysis failed due to an issue with the Gemini API. Please check your API key and network."
+        } for disease_id in disease_ids}
+
+
+def _get_merged_gemini_response_schema(disease_ids):
+    """
+    Combines the per-disease schemas into one object with a nested object per disease_id.
+    Precompiled once per combination of diseases (see Backend/utils/feature_specs.py).
+    """
+    return merged_schema(tuple(disease_ids))
+
+
 def _get_gemini_response_schema(disease_id):
     """
-    Returns a JSON schema for Gemini's response based on the disease_id.
-    This helps guide Gemini to return structured data.
-    IMPORTANT: Align these schemas with the features expected by your ML models
-    in backend/utils/model_utils.py -> convert_to_features.
+    Returns the precompiled, read-only JSON schema for Gemini's response for disease_id, or None.
+    The schema, the mock response and the model's feature layout all come from the feature spec
+    in backend/utils/feature_specs.py, so they cannot drift apart.
     """
-    schema = {
-        "type": "OBJECT",
-        "properties": {
-            "disease": {"type": "STRING"},
-        },
-        "required": ["disease"]
-    }
+    spec = get_spec(disease_id)
+    return spec.schema if spec is not None else None
+
+
+def _get_degraded_gemini_response(extracted_text, disease_id, reason):
+    """
+    Mock-style output used while Gemini is unreachable (circuit breaker open or retries exhausted),
+    flagged with 'degraded' so it is never cached and the caller can tell the user.
+    """
+    degraded = _get_mock_gemini_response(extracted_text, disease_id)
+    degraded["degraded"] = True
+    degraded["degraded_reason"] = reason
+    return degraded
 
-    if disease_id == 'diabetes':
-        schema["properties"].update({
-            "pregnancies": {"type": "NUMBER"},
-            "glucose": {"type": "NUMBER"},
-            "blood_pressure": {"type": "NUMBER"},
-            "skin_thickness": {"type": "NUMBER"},
-            "insulin": {"type": "NUMBER"},
-            "bmi": {"type": "NUMBER"},
-            "diabetes_pedigree_function": {"type": "NUMBER"},
-            "age": {"type": "NUMBER"},
-            "gender": {"type": "STRING", "enum": ["male", "female", "other", "unknown"]},
-        })
-        schema["propertyOrdering"] = ["disease", "age", "gender", "pregnancies", "glucose", "blood_pressure", "skin_thickness", "insulin", "bmi", "diabetes_pedigree_function"]
-    elif disease_id == 'heartDisease':
-        schema["properties"].update({
-            "age": {"type": "NUMBER"},
-            "sex": {"type": "NUMBER", "enum": [0, 1]}, # 0: male, 1: female
-            "chest_pain_type": {"type": "NUMBER", "enum": [0, 1, 2, 3]},
-            "trestbps": {"type": "NUMBER"},
-            "cholesterol": {"type": "NUMBER"},
-            "fbs": {"type": "NUMBER", "enum": [0, 1]},
-            "restecg": {"type": "NUMBER", "enum": [0, 1, 2]},
-            "thalach": {"type": "NUMBER"},
-            "exang": {"type": "NUMBER", "enum": [0, 1]},
-            "oldpeak": {"type": "NUMBER"},
-            "slope": {"type": "NUMBER", "enum": [0, 1, 2]},
-            "ca": {"type": "NUMBER", "enum": [0, 1, 2, 3]},
-            "thal": {"type": "NUMBER", "enum": [1, 2, 3]},
-        })
-        schema["propertyOrdering"] = ["disease", "age", "sex", "chest_pain_type", "trestbps", "cholesterol", "fbs", "restecg", "thalach", "exang", "oldpeak", "slope", "ca", "thal"]
-    elif disease_id == 'hypertension':
-        schema["properties"].update({
-            "Age_yrs": {"type": "NUMBER"},
-            "Gender": {"type": "NUMBER", "enum": [0, 1]},
-            "Education_Level": {"type": "NUMBER", "enum": [0, 1, 2, 3]},
-            "Occupation": {"type": "NUMBER", "enum": [0, 1, 2, 3, 4]},
-            "Physical_Activity": {"type": "NUMBER", "enum": [0, 1, 2]},
-            "Smoking_Habits": {"type": "NUMBER", "enum": [0, 1, 2]},
-            "BMI": {"type": "NUMBER"},
-        })
-        schema["propertyOrdering"] = ["disease", "Age_yrs", "Gender", "Education_Level", "Occupation", "Physical_Activity", "Smoking_Habits", "BMI"]
-    elif disease_id == 'ckd':
-        schema["properties"].update({
-            "age": {"type": "NUMBER"},
-            "blood_pressure": {"type": "NUMBER"},
-            "specific_gravity": {"type": "NUMBER"},
-            "albumin": {"type": "NUMBER", "enum": [0, 1, 2, 3, 4, 5]},
-            "sugar": {"type": "NUMBER", "enum": [0, 1, 2, 3, 4, 5]},
-            "blood_glucose_random": {"type": "NUMBER"},
-            "blood_urea": {"type": "NUMBER"},
-            "serum_creatinine": {"type": "NUMBER"},
-            "sodium": {"type": "NUMBER"},
-            "potassium": {"type": "NUMBER"},
-            "hemoglobin": {"type": "NUMBER"},
-            "packed_cell_volume": {"type": "NUMBER"},
-            "white_blood_cell_count": {"type": "NUMBER"},
-            "red_blood_cell_count": {"type": "NUMBER"},
-            "pus_cell": {"type": "STRING", "enum": ["normal", "abnormal"]},
-            "pus_cell_clumps": {"type": "STRING", "enum": ["notpresent", "present"]},
-            "bacteria": {"type": "STRING", "enum": ["notpresent", "present"]},
-            "hypertension": {"type": "STRING", "enum": ["yes", "no"]},
-            "diabetes_mellitus": {"type": "STRING", "enum": ["yes", "no"]},
-            "coronary_artery_disease": {"type": "STRING", "enum": ["yes", "no"]},
-            "appetite": {"type": "STRING", "enum": ["good", "poor"]},
-            "pedal_edema": {"type": "STRING", "enum": ["yes", "no"]},
-            "anemia": {"type": "STRING", "enum": ["yes", "no"]},
-        })
-    elif disease_id == 'liverDisease':
-        schema["properties"].update({
-            "Age": {"type": "NUMBER"},
-            "Gender": {"type": "NUMBER", "enum": [0, 1]}, # 0 for Male, 1 for Female
-            "Total_Bilirubin": {"type": "NUMBER"},
-            "Direct_Bilirubin": {"type": "NUMBER"},
-            "Alkaline_Phosphotase": {"type": "NUMBER"},
-            "Alamine_Aminotransferase": {"type": "NUMBER"},
-            "Aspartate_Aminotransferase": {"type": "NUMBER"},
-            "Total_Protiens": {"type": "NUMBER"},
-            "Albumin": {"type": "NUMBER"},
-            "Albumin_and_Globulin_Ratio": {"type": "NUMBER"},
-        })
-    elif disease_id == 'thyroidDisease':
-        schema["properties"].update({
-            "age": {"type": "NUMBER"},
-            "sex": {"type": "NUMBER", "enum": [0, 1]},
-            "on_thyroxine": {"type": "NUMBER", "enum": [0, 1]},
-            "query_on_thyroxine": {"type": "NUMBER", "enum": [0, 1]},
-            "on_antithyroid_meds": {"type": "NUMBER", "enum": [0, 1]},
-            "sick": {"type": "NUMBER", "enum": [0, 1]},
-            "pregnant": {"type": "NUMBER", "enum": [0, 1]},
-            "thyroid_surgery": {"type": "NUMBER", "enum": [0, 1]},
-            "I131_treatment": {"type": "NUMBER", "enum": [0, 1]},
-            "query_hypothyroid": {"type": "NUMBER", "enum": [0, 1]},
-            "query_hyperthyroid": {"type": "NUMBER", "enum": [0, 1]},
-            "lithium": {"type": "NUMBER", "enum": [0, 1]},
-            "goitre": {"type": "NUMBER", "enum": [0, 1]},
-            "tumor": {"type": "NUMBER", "enum": [0, 1]},
-            "hypopituitary": {"type": "NUMBER", "enum": [0, 1]},
-            "psych": {"type": "NUMBER", "enum": [0, 1]},
-            "TSH_measured": {"type": "NUMBER", "enum": [0, 1]},
-            "TSH": {"type": "NUMBER"},
-            "T3_measured": {"type": "NUMBER", "enum": [0, 1]},
-            "T3": {"type": "NUMBER"},
-            "TT4_measured": {"type": "NUMBER", "enum": [0, 1]},
-            "TT4": {"type": "NUMBER"},
-            "T4U_measured": {"type": "NUMBER", "enum": [0, 1]},
-            "T4U": {"type": "NUMBER"},
-            "FTI_measured": {"type": "NUMBER", "enum": [0, 1]},
-            "FTI": {"type": "NUMBER"},
-            "TBG_measured": {"type": "NUMBER", "enum": [0, 1]},
-            "TBG": {"type": "NUMBER"},
-        })
-    elif disease_id == 'cancerDisease':
-        # Aligning this directly with expected_features in cancer.py
-        # Note: 'FamilyHistoryCancer', 'ChronicDisease_Hypertension', 'ChronicDisease_Diabetes',
-        # 'Symptoms_Fatigue', 'Symptoms_UnexplainedWeightLoss' are expected as '0' or '1' strings in cancer.py's mapping.
-        schema["properties"].update({
-            "age": {"type": "NUMBER"},
-            "gender": {"type": "STRING", "enum": ["Male", "Female"]}, # Flask maps 'male'/'female' (lowercase)
-            "smokingstatus": {"type": "STRING", "enum": ["Never Smoked", "Former Smoker", "Current Smoker"]},
-            "alcoholconsumption": {"type": "STRING", "enum": ["None", "Moderate", "Heavy"]},
-            "bmi": {"type": "NUMBER"},
-            "physicalactivity_hoursperweek": {"type": "NUMBER"},
-            "familyhistorycancer": {"type": "STRING", "enum": ["0", "1"]}, # Flask maps '0'/'1' (strings)
-            "chronicdisease_hypertension": {"type": "STRING", "enum": ["0", "1"]}, # Flask maps '0'/'1' (strings)
-            "chronicdisease_diabetes": {"type": "STRING", "enum": ["0", "1"]}, # Flask maps '0'/'1' (strings)
-            "genomicmarker_1": {"type": "NUMBER"},
-            "genomicmarker_2": {"type": "NUMBER"},
-            "tumorsize_mm": {"type": "NUMBER"},
-            # TumorMarkerLevel was None in your console log, so allow null.
-            # Make sure to handle null/None in your ML preprocessing if it's not a required feature for the model.
-            "tumormarkerlevel": {"type": ["NUMBER", "null"]}, 
-            "biopsyresult": {"type": "STRING", "enum": ["Benign", "Malignant", "Not Performed", "Atypical"]},
-            "bloodtest_markera": {"type": "NUMBER"},
-            "bloodtest_markerb": {"type": "NUMBER"},
-            "symptoms_fatigue": {"type": "STRING", "enum": ["0", "1"]}, # Flask maps '0'/'1' (strings)
-            "symptoms_unexplainedweightloss": {"type": "STRING", "enum": ["0", "1"]}, # Flask maps '0'/'1' (strings)
-        })
-        schema["propertyOrdering"] = [
-            "disease",
-            "age",
-            "gender",
-            "smokingstatus",
-            "alcoholconsumption",
-            "bmi",
-            "physicalactivity_hoursperweek",
-            "familyhistorycancer",
-            "chronicdisease_hypertension",
-            "chronicdisease_diabetes",
-            "genomicmarker_1",
-            "genomicmarker_2",
-            "tumorsize_mm",
-            "tumormarkerlevel", # Added back, check if your ML model expects this
-            "biopsyresult",
-            "bloodtest_markera",
-            "bloodtest_markerb",
-            "symptoms_fatigue",
-            "symptoms_unexplainedweightloss"
-        ]
-    else:
-        return None # No specific schema for unknown diseases
-
-    return schema
+
+# Mock lookup tolerates differently-cased disease ids (e.g. 'heartdisease')
+_SPECS_BY_LOWER_ID = {disease_id.lower(): spec for disease_id, spec in FEATURE_SPECS.items()}
 
 
 def _get_mock_gemini_response(extracted_text, disease_id):
     """
     Provides a mock structured response from Gemini for testing purposes.
-    Ensure this mock matches the structure expected by model_utils.py.
+    The values come from the feature spec, so the mock always matches the schema.
     """
-    mock_structured_data = {}
-    if "diabetes" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "diabetes",
-            "pregnancies": 1,
-            "glucose": 120.0,
-            "blood_pressure": 70.0,
-            "skin_thickness": 30.0,
-            "insulin": 150.0,
-            "bmi": 25.5,
-            "diabetes_pedigree_function": 0.5,
-            "age": 30,
-            "gender": "female"
-        }
-    elif "heartdisease" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "heartDisease",
-            "age": 55,
-            "sex": 0,
-            "chest_pain_type": 1,
-            "trestbps": 130,
-            "cholesterol": 220,
-            "fbs": 0,
-            "restecg": 1,
-            "thalach": 150,
-            "exang": 1,
-            "oldpeak": 1.5,
-            "slope": 2,
-            "ca": 1,
-            "thal": 2,
-        }
-    elif "hypertension" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "hypertension",
-            "Age_yrs": 60,
-            "Gender": 1,
-            "Education_Level": 2,
-            "Occupation": 0,
-            "Physical_Activity": 1,
-            "Smoking_Habits": 1,
-            "BMI": 30.2,
-        }
-    elif "ckd" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "ckd",
-            "age": 50,
-            "blood_pressure": 130,
-            "specific_gravity": 1.015,
-            "albumin": 2,
-            "sugar": 1,
-            "blood_glucose_random": 150,
-            "blood_urea": 50,
-            "serum_creatinine": 2.0,
-            "sodium": 135,
-            "potassium": 4.5,
-            "hemoglobin": 10.0,
-            "packed_cell_volume": 30,
-            "white_blood_cell_count": 8000,
-            "red_blood_cell_count": 4.0,
-            "pus_cell": "abnormal",
-            "pus_cell_clumps": "present",
-            "bacteria": "notpresent",
-            "hypertension": "yes",
-            "diabetes_mellitus": "yes",
-            "coronary_artery_disease": "no",
-            "appetite": "poor",
-            "pedal_edema": "yes",
-            "anemia": "yes",
-        }
-    elif "liverdisease" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "liverDisease",
-            "Age": 50,
-            "Gender": 0,
-            "Total_Bilirubin": 2.5,
-            "Direct_Bilirubin": 0.8,
-            "Alkaline_Phosphotase": 150,
-            "Alamine_Aminotransferase": 60,
-            "Aspartate_Aminotransferase": 70,
-            "Total_Protiens": 6.8,
-            "Albumin": 3.0,
-            "Albumin_and_Globulin_Ratio": 0.9,
-        }
-    elif "thyroiddisease" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "thyroidDisease",
-            "age": 40,
-            "sex": 1,
-            "on_thyroxine": 0,
-            "query_on_thyroxine": 0,
-            "on_antithyroid_meds": 0,
-            "sick": 0,
-            "pregnant": 0,
-            "thyroid_surgery": 0,
-            "I131_treatment": 0,
-            "query_hypothyroid": 1,
-            "query_hyperthyroid": 0,
-            "lithium": 0,
-            "goitre": 0,
-            "tumor": 0,
-            "hypopituitary": 0,
-            "psych": 0,
-            "TSH_measured": 1,
-            "TSH": 5.2,
-            "T3_measured": 1,
-            "T3": 1.5,
-            "TT4_measured": 1,
-            "TT4": 90.0,
-            "T4U_measured": 1,
-            "T4U": 0.8,
-            "FTI_measured": 1,
-            "FTI": 110.0,
-            "TBG_measured": 0,
-            "TBG": -1,
-        }
-    elif "cancer" in disease_id.lower():
-        mock_structured_data = {
-            "disease": "cancerDisease",
-            "age": 46.0, # Adjusted to match the example log
-            "gender": "Male",
-            "smokingstatus": "Never Smoked", # Corrected to match expected enum
-            "alcoholconsumption": "None", # Added missing field
-            "bmi": 27.8,
-            "physicalactivity_hoursperweek": 29.8, # Added missing field
-            "familyhistorycancer": "0", # Changed to string "0" to match flask mapping
-            "chronicdisease_hypertension": "0", # Added missing field, changed to string "0"
-            "chronicdisease_diabetes": "0", # Added missing field, changed to string "0"
-            "genomicmarker_1": 1, # Added missing field
-            "genomicmarker_2": 0, # Added missing field
-            "tumorsize_mm": 9.8, # Added missing field
-            "tumormarkerlevel": None, # Kept as None, as in your console log
-            "biopsyresult": "Benign",
-            "bloodtest_markera": 124.6,
-            "bloodtest_markerb": 1.3,
-            "symptoms_fatigue": "0", # Changed to string "0"
-            "symptoms_unexplainedweightloss": "0", # Changed to string "0"
-        }
-    else:
-        mock_structured_data = {
-            "disease": "unknown",
-            "text_summary": extracted_text[:200],
-            "risk_level": "Medium", # Default risk for unknown
-            "reason": "Could not determine specific disease parameters from the report. General summary provided."
-        }
-    return mock_structured_data
-
+    spec = get_spec(disease_id) or _SPECS_BY_LOWER_ID.get(disease_id.lower())
+    if spec is not None:
+        return spec.mock_response()
+    return {
+        "disease": "unknown",
+        "text_summary": extracted_text[:200],
+        "risk_level": "Medium", # Default risk for unknown
+        "reason": "Could not determine specific disease parameters from the report. General summary provided."
+    }
@@ -0,0 +1,286 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from functools import lru_cache
+from collections import OrderedDict
+
+from Backend.utils.report_cache import REPORT_CACHE_DIR
+
+# Cache in front of call_gemini_api / call_gemini_api_multi, keyed by
+#   disease_id : model name : schema version : sha256(normalized report text)
+# so re-uploads, reports rendered from the same template and repeated test runs skip Gemini.
+# The schema version is a hash of the disease's response schema (and GEMINI_PROMPT_VERSION);
+# editing a disease's fields in Backend/utils/feature_specs.py therefore changes the key, and
+# entries stored under an older version of a disease's schema are deleted the first time the
+# new one is seen.
+GEMINI_CACHE_BACKEND = os.getenv('GEMINI_CACHE_BACKEND', 'sqlite').strip().lower()  # sqlite, memory or none
+GEMINI_CACHE_TTL = int(os.getenv('GEMINI_CACHE_TTL', str(7 * 24 * 3600)))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv('GEMINI_CACHE_MAX_ENTRIES', '5000'))
+GEMINI_CACHE_PATH = os.getenv('GEMINI_CACHE_PATH', os.path.join(REPORT_CACHE_DIR, 'gemini_cache.sqlite3'))
+# Bump when the prompt wording changes in a way that should invalidate cached responses
+GEMINI_PROMPT_VERSION = '1'
+
+
+def normalize_text(text):
+    """
+    Canonical form of extracted report text for hashing: Unicode NFKC, unified line endings and
+    collapsed runs of spaces/blank lines, so OCR whitespace noise does not cause cache misses.
+    """
+    text = unicodedata.normalize('NFKC', text or '')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = re.sub(r'[ \t\f\v]+', ' ', text)
+    text = re.sub(r' *\n[ \n]*', '\n', text)
+    return text.strip()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def schema_version(schema):
+    # Precompiled schemas (FrozenSchema) carry their canonical JSON, so only ad-hoc dicts are serialized
+    return _schema_json_version(getattr(schema, 'json', None) or json.dumps(schema, sort_keys=True))
+
+
+@lru_cache(maxsize=256)
+def _schema_json_version(schema_json):
+    payload = f"{GEMINI_PROMPT_VERSION}:{schema_json}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class MemoryBackend:
+    """
+    In-process LRU: an OrderedDict of key -> (disease_id, version, value, created_at).
+    """
+
+    def __init__(self, max_entries=GEMINI_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[3] > ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, disease_id, version, value):
+        with self._lock:
+            self._entries[key] = (disease_id, version, value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, disease_id, current_version):
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e[0] == disease_id and e[1] != current_version]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    On-disk LRU shared by every worker process, same layout and WAL setup as the report cache.
+    """
+
+    def __init__(self, path=GEMINI_CACHE_PATH, max_entries=GEMINI_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS gemini_responses ("
+                " key TEXT PRIMARY KEY, disease_id TEXT NOT NULL, schema_version TEXT NOT NULL,"
+                " value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_gemini_lru ON gemini_responses (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_gemini_disease ON gemini_responses (disease_id, schema_version)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, key, ttl):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT value, created_at FROM gemini_responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > ttl:
+                    conn.execute("DELETE FROM gemini_responses WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE gemini_responses SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return json.loads(row[0])
+            finally:
+                conn.close()
+
+    def set(self, key, disease_id, version, value):
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO gemini_responses (key, disease_id, schema_version, value, created_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, disease_id, version, payload, now, now)
+                )
+                conn.execute(
+                    "DELETE FROM gemini_responses WHERE key NOT IN ("
+                    " SELECT key FROM gemini_responses ORDER BY last_access DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def invalidate(self, disease_id, current_version):
+        with self._lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(
+                    "DELETE FROM gemini_responses WHERE disease_id = ? AND schema_version != ?",
+                    (disease_id, current_version)
+                )
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.close()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM gemini_responses")
+                conn.commit()
+            finally:
+                conn.close()
+
+    def __len__(self):
+        with self._lock:
+            conn = self._connect()
+            try:
+                return conn.execute("SELECT COUNT(*) FROM gemini_responses").fetchone()[0]
+            finally:
+                conn.close()
+
+
+BACKENDS = {'memory': MemoryBackend, 'sqlite': SQLiteBackend}
+
+
+class GeminiResponseCache:
+    """
+    Caches Gemini's parsed structured output per (normalized text, disease_id, model, schema version).
+    Backend errors are logged and treated as misses, never raised to the request.
+    """
+
+    def __init__(self, backend=None, ttl=GEMINI_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidated': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _version(self, disease_id, schema):
+        """
+        Current schema version of disease_id. The first time a new version is seen, entries
+        cached under older versions of that disease's schema are deleted.
+        """
+        version = schema_version(schema)
+        with self._lock:
+            known = self._versions.get(disease_id)
+            self._versions[disease_id] = version
+        if known != version:
+            removed = self.backend.invalidate(disease_id, version)
+            if removed:
+                print(f"♻️ Gemini cache: dropped {removed} {disease_id} entries from an older schema.")
+                self._count('invalidated', removed)
+        return version
+
+    def key(self, text, disease_id, model_name, schema):
+        return f"{disease_id}:{model_name}:{self._version(disease_id, schema)}:{text_hash(text)}"
+
+    def get(self, text, disease_id, model_name, schema):
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(self.key(text, disease_id, model_name, schema), self.ttl)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logging.warning(f"⚠️ Gemini cache read failed for {disease_id}: {e}")
+            self._count('errors')
+            return None
+        self._count('hits' if value is not None else 'misses')
+        return value
+
+    def set(self, text, disease_id, model_name, schema, value):
+        if not self.enabled:
+            return
+        try:
+            version = self._version(disease_id, schema)
+            key = f"{disease_id}:{model_name}:{version}:{text_hash(text)}"
+            self.backend.set(key, disease_id, version, value)
+            self._count('sets')
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logging.warning(f"⚠️ Gemini cache write failed for {disease_id}: {e}")
+            self._count('errors')
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['backend'] = type(self.backend).__name__ if self.backend is not None else None
+        return stats
+
+
+def _default_backend():
+    backend_class = BACKENDS.get(GEMINI_CACHE_BACKEND)
+    if backend_class is None:
+        if GEMINI_CACHE_BACKEND not in ('none', 'off', '0', ''):
+            logging.warning(f"⚠️ Unknown GEMINI_CACHE_BACKEND '{GEMINI_CACHE_BACKEND}'; Gemini response cache disabled.")
+        return None
+    return backend_class()
+
+
+# Shared by call_gemini_api and call_gemini_api_multi
+gemini_response_cache = GeminiResponseCache(_default_backend())
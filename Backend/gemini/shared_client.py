@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+# Process-wide Gemini client shared by every caller (report upload route, multi-disease predictor).
+# genai.configure runs once per API key, GenerativeModel objects are cached per (model, schema)
+# so their underlying connection is reused, and every call has a deadline, jittered exponential
+# backoff on 429/5xx and a circuit breaker that fails fast while Gemini is down.
+GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-1.5-flash')
+# Seconds allowed for one attempt, and for the whole call including retries
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '20'))
+GEMINI_DEADLINE = float(os.getenv('GEMINI_DEADLINE', '45'))
+# Retries after the first attempt for 429 / 5xx / network errors
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '3'))
+GEMINI_BACKOFF_BASE = float(os.getenv('GEMINI_BACKOFF_BASE', '0.5'))
+GEMINI_BACKOFF_MAX = float(os.getenv('GEMINI_BACKOFF_MAX', '8'))
+# Consecutive failed calls that open the breaker, and how long it stays open (seconds)
+GEMINI_BREAKER_THRESHOLD = int(os.getenv('GEMINI_BREAKER_THRESHOLD', '5'))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv('GEMINI_BREAKER_COOLDOWN', '60'))
+# Point the client at another endpoint, e.g. the local fake server (Backend/gemini/fake_gemini_server.py).
+# An http:// endpoint switches the transport to REST.
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT', '').strip()
+GEMINI_TRANSPORT = os.getenv('GEMINI_TRANSPORT', 'rest' if GEMINI_API_ENDPOINT else '').strip() or None
+
+# HTTP status codes worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiUnavailable(RuntimeError):
+    """
+    Raised when the circuit breaker is open, or when every retry failed with a transient error.
+    Callers fall back to degraded (mock) output instead of failing the request.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `cooldown` seconds.
+    After the cooldown one trial call is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, threshold=GEMINI_BREAKER_THRESHOLD, cooldown=GEMINI_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                if self._opened_at is None or self._trial_running:
+                    logging.warning(f"⚠️ Gemini circuit breaker opened after {self._failures} failures "
+                                    f"(cooldown {self.cooldown:.0f}s)")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def reset(self):
+        self.record_success()
+
+
+def _is_retryable(error):
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        return getattr(error, 'code', None) in RETRYABLE_STATUS_CODES
+    # Connection resets and socket timeouts (requests' exceptions are OSErrors too)
+    return isinstance(error, (OSError, TimeoutError))
+
+
+def to_sdk_schema(schema):
+    """
+    Rewrites our response schemas into what the installed google-generativeai Schema proto accepts:
+      - 'propertyOrdering' is dropped (only an output-order hint, unknown to this SDK version),
+      - ["NUMBER", "null"] becomes type NUMBER with nullable=True,
+      - enums on non-STRING fields (e.g. 0/1 flags) move into the description, because the
+        API only supports string enums.
+    """
+    if not isinstance(schema, dict):
+        return schema
+    converted = {}
+    for key, value in schema.items():
+        if key == 'propertyOrdering':
+            continue
+        if key == 'properties':
+            converted[key] = {name: to_sdk_schema(prop) for name, prop in value.items()}
+        elif key == 'items':
+            converted[key] = to_sdk_schema(value)
+        else:
+            converted[key] = value
+
+    schema_type = converted.get('type')
+    if isinstance(schema_type, (list, tuple)):
+        types = [t for t in schema_type if str(t).lower() != 'null']
+        converted['type'] = types[0] if types else 'STRING'
+        if len(types) != len(schema_type):
+            converted['nullable'] = True
+
+    enum = converted.get('enum')
+    if enum and (str(converted.get('type', 'STRING')).upper() != 'STRING' or
+                 not all(isinstance(v, str) for v in enum)):
+        converted.pop('enum')
+        allowed = f"One of: {', '.join(str(v) for v in enum)}."
+        converted['description'] = f"{converted['description']} {allowed}" if converted.get('description') else allowed
+    return converted
+
+
+class GeminiClient:
+    """
+    Thread-safe wrapper around google.generativeai shared by the whole process.
+    """
+
+    def __init__(self, timeout=GEMINI_TIMEOUT, deadline=GEMINI_DEADLINE, max_retries=GEMINI_MAX_RETRIES,
+                 backoff_base=GEMINI_BACKOFF_BASE, backoff_max=GEMINI_BACKOFF_MAX, breaker=None,
+                 api_endpoint=GEMINI_API_ENDPOINT, transport=GEMINI_TRANSPORT):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.api_endpoint = api_endpoint
+        self.transport = transport
+        self._configured_key = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def api_key():
+        return os.getenv("GEMINI_API_KEY")
+
+    def is_configured(self):
+        return bool(self.api_key())
+
+    def _configure(self):
+        api_key = self.api_key()
+        if not api_key:
+            raise GeminiUnavailable("Gemini API key is not set in environment variables.")
+        with self._lock:
+            if api_key != self._configured_key:
+                client_options = {"api_endpoint": self.api_endpoint} if self.api_endpoint else None
+                genai.configure(api_key=api_key, transport=self.transport, client_options=client_options)
+                # Models hold a client bound to the previous configuration
+                self._models.clear()
+                self._configured_key = api_key
+                print(f"✅ Gemini client configured ({self.transport or 'grpc'}"
+                      f"{', endpoint ' + self.api_endpoint if self.api_endpoint else ''}).")
+
+    def get_model(self, model_name=GEMINI_MODEL_NAME, response_schema=None):
+        """
+        Returns the cached GenerativeModel for (model_name, response_schema), creating it on first use.
+        With a schema the model is set up for JSON output; response_schema=None gives a plain-text model.
+        """
+        self._configure()
+        schema_key = None
+        if response_schema is not None:
+            # Precompiled schemas carry their canonical JSON; serialize only ad-hoc dicts
+            schema_key = getattr(response_schema, 'json', None) or json.dumps(response_schema, sort_keys=True)
+        key = (model_name, schema_key)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                generation_config = None
+                if response_schema is not None:
+                    generation_config = {"response_mime_type": "application/json"}
+                    if response_schema:
+                        generation_config["response_schema"] = to_sdk_schema(response_schema)
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                self._models[key] = model
+            return model
+
+    def _backoff(self, attempt):
+        # Full jitter: sleep a random time in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def generate(self, prompt_text, response_schema=None, model_name=GEMINI_MODEL_NAME):
+        """
+        Sends prompt_text and returns the response text.
+        Pass response_schema={} for JSON output without a schema.
+
+        Raises GeminiUnavailable if the API key is missing, the breaker is open, or every attempt
+        failed with a 429/5xx/network error. Other errors (bad request, invalid key) are raised as is.
+        """
+        model = self.get_model(model_name, response_schema)
+        if not self.breaker.allow():
+            raise GeminiUnavailable("Gemini circuit breaker is open; skipping the API call.")
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self.deadline - (time.monotonic() - started)
+            try:
+                response = model.generate_content(
+                    [{"parts": [{"text": prompt_text}]}],
+                    request_options={"timeout": max(0.1, min(self.timeout, remaining)), "retry": None},
+                )
+                text = response.text
+            except Exception as e:
+                if not _is_retryable(e):
+                    # Our request is at fault, not Gemini's availability
+                    self.breaker.record_success()
+                    raise
+                elapsed = time.monotonic() - started
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or elapsed + delay >= self.deadline:
+                    self.breaker.record_failure()
+                    raise GeminiUnavailable(f"Gemini API failed after {attempt + 1} attempts "
+                                            f"in {elapsed:.1f}s: {e}") from e
+                print(f"⚠️ Gemini call attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return text
+
+
+# Shared by Backend/gemini/gemini_client.py and Backend/gemini_multi_disease_predictor.py
+gemini_client = GeminiClient()
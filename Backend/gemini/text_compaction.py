@@ -0,0 +1,140 @@
+import os
+import re
+from functools import lru_cache
+
+# Shrinks OCR output before it is embedded in a Gemini prompt:
+#   1. page markers ("--- End of Page N ---") are removed and lines repeated across pages
+#      (letterheads, addresses, disclaimers, "Page 2 of 30" footers) are kept only once,
+#   2. only lines near a keyword of the target disease(s) are kept, plus a little context,
+#   3. the result is cut to a token budget, keeping lines with values first.
+# Short reports skip step 2 and 3: filtering them saves little and risks dropping context.
+GEMINI_COMPACTION_ENABLED = os.getenv('GEMINI_COMPACTION_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+# Approximate token budget for the report text in one prompt
+GEMINI_TEXT_TOKEN_BUDGET = int(os.getenv('GEMINI_TEXT_TOKEN_BUDGET', '3000'))
+# Reports up to this many tokens (after de-duplication) are sent whole
+GEMINI_COMPACTION_MIN_TOKENS = int(os.getenv('GEMINI_COMPACTION_MIN_TOKENS', '1000'))
+# Lines kept above and below every keyword line (table headers, wrapped values)
+GEMINI_COMPACTION_CONTEXT_LINES = int(os.getenv('GEMINI_COMPACTION_CONTEXT_LINES', '1'))
+
+_PAGE_MARKER = re.compile(r'^\s*--- End of Page \d+ ---\s*$')
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+
+
+def estimate_tokens(text):
+    """
+    Rough Gemini token count (about 4 characters per token for English lab reports).
+    """
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=None)
+def _keyword_pattern(disease_ids):
+    # Imported here: field_extractor imports gemini_client, which imports this module
+    from Backend.utils.field_extractor import field_keywords
+    labels = []
+    for disease_id in disease_ids:
+        labels.extend(field_keywords(disease_id))
+    if not labels:
+        return None
+    alternatives = sorted({r'[\s.\-_]*'.join(re.escape(p) for p in re.split(r'[\s.\-_]+', label) if p)
+                           for label in labels}, key=len, reverse=True)
+    return re.compile(r'(?<![a-z0-9])(?:' + '|'.join(alternatives) + r')(?![a-z0-9])', re.IGNORECASE)
+
+
+def _split_pages(text):
+    pages, current = [], []
+    for line in text.splitlines():
+        if _PAGE_MARKER.match(line):
+            pages.append(current)
+            current = []
+        else:
+            current.append(line)
+    if current:
+        pages.append(current)
+    return pages
+
+
+def _dedupe_boilerplate(pages, keyword_pattern):
+    """
+    Drops every repeat of a line that appears on more than one page, comparing lines with digits
+    masked so "Page 3 of 30" matches "Page 4 of 30". Lines with a keyword are only dropped when
+    repeated verbatim: the same analyte with another value is a new measurement, not boilerplate.
+    Returns (lines, dropped_count).
+    """
+    pages_per_line = {}
+    for page in pages:
+        for key in {_DIGITS.sub('#', _SPACES.sub(' ', line.strip().lower())) for line in page if line.strip()}:
+            pages_per_line[key] = pages_per_line.get(key, 0) + 1
+
+    lines, seen, dropped = [], set(), 0
+    for page in pages:
+        for line in page:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            normalized = _SPACES.sub(' ', stripped.lower())
+            key = _DIGITS.sub('#', normalized)
+            if pages_per_line.get(key, 0) > 1:
+                if keyword_pattern is not None and keyword_pattern.search(stripped):
+                    # Keep every distinct value of a repeated analyte line
+                    key = normalized
+                if key in seen:
+                    dropped += 1
+                    continue
+                seen.add(key)
+            lines.append(stripped)
+    return lines, dropped
+
+
+def compact_report_text(text, disease_ids, token_budget=None):
+    """
+    Compacts report text for a Gemini prompt about disease_ids.
+    Returns (compacted_text, stats) with stats {'original_tokens', 'compacted_tokens',
+    'boilerplate_lines_dropped', 'lines_kept', 'lines_total', 'mode'}.
+    """
+    token_budget = GEMINI_TEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    original_tokens = estimate_tokens(text or '')
+    stats = {"original_tokens": original_tokens, "compacted_tokens": original_tokens,
+             "boilerplate_lines_dropped": 0, "lines_kept": None, "lines_total": None, "mode": "disabled"}
+    if not GEMINI_COMPACTION_ENABLED or not text:
+        return text, stats
+
+    keyword_pattern = _keyword_pattern(tuple(disease_ids))
+    lines, dropped = _dedupe_boilerplate(_split_pages(text), keyword_pattern)
+    stats.update(boilerplate_lines_dropped=dropped, lines_total=len(lines))
+    deduped = '\n'.join(lines)
+
+    # Priority 0: keyword line with a value, 1: keyword line, 2: context line, 3: anything else
+    priority = dict.fromkeys(range(len(lines)), 3)
+    if keyword_pattern is not None:
+        for i, line in enumerate(lines):
+            if keyword_pattern.search(line):
+                priority[i] = 0 if any(ch.isdigit() for ch in line) else 1
+                for j in range(max(0, i - GEMINI_COMPACTION_CONTEXT_LINES),
+                               min(len(lines), i + GEMINI_COMPACTION_CONTEXT_LINES + 1)):
+                    priority[j] = min(priority[j], 2)
+
+    kept = [i for i in range(len(lines)) if priority[i] <= 2]
+    if estimate_tokens(deduped) <= GEMINI_COMPACTION_MIN_TOKENS or not kept:
+        # Short report, or nothing recognizable (unusual wording): let Gemini see all of it
+        kept = list(range(len(lines)))
+        stats["mode"] = "deduplicated"
+    else:
+        stats["mode"] = "keywords"
+
+    # Enforce the budget: fill it by priority, then restore document order
+    if sum(estimate_tokens(lines[i]) + 1 for i in kept) > token_budget:
+        ranked = sorted(kept, key=lambda i: (priority[i], i))
+        budget_left, selected = token_budget, []
+        for i in ranked:
+            cost = estimate_tokens(lines[i]) + 1
+            if cost <= budget_left:
+                selected.append(i)
+                budget_left -= cost
+        kept = sorted(selected)
+        stats["mode"] += "+truncated"
+
+    compacted = '\n'.join(lines[i] for i in kept)
+    stats.update(compacted_tokens=estimate_tokens(compacted), lines_kept=len(kept))
+    return compacted, stats
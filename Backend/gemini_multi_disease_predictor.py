@@ -1,14 +1,19 @@
 import os
+import sys
 import fitz  # ← from PyMuPDF
 import pytesseract
 from PIL import Image
 import io
-from google.generativeai import GenerativeModel, configure
 
-# === 1. Configure Gemini API ===
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")  # Set this in your environment
-configure(api_key=GEMINI_API_KEY)
-gemini = GenerativeModel("gemini-pro")
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Backend.gemini.shared_client import gemini_client, GeminiUnavailable
+
+# === 1. Gemini API ===
+# Uses the process-wide client (configured once from GEMINI_API_KEY, with timeouts, retries and a circuit breaker)
+GEMINI_MODEL_NAME = "gemini-pro"
 
 # === 2. OCR from PDF ===
 def extract_text_from_pdf(file_path):
@@ -52,7 +57,8 @@ Return the result in this JSON format:
 }}
 """
     try:
-        response = gemini.generate_content(prompt)
-        return response.text
+        return gemini_client.generate(prompt, model_name=GEMINI_MODEL_NAME)
+    except GeminiUnavailable as e:
+        return {"error": f"Gemini unavailable: {str(e)}", "degraded": True}
     except Exception as e:
         return {"error": f"Gemini analysis failed: {str(e)}"}
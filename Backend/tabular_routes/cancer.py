@@ -1,5 +1,4 @@
 from flask import Blueprint, request, jsonify
-import pickle
 import pandas as pd
 import numpy as np
 import os
@@ -14,18 +13,8 @@ if PROJECT_ROOT not in sys.path:
 
 cancer_bp = Blueprint('cancer_bp', __name__)
 
-# Load the model
-MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'cancer_model.pkl')
-cancer_model = None
-try:
-    with open(MODEL_PATH, 'rb') as f:
-        cancer_model = pickle.load(f)
-    print(f"✅ Cancer model loaded from: {MODEL_PATH}")
-except FileNotFoundError:
-    print(f"⚠️ cancer_model.pkl not found at {MODEL_PATH}")
-except Exception as e:
-    print(f"❌ Error loading cancer model: {e}")
-    traceback.print_exc()
+from Backend.utils.batch_utils import parse_batch_payload, run_batch, batch_summary, finite_float
+from Backend.utils.model_registry import model_registry
 
 # Expected features (exactly what model expects)
 expected_features = [
@@ -61,6 +50,14 @@ category_mappings = {
     'symptoms_unexplainedweightloss': {'0': 0, '1': 1},
 }
 
+def _cancer_risk_and_reason(prediction_score):
+    # Ensure prediction_score is always treated as a float for these comparisons
+    if prediction_score < 0.35:
+        return 'Low', 'Low predicted risk. Maintain a healthy lifestyle.'
+    elif prediction_score < 0.65:
+        return 'Medium', 'Moderate predicted risk. Consider consulting a doctor.'
+    return 'High', 'High predicted risk. Immediate medical attention recommended.'
+
 @cancer_bp.route('/predict-cancer', methods=['POST'])
 def predict_cancer():
     print("--- Entered /predict-cancer route ---")
@@ -115,6 +112,8 @@ def predict_cancer():
         input_df = pd.DataFrame([input_features_list], columns=expected_features)
         print(f"✅ Prepared input DataFrame:\n{input_df}")
 
+        # Model is shared with the report upload path through the model registry
+        cancer_model = model_registry.get('cancerDisease').predictor
         if cancer_model is None:
             return jsonify({
                 "error": "Model not loaded.",
@@ -172,16 +171,7 @@ def predict_cancer():
             print(f"📊 Raw prediction (no predict_proba): {prediction_score}")
 
         # Risk level mapping
-        # Ensure prediction_score is always treated as a float for these comparisons
-        if prediction_score < 0.35:
-            risk_level = 'Low'
-            reason = 'Low predicted risk. Maintain a healthy lifestyle.'
-        elif prediction_score < 0.65:
-            risk_level = 'Medium'
-            reason = 'Moderate predicted risk. Consider consulting a doctor.'
-        else:
-            risk_level = 'High'
-            reason = 'High predicted risk. Immediate medical attention recommended.'
+        risk_level, reason = _cancer_risk_and_reason(prediction_score)
 
         final_response = {
             "risk_level": risk_level,
@@ -198,3 +188,76 @@ def predict_cancer():
             "risk_level": "Error",
             "reason": "Unexpected server error."
         }), 500
+
+
+def _build_cancer_row(record):
+    """
+    Validates one batch record and returns its encoded values in expected_features order.
+    Uses the same key normalization and category mappings as /predict-cancer.
+    """
+    data_lower = {str(k).lower(): v for k, v in record.items()}
+    row = []
+    for feature in expected_features:
+        val = data_lower.get(feature)
+        if val is None or (isinstance(val, str) and not val.strip()):
+            raise ValueError(f"Missing or empty input for '{feature}'")
+
+        if feature in category_mappings:
+            mapped_val = category_mappings[feature].get(str(val).lower())
+            if mapped_val is None:
+                raise ValueError(f"Invalid value for '{feature}': '{val}'")
+            row.append(mapped_val)
+        else:
+            try:
+                row.append(finite_float(val))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid numeric value for '{feature}': '{val}'")
+    return row
+
+
+def _predict_cancer_chunk(rows):
+    cancer_model = model_registry.get('cancerDisease').predictor
+    input_df = pd.DataFrame(rows, columns=expected_features)
+
+    if hasattr(cancer_model, 'predict_proba'):
+        probabilities = np.asarray(cancer_model.predict_proba(input_df))
+        if probabilities.ndim == 2 and probabilities.shape[1] == 2:
+            scores = probabilities[:, 1]
+        else:
+            scores = probabilities.reshape(len(rows), -1)[:, 0]
+    else:
+        scores = np.asarray(cancer_model.predict(input_df), dtype=float)
+
+    results = []
+    for score in scores:
+        risk_level, reason = _cancer_risk_and_reason(float(score))
+        results.append({"risk_level": risk_level, "reason": reason})
+    return results
+
+
+@cancer_bp.route('/predict-cancer/batch', methods=['POST'])
+def predict_cancer_batch():
+    """
+    Batch cancer risk predictions for a JSON array or NDJSON body of patient records.
+    Runs the model once per chunk and returns per-row results or validation errors.
+    """
+    print("--- Entered /predict-cancer/batch route ---")
+    if not model_registry.get('cancerDisease').is_loaded:
+        return jsonify({
+            "error": "Model not loaded.",
+            "risk_level": "Error",
+            "reason": "Model unavailable."
+        }), 500
+
+    try:
+        records = parse_batch_payload(request)
+    except ValueError as ve:
+        return jsonify({
+            "error": str(ve),
+            "risk_level": "Error",
+            "reason": "Invalid batch payload."
+        }), 400
+
+    results = run_batch(records, _build_cancer_row, _predict_cancer_chunk)
+    print(f"✅ Cancer batch complete: {len(results)} records")
+    return jsonify(batch_summary(results)), 200
@@ -1,5 +1,5 @@
 import os
-import pickle
+import sys
 from flask import Blueprint, request, jsonify
 import pandas as pd
 
@@ -10,36 +10,17 @@ diabetes_bp = Blueprint('diabetes_bp', __name__)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Go up two levels from tabular_routes/diabetes.py to reach the project root (Medi_Link/)
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-# Paths for Diabetes tabular model
-DIABETES_TABULAR_MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'diabetes_model.pkl')
-# If your diabetes model uses a scaler, define its path here and load it
-# DIABETES_SCALER_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'diabetes_scaler.pkl')
+from Backend.utils.batch_utils import parse_batch_payload, run_batch, batch_summary, finite_float
+from Backend.utils.model_registry import model_registry
 
-diabetes_tabular_model = None
-# diabetes_scaler = None # Uncomment if you have a scaler for diabetes
-
-# Load model when the blueprint is initialized
-try:
-    if os.path.exists(DIABETES_TABULAR_MODEL_PATH):
-        with open(DIABETES_TABULAR_MODEL_PATH, 'rb') as f:
-            diabetes_tabular_model = pickle.load(f)
-        print("✅ Diabetes tabular model loaded successfully within blueprint.")
-    else:
-        print(f"⚠️ Warning: Diabetes tabular model not found at {DIABETES_TABULAR_MODEL_PATH}")
-
-    # If you have a scaler for diabetes, load it here:
-    # if os.path.exists(DIABETES_SCALER_PATH):
-    #     with open(DIABETES_SCALER_PATH, 'rb') as f:
-    #         diabetes_scaler = pickle.load(f)
-    #     print("✅ Diabetes scaler loaded successfully within blueprint.")
-    # else:
-    #     print(f"⚠️ Warning: Diabetes scaler not found at {DIABETES_SCALER_PATH}. Prediction might be inaccurate.")
-
-except Exception as e:
-    print(f"❌ Error loading Diabetes model/scaler within blueprint: {e}")
-    diabetes_tabular_model = None
-    # diabetes_scaler = None
+# Feature order the diabetes model was trained on
+expected_features = [
+    'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+    'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
+]
 
 @diabetes_bp.route('/predict-diabetes', methods=['POST'])
 def predict_diabetes():
@@ -49,15 +30,23 @@ def predict_diabetes():
     form_data = request.json
     print(f"DEBUG (Diabetes Blueprint): Raw incoming JSON: {form_data}")
 
+    # Model is shared with the report upload path through the model registry
+    handle = model_registry.get('diabetes')
+    diabetes_tabular_model = handle.model
     if not diabetes_tabular_model: # or (diabetes_scaler and not diabetes_scaler): # Check scaler if used
         return jsonify({"message": "Diabetes prediction model not loaded in blueprint."}), 500
     
-    expected_features = [
-        'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-        'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-    ]
-    
     input_values = {key: float(form_data.get(key, 0)) for key in expected_features}
+
+    if handle.compiled is not None:
+        # Folded linear model: one dot product, no DataFrame
+        try:
+            prediction = handle.compiled.predict_records([input_values])[0]
+            return jsonify({"prediction": int(prediction)})
+        except Exception as e:
+            print(f"Error during diabetes prediction: {e}")
+            return jsonify({"error": f"An error occurred during diabetes prediction: {str(e)}"}), 500
+
     input_df = pd.DataFrame([input_values])
 
     processed_input = input_df
@@ -77,3 +66,45 @@ def predict_diabetes():
     except Exception as e:
         print(f"Error during diabetes prediction: {e}")
         return jsonify({"error": f"An error occurred during diabetes prediction: {str(e)}"}), 500
+
+
+def _build_diabetes_row(record):
+    """
+    Converts one batch record into the model's feature order.
+    Missing keys default to 0, matching the single-patient endpoint.
+    """
+    row = []
+    for key in expected_features:
+        try:
+            row.append(finite_float(record.get(key, 0)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid numerical value for {key}: {record.get(key)}")
+    return row
+
+
+def _predict_diabetes_chunk(rows):
+    handle = model_registry.get('diabetes')
+    if handle.compiled is not None:
+        predictions = handle.compiled.predict(rows)
+    else:
+        input_df = pd.DataFrame(rows, columns=expected_features)
+        predictions = handle.model.predict(input_df)
+    return [{"prediction": int(p)} for p in predictions]
+
+
+@diabetes_bp.route('/predict-diabetes/batch', methods=['POST'])
+def predict_diabetes_batch():
+    """
+    Batch diabetes predictions for a JSON array or NDJSON body of patient records.
+    Runs one model call per chunk and returns per-row results or validation errors.
+    """
+    if not model_registry.get('diabetes').is_loaded:
+        return jsonify({"message": "Diabetes prediction model not loaded in blueprint."}), 500
+
+    try:
+        records = parse_batch_payload(request)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    results = run_batch(records, _build_diabetes_row, _predict_diabetes_chunk)
+    return jsonify(batch_summary(results))
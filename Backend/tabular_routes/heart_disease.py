@@ -1,5 +1,5 @@
 import os
-import pickle
+import sys
 from flask import Blueprint, request, jsonify
 import pandas as pd
 
@@ -10,35 +10,28 @@ heart_bp = Blueprint('heart_bp', __name__)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Go up two levels from tabular_routes/heart_disease.py to reach the project root (Medi_Link/)
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-# Paths for Heart Disease tabular model and scaler
-# CORRECTED: Changed 'heart_model.pkl' to 'heart_disease_model.pkl'
-HEART_DISEASE_TABULAR_MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'heart_disease_model.pkl')
-HEART_DISEASE_SCALER_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'heart_disease_scaler.pkl')
+from Backend.utils.batch_utils import parse_batch_payload, run_batch, batch_summary, finite_float
+from Backend.utils.model_registry import model_registry
 
-heart_disease_tabular_model = None
-heart_disease_scaler = None
+# Feature order the heart disease scaler and model were trained on
+expected_features = [
+    'age', 'sex', 'Chest Pain (Numbers)', 'Trestbps (Resting Blood Pressure)',
+    'Cholesterol', 'Fasting Blood Sugar', 'Resting Electrocardiographic Results',
+    'Maximum Heart Rate Achieved', 'Exercise Induced Angina',
+    'ST Depression Induced by Exercise Relative to Rest',
+    'Slope of the Peak Exercise ST Segment',
+    'Number of Major Vessels Colored by Flouroscopy', 'Thallium Stress Test Result'
+]
 
-# Load models and scalers when the blueprint is initialized
-try:
-    if os.path.exists(HEART_DISEASE_TABULAR_MODEL_PATH):
-        with open(HEART_DISEASE_TABULAR_MODEL_PATH, 'rb') as f:
-            heart_disease_tabular_model = pickle.load(f)
-        print("✅ Heart Disease tabular model loaded successfully within blueprint.")
-    else:
-        print(f"⚠️ Warning: Heart Disease tabular model not found at {HEART_DISEASE_TABULAR_MODEL_PATH}")
-
-    if os.path.exists(HEART_DISEASE_SCALER_PATH):
-        with open(HEART_DISEASE_SCALER_PATH, 'rb') as f:
-            heart_disease_scaler = pickle.load(f)
-        print("✅ Heart Disease scaler loaded successfully within blueprint.")
-    else:
-        print(f"⚠️ Warning: Heart Disease scaler not found at {HEART_DISEASE_SCALER_PATH}. Prediction might be inaccurate if scaling was used during training.")
-
-except Exception as e:
-    print(f"❌ Error loading Heart Disease model/scaler within blueprint: {e}")
-    heart_disease_tabular_model = None
-    heart_disease_scaler = None
+# Features sent as '0'/'1'-style strings that must be converted to int
+integer_features = [
+    'Fasting Blood Sugar', 'Exercise Induced Angina',
+    'Resting Electrocardiographic Results', 'Slope of the Peak Exercise ST Segment',
+    'Thallium Stress Test Result'
+]
 
 @heart_bp.route('/predict-heart-disease', methods=['POST'])
 def predict_heart_disease():
@@ -48,18 +41,12 @@ def predict_heart_disease():
     form_data = request.json
     print(f"DEBUG (Heart Disease Blueprint): Raw incoming JSON: {form_data}")
 
+    # Model and scaler are shared with the report upload path through the model registry
+    handle = model_registry.get('heartDisease')
+    heart_disease_tabular_model, heart_disease_scaler = handle.model, handle.scaler
     if not heart_disease_tabular_model or not heart_disease_scaler:
         return jsonify({"message": "Heart Disease prediction model or scaler not loaded in blueprint."}), 500
 
-    expected_features = [
-        'age', 'sex', 'Chest Pain (Numbers)', 'Trestbps (Resting Blood Pressure)',
-        'Cholesterol', 'Fasting Blood Sugar', 'Resting Electrocardiographic Results',
-        'Maximum Heart Rate Achieved', 'Exercise Induced Angina',
-        'ST Depression Induced by Exercise Relative to Rest',
-        'Slope of the Peak Exercise ST Segment',
-        'Number of Major Vessels Colored by Flouroscopy', 'Thallium Stress Test Result'
-    ]
-
     input_values = {}
     for key in expected_features:
         val = form_data.get(key)
@@ -71,9 +58,7 @@ def predict_heart_disease():
         if key == 'sex':
             input_values[key] = 0 if val == 'male' else 1
         # Convert string '0'/'1' to int for specific features
-        elif key in ['Fasting Blood Sugar', 'Exercise Induced Angina',
-                      'Resting Electrocardiographic Results', 'Slope of the Peak Exercise ST Segment',
-                      'Thallium Stress Test Result']:
+        elif key in integer_features:
             try:
                 input_values[key] = int(val)
             except ValueError:
@@ -86,6 +71,15 @@ def predict_heart_disease():
                 print(f"Invalid numerical value for {key}: {val}")
                 return jsonify({"error": f"Invalid numerical value for {key}"}), 400
 
+    if handle.compiled is not None:
+        # Scaler and model folded into one weight vector: no DataFrame or transform()
+        try:
+            prediction = handle.compiled.predict_records([input_values])[0]
+            return jsonify({"prediction": int(prediction)})
+        except Exception as e:
+            print(f"Error during heart disease prediction: {e}")
+            return jsonify({"error": f"An error occurred during heart disease prediction: {str(e)}"}), 500
+
     input_df = pd.DataFrame([input_values])
     print(f"DEBUG (Heart Disease Blueprint): Input DataFrame for scaler:\n{input_df}")
 
@@ -105,3 +99,59 @@ def predict_heart_disease():
     except Exception as e:
         print(f"Error during heart disease prediction: {e}")
         return jsonify({"error": f"An error occurred during heart disease prediction: {str(e)}"}), 500
+
+
+def _build_heart_disease_row(record):
+    """
+    Converts one batch record into the scaler's feature order.
+    Applies the same conversions as the single-patient endpoint.
+    """
+    row = []
+    for key in expected_features:
+        val = record.get(key)
+        if val is None:
+            raise ValueError(f"Missing data for {key}")
+
+        if key == 'sex':
+            row.append(0 if val == 'male' else 1)
+        elif key in integer_features:
+            try:
+                row.append(int(val))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid integer value for {key}")
+        else:
+            try:
+                row.append(finite_float(val))
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid numerical value for {key}")
+    return row
+
+
+def _predict_heart_disease_chunk(rows):
+    handle = model_registry.get('heartDisease')
+    if handle.compiled is not None:
+        predictions = handle.compiled.predict(rows)
+    else:
+        input_df = pd.DataFrame(rows, columns=expected_features)
+        processed_input = handle.scaler.transform(input_df)
+        predictions = handle.model.predict(processed_input)
+    return [{"prediction": int(p)} for p in predictions]
+
+
+@heart_bp.route('/predict-heart-disease/batch', methods=['POST'])
+def predict_heart_disease_batch():
+    """
+    Batch heart disease predictions for a JSON array or NDJSON body of patient records.
+    Scales and predicts once per chunk and returns per-row results or validation errors.
+    """
+    handle = model_registry.get('heartDisease')
+    if not handle.model or not handle.scaler:
+        return jsonify({"message": "Heart Disease prediction model or scaler not loaded in blueprint."}), 500
+
+    try:
+        records = parse_batch_payload(request)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    results = run_batch(records, _build_heart_disease_row, _predict_heart_disease_chunk)
+    return jsonify(batch_summary(results))
@@ -1,5 +1,5 @@
 import os
-import pickle
+import sys
 import traceback
 from flask import Blueprint, request, jsonify
 import pandas as pd
@@ -14,38 +14,24 @@ hypertension_bp = Blueprint('hypertension_bp', __name__)
 # Dynamically determine project root
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Current file dir: D:\Medi_Link\Backend\tabular_routes
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))  # D:\Medi_Link
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-# Set model and preprocessor paths
-HYPERTENSION_TABULAR_MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'hypertension_model.pkl')
-HYPERTENSION_PREPROCESSOR_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'hypertension_preprocessor.pkl')
-
-# Initialize model and preprocessor
-hypertension_tabular_model = None
-hypertension_preprocessor = None
+from Backend.utils.batch_utils import parse_batch_payload, run_batch, batch_summary, finite_float
+from Backend.utils.model_registry import model_registry
 
 # ----------------------------- #
-# 🔄 Load Model and Preprocessor
+# 🔄 Model and Preprocessor
 # ----------------------------- #
-try:
-    if os.path.exists(HYPERTENSION_TABULAR_MODEL_PATH):
-        with open(HYPERTENSION_TABULAR_MODEL_PATH, 'rb') as f:
-            hypertension_tabular_model = pickle.load(f)
-        print("✅ Hypertension tabular model loaded successfully.")
-    else:
-        print(f"⚠️ Model file NOT FOUND at: {HYPERTENSION_TABULAR_MODEL_PATH}")
-
-    if os.path.exists(HYPERTENSION_PREPROCESSOR_PATH):
-        with open(HYPERTENSION_PREPROCESSOR_PATH, 'rb') as f:
-            hypertension_preprocessor = pickle.load(f)
-        print("✅ Hypertension preprocessor loaded successfully.")
-    else:
-        print(f"⚠️ Preprocessor file NOT FOUND at: {HYPERTENSION_PREPROCESSOR_PATH}")
+# Loaded once through the shared model registry (also used by the report upload path)
 
-except Exception as e:
-    print(f"❌ ERROR loading model/preprocessor: {e}")
-    traceback.print_exc() # Print full traceback for loading errors
-    hypertension_tabular_model = None
-    hypertension_preprocessor = None
+# Raw input keys the preprocessor was fitted on
+expected_input_keys = [
+    'Age_yrs', 'Gender', 'Education_Level', 'Occupation',
+    'Physical_Activity', 'Smoking_Habits', 'BMI'
+]
+categorical_cols = ['Gender', 'Education_Level', 'Occupation', 'Physical_Activity', 'Smoking_Habits']
+numerical_cols = ['Age_yrs', 'BMI']
 
 # ----------------------------- #
 # 📦 Prediction Route
@@ -55,14 +41,11 @@ def predict_hypertension():
     form_data = request.json
     print(f"📥 Incoming data: {form_data}")
 
+    handle = model_registry.get('hypertension')
+    hypertension_tabular_model, hypertension_preprocessor = handle.model, handle.preprocessor
     if not hypertension_tabular_model or not hypertension_preprocessor:
         return jsonify({"error": "Hypertension model or preprocessor not loaded on the server. Check server logs."}), 500
 
-    expected_input_keys = [
-        'Age_yrs', 'Gender', 'Education_Level', 'Occupation',
-        'Physical_Activity', 'Smoking_Habits', 'BMI'
-    ]
-
     input_values_dict = {}
     for key in expected_input_keys:
         val = form_data.get(key)
@@ -70,6 +53,21 @@ def predict_hypertension():
             return jsonify({"error": f"Missing value for '{key}'"}), 400
         input_values_dict[key] = val
 
+    if handle.compiled is not None:
+        # Preprocessor and model folded into one weight vector and one-hot lookup tables
+        try:
+            row = dict(zip(expected_input_keys, _build_hypertension_row(input_values_dict)))
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        try:
+            prediction = handle.compiled.predict_records([row])[0]
+            print(f"✨ Prediction successful: {prediction}")
+            return jsonify({"prediction": int(prediction)})
+        except Exception as e:
+            print(f"❌ Prediction error: {e}")
+            traceback.print_exc()
+            return jsonify({"error": f"Prediction failed: {e}. Check server logs for details."}), 500
+
     input_df = pd.DataFrame([input_values_dict])
     print(f"📊 Input DataFrame before type conversion:\n{input_df}")
     print(f"📊 Initial dtypes:\n{input_df.dtypes}")
@@ -78,13 +76,11 @@ def predict_hypertension():
         # --- FIX START ---
         # Explicitly cast categorical columns to string type
         # This is crucial if your preprocessor (e.g., OneHotEncoder) expects object/string dtypes
-        categorical_cols = ['Gender', 'Education_Level', 'Occupation', 'Physical_Activity', 'Smoking_Habits']
         for col in categorical_cols:
             if col in input_df.columns:
                 input_df[col] = input_df[col].astype(str) # Convert integer categories to strings
 
         # Ensure numerical columns are correctly typed as numbers (float is generally safe)
-        numerical_cols = ['Age_yrs', 'BMI']
         for col in numerical_cols:
             if col in input_df.columns:
                 # Use pd.to_numeric with errors='coerce' to handle potential non-numeric inputs gracefully
@@ -118,3 +114,57 @@ def predict_hypertension():
         traceback.print_exc() # Print full Python traceback to Flask console
         return jsonify({"error": f"Prediction failed: {e}. Check server logs for details."}), 500
 
+
+# ----------------------------- #
+# 📦 Batch Prediction Route
+# ----------------------------- #
+def _build_hypertension_row(record):
+    """
+    Validates one batch record and returns its values in expected_input_keys order.
+    Categorical values are kept as strings for the OneHotEncoder, numerical ones as floats.
+    """
+    row = []
+    for key in expected_input_keys:
+        val = record.get(key)
+        if val is None:
+            raise ValueError(f"Missing value for '{key}'")
+        if key in numerical_cols:
+            try:
+                val = finite_float(val)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid numerical value for '{key}': {val}")
+        else:
+            val = str(val)
+        row.append(val)
+    return row
+
+
+def _predict_hypertension_chunk(rows):
+    handle = model_registry.get('hypertension')
+    if handle.compiled is not None:
+        predictions = handle.compiled.predict(rows)
+    else:
+        input_df = pd.DataFrame(rows, columns=expected_input_keys)
+        processed_input = handle.preprocessor.transform(input_df)
+        predictions = handle.model.predict(processed_input)
+    return [{"prediction": int(p)} for p in predictions]
+
+
+@hypertension_bp.route('/predict-hypertension/batch', methods=['POST'])
+def predict_hypertension_batch():
+    """
+    Batch hypertension predictions for a JSON array or NDJSON body of patient records.
+    Preprocesses and predicts once per chunk and returns per-row results or validation errors.
+    """
+    handle = model_registry.get('hypertension')
+    if not handle.model or not handle.preprocessor:
+        return jsonify({"error": "Hypertension model or preprocessor not loaded on the server. Check server logs."}), 500
+
+    try:
+        records = parse_batch_payload(request)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    results = run_batch(records, _build_hypertension_row, _predict_hypertension_chunk)
+    print(f"✨ Hypertension batch complete: {len(results)} records")
+    return jsonify(batch_summary(results))
@@ -1,32 +1,24 @@
 # tabular_routes/liver_disease.py
 from flask import Blueprint, request, jsonify
-import pickle
+import numpy as np
 import os
+import sys
 
 liver_bp = Blueprint('liver_bp', __name__)
 
-# Define paths to your liver disease model (adjust as per your actual structure)
-# Assuming the model is in ml_model/saved-model/liver_disease_model.pkl
+# The liver disease model (ml_model/saved-model/liver_disease_model.pkl) is loaded
+# once through the shared model registry.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..')) # Adjust path to project root
-LIVER_MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'liver_disease_model.pkl')
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-liver_model = None
-
-# Load the liver disease model
-try:
-    if os.path.exists(LIVER_MODEL_PATH):
-        with open(LIVER_MODEL_PATH, 'rb') as f:
-            liver_model = pickle.load(f)
-        print("✅ Liver Disease model loaded successfully.")
-    else:
-        print(f"⚠️ Warning: Liver Disease model not found at {LIVER_MODEL_PATH}")
-except Exception as e:
-    print(f"❌ Error loading Liver Disease model: {e}")
+from Backend.utils.batch_utils import parse_batch_payload, run_batch, batch_summary, finite_float
+from Backend.utils.model_registry import model_registry
 
 @liver_bp.route('/predict-liver-disease', methods=['POST'])
 def predict_liver_disease():
-    if liver_model is None:
+    if not model_registry.get('liverDisease').is_loaded:
         return jsonify({'error': 'Liver Disease model not loaded.'}), 500
 
     try:
@@ -62,4 +54,50 @@ def predict_liver_disease():
         return jsonify({'error': f'Missing data for key: {e}. Please ensure all required fields are sent.'}), 400
     except Exception as e:
         print(f"Error during liver disease prediction: {e}")
-        return jsonify({'error': f'Internal server error during prediction: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Internal server error during prediction: {str(e)}'}), 500
+
+# Feature order sent by the frontend and expected by the model
+liver_features = [
+    'Age', 'Gender', 'Total_Bilirubin', 'Direct_Bilirubin', 'Alkaline_Phosphotase',
+    'Alamine_Aminotransferase', 'Aspartate_Aminotransferase', 'Total_Protiens',
+    'Albumin', 'Albumin_and_Globulin_Ratio'
+]
+TOTAL_BILIRUBIN_IDX = liver_features.index('Total_Bilirubin')
+ALT_IDX = liver_features.index('Alamine_Aminotransferase')
+
+
+def _build_liver_row(record):
+    row = []
+    for key in liver_features:
+        val = record[key]
+        try:
+            row.append(finite_float(val))
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid numeric value for {key}: {val}')
+    return row
+
+
+def _predict_liver_chunk(rows):
+    # Same placeholder rule as /predict-liver-disease, evaluated over the whole chunk at once
+    features_array = np.asarray(rows, dtype=np.float64)
+    predictions = ((features_array[:, TOTAL_BILIRUBIN_IDX] > 1.2) |
+                   (features_array[:, ALT_IDX] > 40)).astype(int)
+    return [{'prediction': int(p), 'message': 'Prediction successful.'} for p in predictions]
+
+
+@liver_bp.route('/predict-liver-disease/batch', methods=['POST'])
+def predict_liver_disease_batch():
+    """
+    Batch liver disease predictions for a JSON array or NDJSON body of patient records.
+    Returns per-row results or validation errors.
+    """
+    if not model_registry.get('liverDisease').is_loaded:
+        return jsonify({'error': 'Liver Disease model not loaded.'}), 500
+
+    try:
+        records = parse_batch_payload(request)
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    results = run_batch(records, _build_liver_row, _predict_liver_chunk)
+    return jsonify(batch_summary(results))
@@ -1,32 +1,24 @@
 # tabular_routes/thyroid.py
 from flask import Blueprint, request, jsonify
-import pickle
+import numpy as np
 import os
+import sys
 
 thyroid_bp = Blueprint('thyroid_bp', __name__)
 
-# Define paths to your thyroid disease model
-# Adjust 'saved-model' path as per your actual project structure
+# The thyroid disease model (ml_model/saved-model/thyroid_model.pkl) is loaded
+# once through the shared model registry.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
-THYROID_MODEL_PATH = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model', 'thyroid_model.pkl') # Adjust model name
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-thyroid_model = None
-
-# Load the thyroid disease model
-try:
-    if os.path.exists(THYROID_MODEL_PATH):
-        with open(THYROID_MODEL_PATH, 'rb') as f:
-            thyroid_model = pickle.load(f)
-        print("✅ Thyroid Disease model loaded successfully.")
-    else:
-        print(f"⚠️ Warning: Thyroid Disease model not found at {THYROID_MODEL_PATH}")
-except Exception as e:
-    print(f"❌ Error loading Thyroid Disease model: {e}")
+from Backend.utils.batch_utils import parse_batch_payload, run_batch, batch_summary, finite_float
+from Backend.utils.model_registry import model_registry
 
 @thyroid_bp.route('/predict-thyroid-disease', methods=['POST'])
 def predict_thyroid_disease():
-    if thyroid_model is None:
+    if not model_registry.get('thyroidDisease').is_loaded:
         return jsonify({'error': 'Thyroid Disease model not loaded on server.'}), 500
 
     try:
@@ -88,4 +80,53 @@ def predict_thyroid_disease():
         return jsonify({'error': f'Invalid data type for input: {e}. Please ensure numbers are sent as numbers.'}), 400
     except Exception as e:
         print(f"Error during thyroid disease prediction: {e}")
-        return jsonify({'error': f'Internal server error during thyroid prediction: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Internal server error during thyroid prediction: {str(e)}'}), 500
+
+# Feature order used by /predict-thyroid-disease, with the converter applied to each value
+thyroid_features = [
+    ('age', finite_float), ('sex', int), ('on_thyroxine', int), ('query_on_thyroxine', int),
+    ('on_antithyroid_meds', int), ('sick', int), ('pregnant', int), ('thyroid_surgery', int),
+    ('I131_treatment', int), ('query_hypothyroid', int), ('query_hyperthyroid', int),
+    ('lithium', int), ('goitre', int), ('tumor', int), ('hypopituitary', int), ('psych', int),
+    ('TSH_measured', int), ('TSH', finite_float), ('T3_measured', int), ('T3', finite_float),
+    ('TT4_measured', int), ('TT4', finite_float), ('T4U_measured', int), ('T4U', finite_float),
+    ('FTI_measured', int), ('FTI', finite_float), ('TBG_measured', int), ('TBG', finite_float),
+]
+TSH_IDX = [name for name, _ in thyroid_features].index('TSH')
+TSH_MEASURED_IDX = [name for name, _ in thyroid_features].index('TSH_measured')
+
+
+def _build_thyroid_row(record):
+    row = []
+    for key, converter in thyroid_features:
+        try:
+            row.append(converter(record[key]))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid data type for input: {e}. Please ensure numbers are sent as numbers.')
+    return row
+
+
+def _predict_thyroid_chunk(rows):
+    # Same placeholder rule as /predict-thyroid-disease, evaluated over the whole chunk at once
+    features_array = np.asarray(rows, dtype=np.float64)
+    predictions = ((features_array[:, TSH_IDX] > 4.0) &
+                   (features_array[:, TSH_MEASURED_IDX] == 1)).astype(int)
+    return [{'prediction': int(p), 'message': 'Thyroid prediction successful.'} for p in predictions]
+
+
+@thyroid_bp.route('/predict-thyroid-disease/batch', methods=['POST'])
+def predict_thyroid_disease_batch():
+    """
+    Batch thyroid predictions for a JSON array or NDJSON body of patient records.
+    Returns per-row results or validation errors.
+    """
+    if not model_registry.get('thyroidDisease').is_loaded:
+        return jsonify({'error': 'Thyroid Disease model not loaded on server.'}), 500
+
+    try:
+        records = parse_batch_payload(request)
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    results = run_batch(records, _build_thyroid_row, _predict_thyroid_chunk)
+    return jsonify(batch_summary(results))
@@ -0,0 +1,69 @@
+import os
+import sys
+from flask import Flask
+
+# Checks that one bad record in a /batch request never fails its neighbours: "NaN"/"Infinity"
+# (which float() accepts) are rejected per row by the builders, and a chunk whose model call
+# fails anyway is retried row by row so only the failing record gets an error.
+# Run from the project root: python Backend/test_batch_utils.py
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Backend.utils.batch_utils import run_batch, finite_float
+from Backend.tabular_routes.diabetes import diabetes_bp
+from Backend.tabular_routes.heart_disease import heart_bp, expected_features as heart_features
+
+results = []
+
+
+def check(name, condition, detail=''):
+    results.append(condition)
+    print(f"{'✅' if condition else '❌'} {name}{': ' + detail if detail else ''}")
+
+
+def failed_indices(body):
+    return [r['index'] for r in body['results'] if 'error' in r]
+
+
+def post_batch(client, url, records):
+    response = client.post(url, json=records)
+    return response.status_code, response.get_json()
+
+
+if __name__ == '__main__':
+    app = Flask(__name__)
+    app.register_blueprint(diabetes_bp)
+    app.register_blueprint(heart_bp)
+    client = app.test_client()
+
+    diabetes = {'Pregnancies': 2, 'Glucose': 140, 'BloodPressure': 70, 'SkinThickness': 25, 'Insulin': 90,
+                'BMI': 31.5, 'DiabetesPedigreeFunction': 0.4, 'Age': 45}
+    records = [diabetes, dict(diabetes, Glucose='NaN'), dict(diabetes, BMI='Infinity'), dict(diabetes, Age=60)]
+    status, body = post_batch(client, '/predict-diabetes/batch', records)
+    check("diabetes batch: only the NaN/Infinity rows fail", status == 200 and failed_indices(body) == [1, 2]
+          and body['succeeded'] == 2, f"{body['succeeded']}/{body['count']} succeeded")
+
+    heart = dict(zip(heart_features, [55, 'male', 1, 130, 220, 0, 1, 150, 1, 1.5, 2, 1, 2]))
+    records = [heart, dict(heart, **{'ST Depression Induced by Exercise Relative to Rest': 'nan'}), heart]
+    status, body = post_batch(client, '/predict-heart-disease/batch', records)
+    check("heart disease batch: only the NaN row fails", status == 200 and failed_indices(body) == [1]
+          and body['succeeded'] == 2, f"{body['succeeded']}/{body['count']} succeeded")
+
+    # A record that passes validation but breaks the model call must not fail the rest of its chunk
+    calls = []
+
+    def predict_chunk(rows):
+        calls.append(len(rows))
+        if any(row[0] < 0 for row in rows):
+            raise ValueError("model rejected a row")
+        return [{"prediction": row[0]} for row in rows]
+
+    records = [{'x': 1}, {'x': -1}, {'x': 'inf'}, {'x': 3}, {'x': 4}]
+    batch = run_batch(records, lambda r: [finite_float(r['x'])], predict_chunk, chunk_size=3)
+    check("failed chunk is retried row by row", [r.get('prediction') for r in batch] == [1, None, None, 3, 4]
+          and 'error' in batch[1] and 'finite' in batch[2]['error'], f"model calls per chunk: {calls}")
+
+    print("\n✅ Batch checks passed." if all(results) else "\n❌ Batch checks failed.")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import tempfile
+
+# Checks the shared Gemini client (Backend/gemini/shared_client.py) against the local fake server:
+# model caching, retries on 429/5xx, no retry on 4xx, the circuit breaker, degraded output and
+# the Gemini response cache (memory and SQLite backends, TTL, schema-change invalidation) and
+# report text compaction.
+# Run from the project root: python Backend/test_gemini_client.py
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Backend.gemini.fake_gemini_server import FakeGeminiServer
+
+server = FakeGeminiServer().start()
+# Must be set before the shared client module is imported
+os.environ['GEMINI_API_ENDPOINT'] = server.url
+os.environ['GEMINI_API_KEY'] = 'fake-key'
+os.environ['GEMINI_CACHE_BACKEND'] = 'memory'
+
+from google.api_core import exceptions as google_exceptions
+from Backend.gemini.shared_client import GeminiClient, CircuitBreaker, GeminiUnavailable, gemini_client
+from Backend.gemini.gemini_client import call_gemini_api, call_gemini_api_multi
+from Backend.gemini.response_cache import (GeminiResponseCache, MemoryBackend, SQLiteBackend,
+                                           gemini_response_cache)
+
+SCHEMA = {"type": "OBJECT", "properties": {"glucose": {"type": "NUMBER"}}}
+results = []
+
+
+def check(name, condition, detail=''):
+    results.append(condition)
+    print(f"{'✅' if condition else '❌'} {name}{': ' + detail if detail else ''}")
+
+
+def new_client(**kwargs):
+    options = dict(api_endpoint=server.url, transport='rest', backoff_base=0.01, backoff_max=0.05,
+                   breaker=CircuitBreaker(threshold=2, cooldown=0.5))
+    options.update(kwargs)
+    return GeminiClient(**options)
+
+
+if __name__ == '__main__':
+    client = new_client()
+
+    server.reset()
+    text = client.generate("Glucose: 142 mg/dL", SCHEMA)
+    check("JSON from schema", text.replace(' ', '') == '{"glucose":0}', text)
+    check("model cached per (model, schema)", client.get_model(response_schema=SCHEMA) is client.get_model(response_schema=dict(SCHEMA)))
+
+    server.reset()
+    server.fail_next(503, times=2)
+    client.generate("retry me", SCHEMA)
+    check("retried 503 until success", len(server.requests) == 3, f"{len(server.requests)} requests")
+
+    server.reset()
+    server.fail_next(400, times=1)
+    try:
+        client.generate("bad request", SCHEMA)
+        check("400 raised without retry", False)
+    except google_exceptions.BadRequest:
+        check("400 raised without retry", len(server.requests) == 1, f"{len(server.requests)} requests")
+
+    server.reset()
+    server.fail_next(429, times=100)
+    for _ in range(2):
+        try:
+            client.generate("rate limited", SCHEMA)
+        except GeminiUnavailable:
+            pass
+    check("breaker opens after repeated 429s", client.breaker.state == 'open',
+          f"{len(server.requests)} requests, state {client.breaker.state}")
+    before = len(server.requests)
+    start = time.perf_counter()
+    try:
+        client.generate("fail fast", SCHEMA)
+    except GeminiUnavailable:
+        pass
+    check("open breaker fails fast", len(server.requests) == before,
+          f"{(time.perf_counter() - start) * 1000:.1f}ms, no request sent")
+
+    server.reset()
+    time.sleep(0.6)
+    client.generate("half-open trial", SCHEMA)
+    check("breaker closes after a successful trial", client.breaker.state == 'closed')
+
+    server.reset()
+    server.delay = 0.5
+    slow = new_client(timeout=0.2, deadline=0.6, max_retries=5)
+    start = time.perf_counter()
+    try:
+        slow.generate("slow", SCHEMA)
+        check("deadline enforced", False)
+    except GeminiUnavailable:
+        elapsed = time.perf_counter() - start
+        check("deadline enforced", elapsed < 1.5, f"gave up after {elapsed:.2f}s")
+    server.delay = 0.0
+
+    # End to end through call_gemini_api with the shared, module-level client
+    server.reset()
+    gemini_client.backoff_base, gemini_client.backoff_max = 0.01, 0.05
+    gemini_client.breaker = CircuitBreaker(threshold=1, cooldown=60)
+    server.set_response('{"disease": "diabetes", "glucose": 142}')
+    data = call_gemini_api("Glucose: 142 mg/dL", 'diabetes')
+    check("call_gemini_api via shared client", data.get('glucose') == 142, str(data))
+    server.reset()
+    data = call_gemini_api("Glucose:   142 mg/dL\r\n", 'diabetes')
+    check("response cache hit on whitespace-only differences", data.get('glucose') == 142 and not server.requests,
+          str(gemini_response_cache.stats()))
+    # Diseases without a schema (generic prompt) are cached under the same key they are looked up with
+    server.set_response('{"disease": "unspecified", "notes": "ok"}')
+    call_gemini_api("Pulse: 72", 'unspecifiedDisease')
+    server.reset()
+    data = call_gemini_api("Pulse: 72", 'unspecifiedDisease')
+    check("response cache hit on the generic path", data.get('notes') == 'ok' and not server.requests,
+          str(gemini_response_cache.stats()))
+    server.set_response('{"diabetes": {"glucose": 142}, "ckd": {"age": 50}}')
+    data = call_gemini_api_multi("Glucose: 142 mg/dL", ['diabetes', 'ckd'])
+    sent = server.requests[0]["body"]["generationConfig"]["responseSchema"] if server.requests else {}
+    check("multi call only asks Gemini for uncached diseases", list(sent.get("properties", {})) == ['ckd'],
+          f"asked for {list(sent.get('properties', {}))}")
+
+    # Long multi-page report: repeated letterheads are dropped before the prompt is built
+    server.reset()
+    pages = [f"City Diagnostics, 12 Main Road\nPage {n} of 40\nGlucose: {100 + n} mg/dL\n--- End of Page {n} ---"
+             for n in range(1, 41)]
+    long_report = '\n'.join(pages)
+    call_gemini_api(long_report, 'diabetes')
+    prompt = server.requests[0]["body"]["contents"][0]["parts"][0]["text"] if server.requests else ''
+    check("report text compacted before the call", prompt.count("City Diagnostics") == 1 and "Glucose: 140" in prompt,
+          f"{len(long_report)} -> {len(prompt)} prompt chars")
+
+    server.reset()
+    gemini_response_cache.clear()
+    server.fail_next(503, times=100)
+    sets_before = gemini_response_cache.stats()['sets']
+    data = call_gemini_api("Glucose: 142 mg/dL", 'diabetes')
+    check("degraded mock output when Gemini is down", data.get('degraded') is True and 'glucose' in data,
+          data.get('degraded_reason', ''))
+    check("degraded output is not cached", gemini_response_cache.stats()['sets'] == sets_before, str(gemini_response_cache.stats()))
+
+    # Backends on their own: TTL, LRU bound and schema-change invalidation
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in (MemoryBackend(max_entries=2), SQLiteBackend(os.path.join(tmp, 'g.sqlite3'), max_entries=2)):
+            name = type(backend).__name__
+            cache = GeminiResponseCache(backend, ttl=60)
+            schema_v1 = {"type": "OBJECT", "properties": {"glucose": {"type": "NUMBER"}}}
+            schema_v2 = {"type": "OBJECT", "properties": {"glucose": {"type": "NUMBER"}, "bmi": {"type": "NUMBER"}}}
+            cache.set("report a", 'diabetes', 'm', schema_v1, {"glucose": 1})
+            cache.set("report b", 'diabetes', 'm', schema_v1, {"glucose": 2})
+            cache.set("report c", 'ckd', 'm', schema_v1, {"age": 3})
+            check(f"{name}: LRU keeps max_entries", len(backend) == 2 and cache.get("report a", 'diabetes', 'm', schema_v1) is None)
+            check(f"{name}: hit", cache.get("report b", 'diabetes', 'm', schema_v1) == {"glucose": 2})
+            check(f"{name}: schema change invalidates that disease only",
+                  cache.get("report b", 'diabetes', 'm', schema_v2) is None and
+                  cache.get("report c", 'ckd', 'm', schema_v1) == {"age": 3} and cache.stats()['invalidated'] == 1,
+                  str(cache.stats()))
+            cache.ttl = 0
+            time.sleep(0.01)
+            check(f"{name}: TTL expiry", cache.get("report c", 'ckd', 'm', schema_v1) is None)
+
+    server.stop()
+    print("\n✅ Gemini client checks passed." if all(results) else "\n❌ Gemini client checks failed.")
+    sys.exit(0 if all(results) else 1)
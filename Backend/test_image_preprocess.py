@@ -0,0 +1,117 @@
+import io
+import os
+import sys
+import glob
+import time
+import numpy as np
+from PIL import Image
+
+# Checks the fast CV preprocessing (ml_model/inference/image_preprocess.py) against the training
+# transform (Resize((224, 224)) + ToTensor, i.e. full-resolution decode + PIL bilinear resize):
+# outputs must agree within a few 1/255 steps on a 12 MP phone-sized JPEG, a large PNG, a
+# grayscale JPEG and images from the training set, and the fast path must be faster on a 12 MP JPEG
+# (PNG decode dominates there and the reduce only gains ~10%, too close to timing noise to assert).
+# If torchvision is installed, the reference is also checked against the real transform.
+# Run from the project root: python Backend/test_image_preprocess.py
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml_model.inference.image_preprocess import preprocess_array, CV_DECODE_SCALE
+from ml_model.inference.cv_backend import rank_images
+
+DATASET_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'training', 'data', 'images')
+MAX_ABS_TOLERANCE = 3 / 255
+MEAN_ABS_TOLERANCE = 0.5 / 255
+TIMING_RUNS = 5
+results = []
+
+
+def check(name, condition, detail=''):
+    results.append(condition)
+    print(f"{'✅' if condition else '❌'} {name}{': ' + detail if detail else ''}")
+
+
+def encode(image, fmt, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+def phone_photo(size=(4032, 3024)):
+    """A 12 MP image with real content (an upscaled training image) plus sensor-like noise."""
+    sources = sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*.jpg')))
+    base = Image.open(sources[0]).convert('RGB') if sources else Image.radial_gradient('L').convert('RGB')
+    pixels = np.asarray(base.resize(size, Image.BICUBIC), dtype=np.int16)
+    noise = np.random.default_rng(0).integers(-6, 7, pixels.shape)
+    return Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+
+
+def median_ms(fn, image_bytes):
+    fn(image_bytes)
+    timings = []
+    for _ in range(TIMING_RUNS):
+        start = time.perf_counter()
+        fn(image_bytes)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def compare(name, image_bytes, timed=False):
+    reference = preprocess_array(image_bytes, fast=False)
+    fast = preprocess_array(image_bytes, fast=True)
+    diff = np.abs(fast - reference)
+    detail = f"max {diff.max() * 255:.2f}/255, mean {diff.mean() * 255:.3f}/255"
+    check(f"{name} matches the training transform", fast.shape == reference.shape == (3, 224, 224)
+          and fast.dtype == np.float32 and diff.max() <= MAX_ABS_TOLERANCE and diff.mean() <= MEAN_ABS_TOLERANCE, detail)
+    if timed:
+        full_ms = median_ms(lambda b: preprocess_array(b, fast=False), image_bytes)
+        fast_ms = median_ms(lambda b: preprocess_array(b, fast=True), image_bytes)
+        check(f"{name} decodes faster", fast_ms < full_ms,
+              f"{full_ms:.1f}ms -> {fast_ms:.1f}ms ({full_ms / fast_ms:.1f}x, decode scale {CV_DECODE_SCALE})")
+
+
+if __name__ == '__main__':
+    photo = phone_photo()
+    compare("12 MP JPEG", encode(photo, 'JPEG', quality=90), timed=True)
+    compare("12 MP PNG", encode(photo, 'PNG', compress_level=1))
+    compare("grayscale JPEG", encode(photo.convert('L').resize((2000, 1500)), 'JPEG', quality=90))
+
+    samples = sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*.jpg')))[::50]
+    worst = 0.0
+    for path in samples:
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        worst = max(worst, float(np.abs(preprocess_array(image_bytes) - preprocess_array(image_bytes, fast=False)).max()))
+    if samples:
+        check(f"{len(samples)} training images match", worst <= MAX_ABS_TOLERANCE, f"worst max {worst * 255:.2f}/255")
+
+    batch = np.zeros((2, 3, 224, 224), dtype=np.float32)
+    image_bytes = encode(photo.resize((640, 480)), 'JPEG')
+    preprocess_array(image_bytes, out=batch[1])
+    check("writes into a preallocated batch row", np.array_equal(batch[1], preprocess_array(image_bytes)) and not batch[0].any())
+
+    # rank_images decodes straight into one (n, 3, 224, 224) array; an undecodable image leaves no gap
+    seen = []
+    def uniform_proba(rows):
+        seen.append(rows)
+        return np.full((len(rows), 2), 0.5)
+    ranked = rank_images([('a.jpg', image_bytes), ('bad.jpg', b'not an image'), ('c.jpg', image_bytes)],
+                         1, False, preprocess_array, uniform_proba, ['x', 'y'])
+    rows = seen[0] if seen else None
+    check("rank_images passes one preallocated batch", isinstance(rows, np.ndarray) and rows.shape == (2, 3, 224, 224)
+          and np.array_equal(rows[1], preprocess_array(image_bytes)) and 'error' in ranked['images'][1])
+
+    try:
+        from torchvision import transforms
+        image_bytes = encode(photo.resize((1024, 768)), 'JPEG')
+        tensor = transforms.Compose([transforms.Resize((224, 224)), transforms.ToTensor()])(
+            Image.open(io.BytesIO(image_bytes)).convert('RGB'))
+        diff = np.abs(tensor.numpy() - preprocess_array(image_bytes, fast=False)).max()
+        check("reference equals torchvision Resize + ToTensor", diff <= 1 / 255, f"max {diff * 255:.2f}/255")
+    except ImportError:
+        print("⚠️ torchvision is not installed; skipped the torchvision comparison.")
+
+    print("\n✅ Image preprocessing checks passed." if all(results) else "\n❌ Image preprocessing checks failed.")
+    sys.exit(0 if all(results) else 1)
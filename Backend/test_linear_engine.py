@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+# Parity check: the folded linear models (ml_model/inference/linear_engine.py) must give the
+# same probabilities and classes as the sklearn scaler/preprocessor + LogisticRegression pipelines.
+# Run from the project root: python Backend/test_linear_engine.py
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Backend.utils.model_registry import model_registry
+from Backend.tabular_routes.diabetes import expected_features as diabetes_features
+from Backend.tabular_routes.heart_disease import expected_features as heart_features
+from Backend.tabular_routes.hypertension import expected_input_keys
+
+N_ROWS = 2000
+TOLERANCE = 1e-9
+rng = np.random.default_rng(0)
+
+
+def random_numeric_frame(columns, low=0.0, high=300.0):
+    return pd.DataFrame(rng.uniform(low, high, size=(N_ROWS, len(columns))), columns=columns)
+
+
+def random_hypertension_frame(preprocessor):
+    data = {'Age_yrs': rng.uniform(18, 90, N_ROWS), 'BMI': rng.uniform(15, 45, N_ROWS)}
+    for name, step, cols in preprocessor.transformers_:
+        if hasattr(step, 'categories_'):
+            for col, cats in zip(cols, step.categories_):
+                # Include an unseen category to cover handle_unknown='ignore'
+                choices = list(cats) + ['unseen']
+                data[col] = rng.choice(choices, N_ROWS).astype(object)
+    return pd.DataFrame(data)[expected_input_keys]
+
+
+def sklearn_proba(handle, df):
+    transformer = handle.scaler if handle.scaler is not None else handle.preprocessor
+    X = transformer.transform(df) if transformer is not None else df
+    return handle.model.predict_proba(X), handle.model.predict(X)
+
+
+def check(disease_id, df):
+    handle = model_registry.get(disease_id)
+    if handle.compiled is None:
+        print(f"❌ {disease_id}: no compiled linear model (is LINEAR_ENGINE disabled?)")
+        return False
+
+    expected_proba, expected_pred = sklearn_proba(handle, df)
+    proba = handle.compiled.predict_proba(df)
+    pred = handle.compiled.predict(df)
+    max_diff = float(np.max(np.abs(proba - expected_proba)))
+    same_classes = bool(np.array_equal(pred, expected_pred))
+
+    # Single-row latency: sklearn pipeline on a one-row DataFrame vs predict_records on a dict
+    record = df.iloc[0].to_dict()
+    start = time.perf_counter()
+    for _ in range(200):
+        sklearn_proba(handle, pd.DataFrame([record]))
+    sklearn_us = (time.perf_counter() - start) / 200 * 1e6
+    start = time.perf_counter()
+    for _ in range(200):
+        handle.compiled.predict_proba_records([record])
+    compiled_us = (time.perf_counter() - start) / 200 * 1e6
+
+    ok = max_diff <= TOLERANCE and same_classes
+    status = "✅" if ok else "❌"
+    print(f"{status} {disease_id}: max |Δproba| = {max_diff:.2e}, classes identical: {same_classes}, "
+          f"single row {sklearn_us:.0f}us -> {compiled_us:.0f}us")
+    return ok
+
+
+def check_multi_class():
+    # predict_proba must follow sklearn's own ovr/softmax choice, also once the deprecated
+    # multi_class attribute is gone (simulated by deleting it), without a FutureWarning
+    from sklearn.linear_model import LogisticRegression
+    from ml_model.inference.linear_engine import CompiledLinearModel
+
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        models = {
+            'default': LogisticRegression().fit(X, y),
+            'multinomial': LogisticRegression(multi_class='multinomial').fit(X, y),
+            'liblinear': LogisticRegression(solver='liblinear').fit(X, y),
+        }
+    without_attribute = LogisticRegression().fit(X, y)
+    del without_attribute.multi_class
+    ok = True
+    for name, model in models.items():
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', FutureWarning)
+            compiled = CompiledLinearModel.from_sklearn(model)
+            expected = model.predict_proba(X)
+        ok &= float(np.max(np.abs(compiled.predict_proba(X) - expected))) <= TOLERANCE
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        compiled = CompiledLinearModel.from_sklearn(without_attribute)
+    ok &= compiled.logit_scale == 1.0
+    print(f"{'✅' if ok else '❌'} multi_class resolution matches sklearn (default, multinomial, liblinear, attribute removed)")
+    return bool(ok)
+
+
+def check_report_path():
+    # The report path feeds hypertension's categoricals as spec codes; they must reach the model as
+    # the preprocessor's categories (an unknown category would score 0 and hide the input)
+    import logging
+    from Backend.utils.model_utils import predict_from_text, feature_plan, convert_to_feature_matrix
+    logging.disable(logging.INFO)
+    handle = model_registry.get('hypertension')
+    plan = feature_plan('hypertension')
+    base = {'Age_yrs': 55, 'Gender': 0, 'Education_Level': 1, 'Occupation': 2, 'Physical_Activity': 0,
+            'Smoking_Habits': 0, 'BMI': 27.0}
+    ok, scores = True, {}
+    for name in ('Gender', 'Education_Level', 'Occupation', 'Physical_Activity', 'Smoking_Habits'):
+        for code in (0, 1):
+            record = dict(base, **{name: code})
+            rows = plan.to_model_rows(convert_to_feature_matrix(record, 'hypertension'))
+            scores[name, code] = float(handle.compiled.predict_proba(rows)[0, 1])
+            expected = float(handle.model.predict_proba(
+                handle.preprocessor.transform(pd.DataFrame(rows, columns=plan.columns)))[0, 1])
+            ok &= abs(scores[name, code] - expected) <= TOLERANCE
+            ok &= predict_from_text(record, 'hypertension')['risk_level'] in ('Low', 'Medium', 'High')
+        ok &= scores[name, 0] != scores[name, 1]
+    ok &= not plan.unknown_labels(handle.preprocessor)
+    ok &= predict_from_text(dict(base, Occupation=7), 'hypertension')['risk_level'] == 'Error'
+    logging.disable(logging.NOTSET)
+    print(f"{'✅' if ok else '❌'} hypertension report path: every categorical changes the score, matches sklearn, "
+          f"out-of-range codes are refused")
+    return bool(ok)
+
+
+if __name__ == '__main__':
+    # The random hypertension rows include unseen categories on purpose
+    warnings.filterwarnings('ignore', message='Found unknown categories')
+    results = [
+        check('diabetes', random_numeric_frame(diabetes_features)),
+        check('heartDisease', random_numeric_frame(heart_features)),
+        check('hypertension', random_hypertension_frame(model_registry.get('hypertension').preprocessor)),
+        check_multi_class(),
+        check_report_path(),
+    ]
+    print("\n✅ All linear models match sklearn." if all(results) else "\n❌ Parity check failed.")
+    sys.exit(0 if all(results) else 1)
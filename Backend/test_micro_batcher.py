@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import threading
+
+# Checks the micro-batcher behind /predict-image (ml_model/inference/micro_batcher.py) with a
+# fake model whose cost is mostly fixed per forward pass, like batch-1 ResNet18 on CPU:
+# concurrent requests are merged, results go back to the right caller, errors reach every
+# caller of the failed batch, and a lone request waits at most max_wait_ms.
+# Run from the project root: python Backend/test_micro_batcher.py
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml_model.inference.micro_batcher import MicroBatcher
+
+FORWARD_SECONDS = 0.02
+results = []
+
+
+def check(name, condition, detail=''):
+    results.append(condition)
+    print(f"{'✅' if condition else '❌'} {name}{': ' + detail if detail else ''}")
+
+
+def fake_forward(items):
+    time.sleep(FORWARD_SECONDS)
+    if 'boom' in items:
+        raise ValueError("bad image in batch")
+    return [f"class-{item}" for item in items]
+
+
+def run_clients(batcher, n_clients):
+    answers = [None] * n_clients
+
+    def client(i):
+        answers[i] = batcher.predict(i)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return answers, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    batcher = MicroBatcher(fake_forward, max_batch=8, max_wait_ms=10)
+    answers, elapsed = run_clients(batcher, 32)
+    stats = batcher.stats()
+    check("every caller gets its own result", answers == [f"class-{i}" for i in range(32)])
+    check("concurrent requests share forward passes", stats['batches'] < 32,
+          f"32 requests in {stats['batches']} batches, {elapsed * 1000:.0f}ms "
+          f"(batch-1 would take ~{32 * FORWARD_SECONDS * 1000:.0f}ms)")
+    check("batch size capped at max_batch", stats['max_batch_seen'] <= 8, str(stats['batch_size_histogram']))
+
+    start = time.perf_counter()
+    batcher.predict(99)
+    lone = time.perf_counter() - start
+    check("lone request waits at most max_wait_ms", lone < FORWARD_SECONDS + 0.01 + 0.05, f"{lone * 1000:.1f}ms")
+
+    futures = [batcher.submit(item) for item in ('ok', 'boom')]
+    errors = [type(f.exception()).__name__ for f in futures]
+    check("a failed batch fails all its callers", errors == ['ValueError', 'ValueError'], str(errors))
+    check("worker survives a failed batch", batcher.predict(1) == 'class-1')
+
+    stats = batcher.stats()
+    check("metrics", stats['queue_depth'] == 0 and stats['errors'] == 1 and stats['submitted'] == stats['items'],
+          str({k: stats[k] for k in ('submitted', 'batches', 'mean_batch_size', 'max_queue_depth',
+                                     'mean_queue_wait_ms', 'mean_batch_run_ms')}))
+
+    print("\n✅ Micro-batcher checks passed." if all(results) else "\n❌ Micro-batcher checks failed.")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,139 @@
+import os
+import json
+import math
+import traceback
+
+# Rows sent to the model in a single predict/predict_proba call.
+# Large cohorts are split into chunks of this size so one request never builds a huge DataFrame.
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '512'))
+# Upper bound on the number of records accepted in one batch request.
+MAX_BATCH_ROWS = int(os.getenv('MAX_BATCH_ROWS', '50000'))
+
+
+def parse_batch_payload(req):
+    """
+    Reads the records of a batch prediction request.
+    Accepts a JSON array, a JSON object with a 'records' array, or an NDJSON body
+    (one JSON object per line, Content-Type application/x-ndjson).
+    Raises ValueError if the body cannot be parsed.
+    """
+    raw_body = req.get_data(cache=False, as_text=True)
+    if not raw_body or not raw_body.strip():
+        raise ValueError("Empty request body. Send a JSON array or NDJSON records.")
+
+    content_type = (req.content_type or '').lower()
+    is_ndjson = 'ndjson' in content_type or 'jsonlines' in content_type
+
+    records = None
+    if not is_ndjson:
+        try:
+            payload = json.loads(raw_body)
+        except json.JSONDecodeError:
+            # Body is not a single JSON document; fall back to NDJSON parsing below.
+            payload = None
+            is_ndjson = True
+        if payload is not None:
+            if isinstance(payload, dict) and isinstance(payload.get('records'), list):
+                records = payload['records']
+            elif isinstance(payload, list):
+                records = payload
+            else:
+                raise ValueError("Batch body must be a JSON array of records or an object with a 'records' array.")
+
+    if is_ndjson:
+        records = []
+        for line_num, line in enumerate(raw_body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on NDJSON line {line_num}: {e}")
+
+    if len(records) > MAX_BATCH_ROWS:
+        raise ValueError(f"Batch too large: {len(records)} records (limit is {MAX_BATCH_ROWS}).")
+    return records
+
+
+def finite_float(value):
+    """
+    float(value) for the batch row builders. Also rejects 'NaN' and 'Infinity' (which float()
+    accepts), so such a record fails validation on its own instead of in the model call.
+    """
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+def run_batch(records, build_row, predict_chunk, chunk_size=None):
+    """
+    Validates every record and runs the model once per chunk of valid rows.
+
+    build_row(record) must return the model-ready row for one record, or raise
+    ValueError/KeyError/TypeError with a message describing why the row is invalid.
+    predict_chunk(rows) receives a list of built rows and must return one result dict per row.
+
+    Returns a list with one entry per input record, in input order. Invalid rows carry an
+    'error' key instead of a prediction and never stop the rest of the batch. If a chunk's model
+    call fails, its rows are retried one at a time, so only the rows that fail on their own get
+    an error.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    results = [None] * len(records)
+
+    pending_indices = []
+    pending_rows = []
+
+    def _flush():
+        if not pending_rows:
+            return
+        try:
+            chunk_results = predict_chunk(pending_rows)
+            for idx, result in zip(pending_indices, chunk_results):
+                results[idx] = {"index": idx, **result}
+        except Exception as e:
+            print(f"⚠️ Batch chunk prediction failed ({e}); retrying its {len(pending_rows)} rows one by one.")
+            for idx, row in zip(pending_indices, pending_rows):
+                try:
+                    results[idx] = {"index": idx, **predict_chunk([row])[0]}
+                except Exception as row_error:
+                    print(f"❌ Batch row {idx} prediction failed: {row_error}")
+                    traceback.print_exc()
+                    results[idx] = {"index": idx, "error": f"Prediction failed for this record: {row_error}"}
+        pending_indices.clear()
+        pending_rows.clear()
+
+    for idx, record in enumerate(records):
+        if not isinstance(record, dict):
+            results[idx] = {"index": idx, "error": "Record must be a JSON object."}
+            continue
+        try:
+            row = build_row(record)
+        except KeyError as e:
+            results[idx] = {"index": idx, "error": f"Missing data for key: {e}"}
+            continue
+        except (ValueError, TypeError) as e:
+            results[idx] = {"index": idx, "error": str(e)}
+            continue
+
+        pending_indices.append(idx)
+        pending_rows.append(row)
+        if len(pending_rows) >= chunk_size:
+            _flush()
+
+    _flush()
+    return results
+
+
+def batch_summary(results):
+    """
+    Builds the JSON body returned by every /batch endpoint.
+    """
+    failed = sum(1 for r in results if 'error' in r)
+    return {
+        "count": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
@@ -0,0 +1,296 @@
+import json
+from dataclasses import dataclass, field as dataclass_field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
+# Declarative description of every report parameter per disease_id. It is the single source for:
+#   - the Gemini response schema (properties, enums, propertyOrdering),
+#   - the mock response used without an API key or while Gemini is down,
+#   - the model's feature vector layout (column order, defaults and categorical codes).
+# Specs are built once at import and are read-only, so the request path never builds a schema.
+# Fields are listed in feature vector order; fields with feature=False are only asked from Gemini.
+
+
+class FrozenSchema(dict):
+    """
+    Read-only dict for a precompiled schema or mock. `json` is its canonical (sorted-key) JSON,
+    computed once, which the shared Gemini client and the response cache use as the schema key.
+    It stays a dict so json.dumps and the SDK conversion accept it unchanged.
+    """
+    __slots__ = ('json',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.json = json.dumps(self, sort_keys=True)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Precompiled schemas are read-only; copy with dict(schema) to modify.")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenSchema, (dict(self),))
+
+
+def freeze(value):
+    """
+    Deep, read-only copy of a JSON-like value: dicts become FrozenSchema, lists become tuples.
+    """
+    if isinstance(value, dict):
+        return FrozenSchema({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class FeatureField:
+    """
+    One report parameter: its Gemini schema type, allowed values and mock value, its default
+    in the feature vector when the report does not provide it and, for text values, the
+    numeric code of each (lowercase) value. labels is the reverse, for coded fields of models
+    whose preprocessor was fitted on text: the category each code (its index) stands for.
+    """
+    name: str
+    type: str = 'NUMBER'
+    enum: Tuple = ()
+    nullable: bool = False
+    mock: Any = 0
+    default: Any = 0
+    feature: bool = True  # False: extracted for context only, not a model input
+    categories: Optional[Mapping[str, float]] = dataclass_field(default=None, hash=False, compare=False)
+    labels: Tuple[str, ...] = ()
+
+    @property
+    def schema(self):
+        field_schema = {"type": [self.type, "null"] if self.nullable else self.type}
+        if self.enum:
+            field_schema["enum"] = list(self.enum)
+        if self.labels:
+            field_schema["description"] = ", ".join(f"{code}: {label}" for code, label in enumerate(self.labels))
+        return field_schema
+
+
+@dataclass(frozen=True)
+class DiseaseSpec:
+    disease_id: str
+    fields: Tuple[FeatureField, ...]
+    schema: FrozenSchema
+    mock: FrozenSchema
+    feature_names: Tuple[str, ...]
+    feature_defaults: Tuple[Any, ...]
+
+    def mock_response(self):
+        """
+        Fresh, mutable copy of the mock response (callers add 'degraded' flags to it).
+        """
+        return dict(self.mock)
+
+
+def _number(name, mock=0, default=0, **kwargs):
+    return FeatureField(name, 'NUMBER', mock=mock, default=default, **kwargs)
+
+
+def _flag(name, mock=0, default=0):
+    return FeatureField(name, 'NUMBER', enum=(0, 1), mock=mock, default=default)
+
+
+def _coded(name, labels, mock, default=0):
+    return FeatureField(name, 'NUMBER', enum=tuple(range(len(labels))), mock=mock, default=default,
+                        labels=tuple(labels))
+
+
+def _choice(name, enum, mock, default=None, categories=None, **kwargs):
+    return FeatureField(name, 'STRING', enum=tuple(enum), mock=mock,
+                        default=enum[0] if default is None else default,
+                        categories=MappingProxyType(categories) if categories is not None else None, **kwargs)
+
+
+YES_NO = ("yes", "no")
+PRESENT = ("notpresent", "present")
+ZERO_ONE = ("0", "1")  # the cancer model's flags are '0'/'1' strings, as in the cancer blueprint
+
+# Numeric codes of text values, keyed in lowercase (same codes as the tabular blueprints)
+YES_NO_CODES = {"no": 0, "yes": 1}
+PRESENT_CODES = {"notpresent": 0, "present": 1}
+
+DISEASE_FIELDS = {
+    'diabetes': (
+        _number("pregnancies", 1),
+        _number("glucose", 120.0),
+        _number("blood_pressure", 70.0),
+        _number("skin_thickness", 30.0),
+        _number("insulin", 150.0),
+        _number("bmi", 25.5),
+        _number("diabetes_pedigree_function", 0.5),
+        _number("age", 30),
+        _choice("gender", ("male", "female", "other", "unknown"), "female", feature=False),
+    ),
+    'heartDisease': (
+        _number("age", 55),
+        _flag("sex"),  # 0: male, 1: female
+        _number("chest_pain_type", 1, enum=(0, 1, 2, 3)),
+        _number("trestbps", 130),
+        _number("cholesterol", 220),
+        _flag("fbs"),
+        _number("restecg", 1, enum=(0, 1, 2)),
+        _number("thalach", 150),
+        _flag("exang", 1),
+        _number("oldpeak", 1.5),
+        _number("slope", 2, enum=(0, 1, 2)),
+        _number("ca", 1, enum=(0, 1, 2, 3)),
+        _number("thal", 2, enum=(1, 2, 3)),
+    ),
+    # The preprocessor one-hot encodes the categories' text (labels); codes are their sorted indices
+    'hypertension': (
+        _number("Age_yrs", 60),
+        _coded("Gender", ("female", "male"), 1),
+        _coded("Education_Level", ("elementary", "junior high", "senior high or higher"), 2),
+        _coded("Occupation", ("civil servant/ non-government employee", "farming",
+                              "self-employee/subsistence", "unemployed/retired"), 0),
+        _coded("Physical_Activity", ("30 min or more", "less than 30 min"), 1),
+        _coded("Smoking_Habits", ("no smoker", "smoker"), 1),
+        _number("BMI", 30.2),
+    ),
+    'ckd': (
+        _number("age", 50),
+        _number("blood_pressure", 130),
+        _number("specific_gravity", 1.015),
+        _number("albumin", 2, enum=(0, 1, 2, 3, 4, 5)),
+        _number("sugar", 1, enum=(0, 1, 2, 3, 4, 5)),
+        _number("blood_glucose_random", 150),
+        _number("blood_urea", 50),
+        _number("serum_creatinine", 2.0),
+        _number("sodium", 135),
+        _number("potassium", 4.5),
+        _number("hemoglobin", 10.0),
+        _number("packed_cell_volume", 30),
+        _number("white_blood_cell_count", 8000),
+        _number("red_blood_cell_count", 4.0),
+        _choice("pus_cell", ("normal", "abnormal"), "abnormal", categories={"normal": 0, "abnormal": 1}),
+        _choice("pus_cell_clumps", PRESENT, "present", categories=PRESENT_CODES),
+        _choice("bacteria", PRESENT, "notpresent", categories=PRESENT_CODES),
+        _choice("hypertension", YES_NO, "yes", default="no", categories=YES_NO_CODES),
+        _choice("diabetes_mellitus", YES_NO, "yes", default="no", categories=YES_NO_CODES),
+        _choice("coronary_artery_disease", YES_NO, "no", default="no", categories=YES_NO_CODES),
+        _choice("appetite", ("good", "poor"), "poor", categories={"good": 0, "poor": 1}),
+        _choice("pedal_edema", YES_NO, "yes", default="no", categories=YES_NO_CODES),
+        _choice("anemia", YES_NO, "yes", default="no", categories=YES_NO_CODES),
+    ),
+    'liverDisease': (
+        _number("Age", 50),
+        _flag("Gender"),  # 0: male, 1: female
+        _number("Total_Bilirubin", 2.5),
+        _number("Direct_Bilirubin", 0.8),
+        _number("Alkaline_Phosphotase", 150),
+        _number("Alamine_Aminotransferase", 60),
+        _number("Aspartate_Aminotransferase", 70),
+        _number("Total_Protiens", 6.8),
+        _number("Albumin", 3.0),
+        _number("Albumin_and_Globulin_Ratio", 0.9),
+    ),
+    'thyroidDisease': (
+        _number("age", 40),
+        _flag("sex", 1),
+        _flag("on_thyroxine"),
+        _flag("query_on_thyroxine"),
+        _flag("on_antithyroid_meds"),
+        _flag("sick"),
+        _flag("pregnant"),
+        _flag("thyroid_surgery"),
+        _flag("I131_treatment"),
+        _flag("query_hypothyroid", 1),
+        _flag("query_hyperthyroid"),
+        _flag("lithium"),
+        _flag("goitre"),
+        _flag("tumor"),
+        _flag("hypopituitary"),
+        _flag("psych"),
+        _flag("TSH_measured", 1),
+        _number("TSH", 5.2, default=-1),
+        _flag("T3_measured", 1),
+        _number("T3", 1.5, default=-1),
+        _flag("TT4_measured", 1),
+        _number("TT4", 90.0, default=-1),
+        _flag("T4U_measured", 1),
+        _number("T4U", 0.8, default=-1),
+        _flag("FTI_measured", 1),
+        _number("FTI", 110.0, default=-1),
+        _flag("TBG_measured"),
+        _number("TBG", -1, default=-1),
+    ),
+    'cancerDisease': (
+        _number("age", 46.0),
+        _choice("gender", ("Male", "Female"), "Male", categories={"male": 0, "female": 1}),
+        _choice("smokingstatus", ("Never Smoked", "Former Smoker", "Current Smoker"), "Never Smoked",
+                categories={"never smoked": 0, "former smoker": 1, "current smoker": 2,
+                            "never": 0, "former": 1, "current": 2}),
+        _choice("alcoholconsumption", ("None", "Moderate", "Heavy"), "None",
+                categories={"none": 0, "moderate": 1, "heavy": 2}),
+        _number("bmi", 27.8),
+        _number("physicalactivity_hoursperweek", 29.8),
+        _choice("familyhistorycancer", ZERO_ONE, "0"),
+        _choice("chronicdisease_hypertension", ZERO_ONE, "0"),
+        _choice("chronicdisease_diabetes", ZERO_ONE, "0"),
+        _number("genomicmarker_1", 1),
+        _number("genomicmarker_2", 0),
+        _number("tumorsize_mm", 9.8),
+        # Often missing from reports, so Gemini may return null
+        _number("tumormarkerlevel", None, nullable=True),
+        _choice("biopsyresult", ("Benign", "Malignant", "Not Performed", "Atypical"), "Benign",
+                categories={"benign": 0, "malignant": 1, "not performed": 2, "atypical": 3}),
+        _number("bloodtest_markera", 124.6),
+        _number("bloodtest_markerb", 1.3),
+        _choice("symptoms_fatigue", ZERO_ONE, "0"),
+        _choice("symptoms_unexplainedweightloss", ZERO_ONE, "0"),
+    ),
+}
+
+
+def _build_spec(disease_id, fields):
+    names = [field.name for field in fields]
+    schema = {
+        "type": "OBJECT",
+        "properties": {"disease": {"type": "STRING"}, **{field.name: field.schema for field in fields}},
+        "required": ["disease"],
+        "propertyOrdering": ["disease"] + names,
+    }
+    mock = {"disease": disease_id, **{field.name: field.mock for field in fields}}
+    model_fields = [field for field in fields if field.feature]
+    return DiseaseSpec(
+        disease_id=disease_id,
+        fields=tuple(fields),
+        schema=freeze(schema),
+        mock=freeze(mock),
+        feature_names=tuple(field.name for field in model_fields),
+        feature_defaults=tuple(field.default for field in model_fields),
+    )
+
+
+FEATURE_SPECS = MappingProxyType({disease_id: _build_spec(disease_id, fields)
+                                  for disease_id, fields in DISEASE_FIELDS.items()})
+
+
+def get_spec(disease_id):
+    """
+    The DiseaseSpec for disease_id, or None for diseases without one.
+    """
+    return FEATURE_SPECS.get(disease_id)
+
+
+@lru_cache(maxsize=None)
+def merged_schema(disease_ids):
+    """
+    One schema with a nested object per disease_id (a tuple), for multi-disease Gemini calls.
+    Diseases keep separate namespaces because several field names (e.g. 'gender', 'hypertension')
+    mean different things for different models.
+    """
+    specs = [FEATURE_SPECS[d] for d in disease_ids if d in FEATURE_SPECS]
+    return freeze({
+        "type": "OBJECT",
+        "properties": {spec.disease_id: spec.schema for spec in specs},
+        "required": [spec.disease_id for spec in specs],
+        "propertyOrdering": [spec.disease_id for spec in specs],
+    })
@@ -0,0 +1,492 @@
+import os
+import re
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Backend.gemini.gemini_client import _get_gemini_response_schema
+
+# Deterministic regex/dictionary extraction of report parameters, keyed exactly like the Gemini
+# response schemas. Machine-generated lab reports ("Glucose: 142 mg/dL", "Serum Creatinine 2.1")
+# are handled locally; Gemini is only called when too few fields were found.
+LOCAL_EXTRACTOR_ENABLED = os.getenv('LOCAL_EXTRACTOR_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+# Share of a disease's fields that must be found locally to skip Gemini
+LOCAL_EXTRACTOR_MIN_COVERAGE = float(os.getenv('LOCAL_EXTRACTOR_MIN_COVERAGE', '0.8'))
+
+# --- Units -----------------------------------------------------------------------------------
+# Factors converting a reported unit into the unit the models were trained on.
+# Units not listed (e.g. IU/L, %) are taken as already being in the model's unit.
+UNIT_CONVERSIONS = {
+    'glucose': {'mg/dl': 1.0, 'mmol/l': 18.016},
+    'urea': {'mg/dl': 1.0, 'mmol/l': 6.006},
+    # Blood urea nitrogen reported instead of urea: urea = BUN x 2.14 (mg/dL)
+    'bun': {'mg/dl': 2.14, 'mmol/l': 6.006, '': 2.14},
+    'creatinine': {'mg/dl': 1.0, 'umol/l': 1 / 88.42},
+    'bilirubin': {'mg/dl': 1.0, 'umol/l': 1 / 17.1},
+    'cholesterol': {'mg/dl': 1.0, 'mmol/l': 38.67},
+    'hemoglobin': {'g/dl': 1.0, 'g/l': 0.1, 'mmol/l': 1.611},
+    'protein': {'g/dl': 1.0, 'g/l': 0.1},
+    'insulin': {'uu/ml': 1.0, 'uiu/ml': 1.0, 'miu/l': 1.0, 'pmol/l': 1 / 6.0},
+    'wbc': {'/ul': 1.0, 'cells/ul': 1.0, 'x10^3/ul': 1000.0, '10^3/ul': 1000.0, 'k/ul': 1000.0,
+            'thou/ul': 1000.0, 'x10^9/l': 1000.0, '10^9/l': 1000.0},
+    'rbc': {'million/ul': 1.0, 'mill/ul': 1.0, 'x10^6/ul': 1.0, '10^6/ul': 1.0, 'm/ul': 1.0,
+            'x10^12/l': 1.0, '10^12/l': 1.0},
+    'weight': {'kg': 1.0, 'kgs': 1.0, 'lb': 0.45359, 'lbs': 0.45359},
+    'height': {'cm': 1.0, 'm': 100.0, 'in': 2.54, 'inch': 2.54, 'inches': 2.54},
+    'size_mm': {'mm': 1.0, 'cm': 10.0},
+}
+
+
+def _normalize_unit(unit):
+    unit = (unit or '').lower().replace('µ', 'u').replace('μ', 'u').replace('×', 'x').replace('*', 'x')
+    unit = re.sub(r'\s+', '', unit).rstrip('.')
+    unit = unit.replace('cumm', 'ul').replace('mm3', 'ul').replace('mcl', 'ul').replace('10e', '10^')
+    return unit
+
+
+def _convert(value, unit, unit_kind):
+    if unit_kind is None:
+        return value
+    factors = UNIT_CONVERSIONS[unit_kind]
+    factor = factors.get(_normalize_unit(unit))
+    if factor is None:
+        factor = factors.get('', 1.0)
+    return round(value * factor, 4)
+
+
+# --- Label synonyms --------------------------------------------------------------------------
+# Tried in order: the first label found in the report wins, so more specific labels come first.
+AGE_LABELS = ['age']
+SEX_LABELS = ['sex', 'gender']
+GLUCOSE_LABELS = ['fasting blood glucose', 'fasting plasma glucose', 'fasting blood sugar', 'glucose fasting',
+                  'fasting glucose', 'plasma glucose', 'blood glucose', 'blood sugar', 'glucose', 'fbs']
+RANDOM_GLUCOSE_LABELS = ['random blood glucose', 'random blood sugar', 'blood glucose random', 'glucose random',
+                         'random glucose', 'rbs']
+UREA_LABELS = ['blood urea', 'serum urea', 'urea']
+BUN_LABELS = ['blood urea nitrogen', 'bun']
+CREATININE_LABELS = ['serum creatinine', 's creatinine', 'creatinine']
+SODIUM_LABELS = ['serum sodium', 'sodium', 'na+']
+POTASSIUM_LABELS = ['serum potassium', 'potassium', 'k+']
+HEMOGLOBIN_LABELS = ['haemoglobin', 'hemoglobin', 'hgb', 'hb']
+PCV_LABELS = ['packed cell volume', 'haematocrit', 'hematocrit', 'pcv', 'hct']
+WBC_LABELS = ['total leucocyte count', 'total leukocyte count', 'white blood cell count', 'white blood cells',
+              'wbc count', 'total wbc count', 'wbc', 'tlc']
+RBC_LABELS = ['red blood cell count', 'total rbc count', 'rbc count', 'red blood cells', 'rbc']
+BMI_LABELS = ['body mass index', 'bmi']
+WEIGHT_LABELS = ['body weight', 'weight', 'wt']
+HEIGHT_LABELS = ['height', 'ht']
+CHOLESTEROL_LABELS = ['total cholesterol', 'serum cholesterol', 'cholesterol']
+SMOKING_LABELS = ['smoking status', 'smoking habits', 'smoking', 'smoker', 'tobacco use']
+
+YES_NO = {
+    'yes': ['yes', 'present', 'positive', '+ve', 'known case', 'true', 'y'],
+    'no': ['not present', 'no', 'absent', 'negative', '-ve', 'nil', 'none', 'false', 'n'],
+}
+PRESENT = {'present': YES_NO['yes'], 'notpresent': YES_NO['no']}
+FLAG = {1: YES_NO['yes'], 0: YES_NO['no']}
+STRING_FLAG = {'1': YES_NO['yes'], '0': YES_NO['no']}
+
+# Field rules per disease_id, one per key of _get_gemini_response_schema(disease_id):
+#   ('number', labels, unit_kind)      first number after a label, converted to the model's unit
+#   ('choice', labels, {value: words}) first listed word after a label, mapped to the schema value
+#   ('age',), ('sex', {'male': v, 'female': v}), ('bp', 'systolic' | 'diastolic'), ('bmi',),
+#   ('urea',)                          blood urea, or blood urea nitrogen converted to urea
+#   ('measured', field)                1 if `field` was found in the report, else 0
+#   ('fasting_sugar_flag',)            1 if fasting glucose > 120 mg/dL, else 0
+FIELD_RULES = {
+    'diabetes': {
+        'pregnancies': ('number', ['number of pregnancies', 'no of pregnancies', 'pregnancies', 'gravida'], None),
+        'glucose': ('number', GLUCOSE_LABELS, 'glucose'),
+        'blood_pressure': ('bp', 'diastolic'),
+        'skin_thickness': ('number', ['triceps skin fold thickness', 'triceps skinfold thickness',
+                                      'skin fold thickness', 'skinfold thickness', 'skin thickness'], None),
+        'insulin': ('number', ['serum insulin', 'fasting insulin', 'insulin'], 'insulin'),
+        'bmi': ('bmi',),
+        'diabetes_pedigree_function': ('number', ['diabetes pedigree function', 'pedigree function', 'dpf'], None),
+        'age': ('age',),
+        'gender': ('sex', {'male': 'male', 'female': 'female'}),
+    },
+    'heartDisease': {
+        'age': ('age',),
+        'sex': ('sex', {'male': 0, 'female': 1}),
+        'chest_pain_type': ('choice', ['chest pain type', 'chest pain', 'cp'], {
+            0: ['typical angina', 'typical'], 1: ['atypical angina', 'atypical'],
+            2: ['non-anginal', 'non anginal', 'nonanginal'], 3: ['asymptomatic'],
+        }),
+        'trestbps': ('bp', 'systolic'),
+        'cholesterol': ('number', CHOLESTEROL_LABELS, 'cholesterol'),
+        'fbs': ('fasting_sugar_flag',),
+        'restecg': ('choice', ['resting ecg', 'resting electrocardiographic results', 'restecg', 'ecg'], {
+            0: ['normal'], 1: ['st-t wave abnormality', 'st-t abnormality', 'st t wave', 'st-t'],
+            2: ['left ventricular hypertrophy', 'lvh'],
+        }),
+        'thalach': ('number', ['maximum heart rate achieved', 'max heart rate', 'maximum heart rate',
+                               'peak heart rate', 'thalach'], None),
+        'exang': ('choice', ['exercise induced angina', 'exercise-induced angina', 'exang'], FLAG),
+        'oldpeak': ('number', ['st depression', 'oldpeak'], None),
+        'slope': ('choice', ['slope of peak exercise st segment', 'st slope', 'slope'], {
+            0: ['upsloping', 'up sloping'], 1: ['flat'], 2: ['downsloping', 'down sloping'],
+        }),
+        'ca': ('number', ['number of major vessels', 'major vessels', 'ca'], None),
+        'thal': ('choice', ['thalassemia', 'thalassaemia', 'thal'], {
+            1: ['normal'], 2: ['fixed defect', 'fixed'], 3: ['reversible defect', 'reversable defect', 'reversible'],
+        }),
+    },
+    'hypertension': {
+        # Categorical codes index the field's labels in feature_specs.py (the preprocessor's sorted categories)
+        'Age_yrs': ('age',),
+        'Gender': ('sex', {'female': 0, 'male': 1}),
+        'Education_Level': ('choice', ['education level', 'education'], {
+            0: ['elementary', 'primary'], 1: ['junior high'], 2: ['senior high', 'college', 'university', 'graduate'],
+        }),
+        'Occupation': ('choice', ['occupation'], {
+            0: ['civil servant', 'employee', 'employed'], 1: ['farming', 'farmer'],
+            2: ['self-employee', 'self employed', 'self-employed', 'subsistence'], 3: ['unemployed', 'retired'],
+        }),
+        'Physical_Activity': ('choice', ['physical activity', 'exercise'], {
+            0: ['30 min or more', 'more than 30 min', 'active'], 1: ['less than 30 min', 'sedentary', 'inactive'],
+        }),
+        'Smoking_Habits': ('choice', SMOKING_LABELS, {
+            0: ['no smoker', 'non-smoker', 'non smoker', 'never', 'no'], 1: ['smoker', 'current', 'yes'],
+        }),
+        'BMI': ('bmi',),
+    },
+    'ckd': {
+        'age': ('age',),
+        'blood_pressure': ('bp', 'diastolic'),
+        'specific_gravity': ('number', ['specific gravity', 'sp gravity', 'sg'], None),
+        'albumin': ('number', ['urine albumin', 'albumin urine', 'albuminuria', 'albumin'], None),
+        'sugar': ('number', ['urine sugar', 'urine glucose', 'sugar urine', 'sugar'], None),
+        'blood_glucose_random': ('number', RANDOM_GLUCOSE_LABELS + GLUCOSE_LABELS, 'glucose'),
+        'blood_urea': ('urea',),
+        'serum_creatinine': ('number', CREATININE_LABELS, 'creatinine'),
+        'sodium': ('number', SODIUM_LABELS, None),
+        'potassium': ('number', POTASSIUM_LABELS, None),
+        'hemoglobin': ('number', HEMOGLOBIN_LABELS, 'hemoglobin'),
+        'packed_cell_volume': ('number', PCV_LABELS, None),
+        'white_blood_cell_count': ('number', WBC_LABELS, 'wbc'),
+        'red_blood_cell_count': ('number', RBC_LABELS, 'rbc'),
+        'pus_cell': ('choice', ['pus cells', 'pus cell'], {
+            'abnormal': ['abnormal', 'plenty', 'numerous'], 'normal': ['normal', 'nil', 'absent', '0-'],
+        }),
+        'pus_cell_clumps': ('choice', ['pus cell clumps', 'pus clumps'], PRESENT),
+        'bacteria': ('choice', ['bacteria'], PRESENT),
+        'hypertension': ('choice', ['hypertension', 'htn'], YES_NO),
+        'diabetes_mellitus': ('choice', ['diabetes mellitus', 'diabetes', 'dm'], YES_NO),
+        'coronary_artery_disease': ('choice', ['coronary artery disease', 'cad'], YES_NO),
+        'appetite': ('choice', ['appetite'], {'good': ['good', 'normal'], 'poor': ['poor', 'reduced', 'loss']}),
+        'pedal_edema': ('choice', ['pedal edema', 'pedal oedema'], YES_NO),
+        'anemia': ('choice', ['anemia', 'anaemia'], YES_NO),
+    },
+    'liverDisease': {
+        'Age': ('age',),
+        'Gender': ('sex', {'male': 0, 'female': 1}),
+        'Total_Bilirubin': ('number', ['total bilirubin', 'bilirubin total', 'serum bilirubin', 't bilirubin'], 'bilirubin'),
+        'Direct_Bilirubin': ('number', ['direct bilirubin', 'bilirubin direct', 'conjugated bilirubin',
+                                        'd bilirubin'], 'bilirubin'),
+        'Alkaline_Phosphotase': ('number', ['alkaline phosphatase', 'alkaline phosphotase', 'alk phos', 'alp'], None),
+        'Alamine_Aminotransferase': ('number', ['alanine aminotransferase', 'alamine aminotransferase', 'sgpt', 'alt'], None),
+        'Aspartate_Aminotransferase': ('number', ['aspartate aminotransferase', 'sgot', 'ast'], None),
+        'Total_Protiens': ('number', ['total proteins', 'total protein', 'serum protein', 'total protiens'], 'protein'),
+        'Albumin': ('number', ['serum albumin', 'albumin'], 'protein'),
+        'Albumin_and_Globulin_Ratio': ('number', ['albumin and globulin ratio', 'albumin globulin ratio',
+                                                  'albumin/globulin ratio', 'a/g ratio', 'a:g ratio', 'ag ratio'], None),
+    },
+    'thyroidDisease': {
+        'age': ('age',),
+        'sex': ('sex', {'male': 0, 'female': 1}),
+        'on_thyroxine': ('choice', ['on thyroxine'], FLAG),
+        'query_on_thyroxine': ('choice', ['query on thyroxine'], FLAG),
+        'on_antithyroid_meds': ('choice', ['on antithyroid medication', 'on antithyroid meds', 'antithyroid'], FLAG),
+        'sick': ('choice', ['sick'], FLAG),
+        'pregnant': ('choice', ['pregnant', 'pregnancy'], FLAG),
+        'thyroid_surgery': ('choice', ['thyroid surgery'], FLAG),
+        'I131_treatment': ('choice', ['i131 treatment', 'radioiodine'], FLAG),
+        'query_hypothyroid': ('choice', ['query hypothyroid'], FLAG),
+        'query_hyperthyroid': ('choice', ['query hyperthyroid'], FLAG),
+        'lithium': ('choice', ['lithium'], FLAG),
+        'goitre': ('choice', ['goitre', 'goiter'], FLAG),
+        'tumor': ('choice', ['tumor', 'tumour'], FLAG),
+        'hypopituitary': ('choice', ['hypopituitary'], FLAG),
+        'psych': ('choice', ['psych'], FLAG),
+        'TSH_measured': ('measured', 'TSH'),
+        'TSH': ('number', ['thyroid stimulating hormone', 'tsh'], None),
+        'T3_measured': ('measured', 'T3'),
+        'T3': ('number', ['total t3', 'triiodothyronine', 't3'], None),
+        'TT4_measured': ('measured', 'TT4'),
+        'TT4': ('number', ['total t4', 'total thyroxine', 'tt4', 't4'], None),
+        'T4U_measured': ('measured', 'T4U'),
+        'T4U': ('number', ['thyroxine uptake', 't4 uptake', 't4u'], None),
+        'FTI_measured': ('measured', 'FTI'),
+        'FTI': ('number', ['free thyroxine index', 'free t4 index', 'fti'], None),
+        'TBG_measured': ('measured', 'TBG'),
+        'TBG': ('number', ['thyroxine binding globulin', 'tbg'], None),
+    },
+    'cancerDisease': {
+        'age': ('age',),
+        'gender': ('sex', {'male': 'Male', 'female': 'Female'}),
+        'smokingstatus': ('choice', SMOKING_LABELS, {
+            'Never Smoked': ['never smoked', 'never', 'non-smoker', 'non smoker', 'no'],
+            'Former Smoker': ['former smoker', 'former', 'ex-smoker', 'quit'],
+            'Current Smoker': ['current smoker', 'current', 'smoker', 'yes'],
+        }),
+        'alcoholconsumption': ('choice', ['alcohol consumption', 'alcohol intake', 'alcohol'], {
+            'None': ['none', 'never', 'no', 'nil'], 'Moderate': ['moderate', 'occasional', 'social'],
+            'Heavy': ['heavy', 'daily', 'high'],
+        }),
+        'bmi': ('bmi',),
+        'physicalactivity_hoursperweek': ('number', ['physical activity', 'exercise'], None),
+        'familyhistorycancer': ('choice', ['family history of cancer', 'family history cancer',
+                                           'family history'], STRING_FLAG),
+        'chronicdisease_hypertension': ('choice', ['hypertension', 'htn'], STRING_FLAG),
+        'chronicdisease_diabetes': ('choice', ['diabetes mellitus', 'diabetes'], STRING_FLAG),
+        'genomicmarker_1': ('number', ['genomic marker 1', 'genomicmarker 1', 'genomic marker1'], None),
+        'genomicmarker_2': ('number', ['genomic marker 2', 'genomicmarker 2', 'genomic marker2'], None),
+        'tumorsize_mm': ('number', ['tumor size', 'tumour size', 'lesion size', 'mass size'], 'size_mm'),
+        'tumormarkerlevel': ('number', ['tumor marker level', 'tumour marker level', 'tumor marker'], None),
+        'biopsyresult': ('choice', ['biopsy result', 'biopsy', 'histopathology'], {
+            'Malignant': ['malignant', 'carcinoma'], 'Benign': ['benign'], 'Atypical': ['atypical'],
+            'Not Performed': ['not performed', 'not done', 'pending'],
+        }),
+        'bloodtest_markera': ('number', ['blood test marker a', 'bloodtest marker a', 'marker a'], None),
+        'bloodtest_markerb': ('number', ['blood test marker b', 'bloodtest marker b', 'marker b'], None),
+        'symptoms_fatigue': ('choice', ['fatigue'], STRING_FLAG),
+        'symptoms_unexplainedweightloss': ('choice', ['unexplained weight loss', 'weight loss'], STRING_FLAG),
+    },
+}
+
+# Fields that lab reports rarely state and that have a safe default (0 = "no" / "not measured").
+# They are filled when found but do not count towards coverage.
+DEFAULTED_FIELDS = {
+    'thyroidDisease': {'on_thyroxine', 'query_on_thyroxine', 'on_antithyroid_meds', 'sick', 'pregnant',
+                       'thyroid_surgery', 'I131_treatment', 'query_hypothyroid', 'query_hyperthyroid', 'lithium',
+                       'goitre', 'tumor', 'hypopituitary', 'psych', 'TSH_measured', 'T3_measured', 'TT4_measured',
+                       'T4U_measured', 'FTI_measured', 'TBG_measured', 'TBG'},
+}
+
+
+# --- Patterns --------------------------------------------------------------------------------
+_label_pattern_cache = {}
+
+
+def _label_pattern(label):
+    """
+    Regex matching the label as whole words, tolerant to OCR spacing, dots and dashes
+    ("S. Creatinine", "Glucose-Fasting"), followed by an optional "(abbreviation or unit)" and separator.
+    Labels that do not mention urine never match right after "urine" ("Urine Albumin" is not serum albumin).
+    """
+    if label not in _label_pattern_cache:
+        parts = [re.escape(part) for part in re.split(r'[\s.\-_]+', label) if part]
+        guard = '' if 'urine' in label else r'(?<!urine )(?<!urine)'
+        _label_pattern_cache[label] = (
+            guard + r'(?<![a-z0-9])' + r'[\s.\-_]*'.join(parts) + r'(?![a-z0-9])'
+            r'(?:\s*\((?P<paren>[^)\n]{0,25})\))?\s*(?:[:=\-–]\s*)?'
+        )
+    return _label_pattern_cache[label]
+
+
+_NUMBER = r'(?:[<>≤≥]\s*)?(?P<value>\d+(?:\.\d+)?)'
+_UNIT = r'(?:[ \t]*(?P<unit>(?:x\s*)?(?:10\s*\^?\s*\d+\s*)?[a-zµμ/%][\w/µμ%^.]*))?'
+_compiled = {}
+
+
+def _compile(pattern):
+    if pattern not in _compiled:
+        _compiled[pattern] = re.compile(pattern, re.IGNORECASE)
+    return _compiled[pattern]
+
+
+def _search(text, labels, value_pattern):
+    # Labels are tried in order, so "random blood sugar" wins over a "glucose" line higher up
+    for label in labels:
+        match = _compile(_label_pattern(label) + value_pattern).search(text)
+        if match:
+            return match
+    return None
+
+
+def _find_number(text, labels, unit_kind=None):
+    match = _search(text, labels, _NUMBER + _UNIT)
+    if not match:
+        return None
+    value = float(match.group('value'))
+    # "Creatinine (umol/L): 186" carries the unit in the label
+    unit = match.group('unit') or match.group('paren')
+    return _convert(value, unit, unit_kind)
+
+
+def _find_urea(text):
+    urea = _find_number(text, UREA_LABELS, 'urea')
+    return urea if urea is not None else _find_number(text, BUN_LABELS, 'bun')
+
+
+def _find_choice(text, labels, options):
+    """
+    The option whose word appears first in the rest of the labelled line ("Pus Cells: Abnormal").
+    """
+    match = _search(text, labels, r'(?P<rest>[^\n]{0,40})')
+    if not match:
+        return None
+    rest = match.group('rest').lower()
+    best = None
+    for value, words in options.items():
+        for word in words:
+            hit = re.search(r'(?<![a-z0-9])' + re.escape(word) + r'(?![a-z0-9])', rest)
+            if hit and (best is None or (hit.start(), -len(word)) < best[0]):
+                best = ((hit.start(), -len(word)), value)
+    return best[1] if best else None
+
+
+_AGE_SEX = re.compile(
+    r'(?<![a-z])age\s*(?:/|and|&)\s*(?:sex|gender)\s*[:=\-]?\s*(?P<age>\d{1,3})\s*(?:y(?:ea)?rs?|y)?\.?\s*'
+    r'[/,]\s*(?P<sex>male|female|m|f)(?![a-z])', re.IGNORECASE)
+_AGE = re.compile(r'(?<![a-z])age(?:\s*\(\s*y(?:ea)?rs?\s*\))?\s*[:=\-]?\s*(?P<age>\d{1,3})(?!\d)', re.IGNORECASE)
+_AGE_YEARS = re.compile(r'(?<!\d)(?P<age>\d{1,3})\s*(?:years?|yrs?)(?:\s*old)?(?![a-z])', re.IGNORECASE)
+_SEX = re.compile(r'(?<![a-z])(?:sex|gender)\s*[:=\-]?\s*(?P<sex>male|female|m|f)(?![a-z])', re.IGNORECASE)
+_BP = re.compile(
+    r'(?<![a-z])(?:blood\s*pressure|b\.?\s*p\.?)(?:\s*\([^)\n]{0,15}\))?\s*[:=\-]?\s*'
+    r'(?P<systolic>\d{2,3})\s*/\s*(?P<diastolic>\d{2,3})', re.IGNORECASE)
+
+
+def _find_age(text):
+    for pattern in (_AGE_SEX, _AGE, _AGE_YEARS):
+        match = pattern.search(text)
+        if match and 0 < int(match.group('age')) < 120:
+            return float(match.group('age'))
+    return None
+
+
+def _find_sex(text):
+    for pattern in (_AGE_SEX, _SEX):
+        match = pattern.search(text)
+        if match:
+            return 'female' if match.group('sex').lower().startswith('f') else 'male'
+    if re.search(r'(?<![a-z])(?:mrs|ms|miss)\.?\s', text, re.IGNORECASE):
+        return 'female'
+    if re.search(r'(?<![a-z])mr\.?\s', text, re.IGNORECASE):
+        return 'male'
+    return None
+
+
+def _find_bp(text, which):
+    match = _BP.search(text)
+    if match:
+        return float(match.group(which))
+    labels = {'systolic': ['systolic blood pressure', 'systolic bp', 'systolic', 'sbp',
+                           'resting blood pressure', 'trestbps'],
+              'diastolic': ['diastolic blood pressure', 'diastolic bp', 'diastolic', 'dbp']}[which]
+    return _find_number(text, labels)
+
+
+def _find_bmi(text):
+    bmi = _find_number(text, BMI_LABELS)
+    if bmi is not None:
+        return bmi
+    weight = _find_number(text, WEIGHT_LABELS, 'weight')
+    height = _find_number(text, HEIGHT_LABELS, 'height')
+    if weight and height:
+        return round(weight / (height / 100.0) ** 2, 1)
+    return None
+
+
+def field_keywords(disease_id):
+    """
+    Every label the rules for disease_id look for (used to find the relevant lines of a long report).
+    """
+    rules = FIELD_RULES.get(disease_id, {})
+    labels = []
+    for rule in rules.values():
+        kind = rule[0]
+        if kind in ('number', 'choice'):
+            labels.extend(rule[1])
+        elif kind == 'age':
+            labels.extend(AGE_LABELS)
+        elif kind == 'sex':
+            labels.extend(SEX_LABELS)
+        elif kind == 'bp':
+            labels.extend(['blood pressure', 'bp', rule[1]])
+        elif kind == 'bmi':
+            labels.extend(BMI_LABELS + WEIGHT_LABELS + HEIGHT_LABELS)
+        elif kind == 'urea':
+            labels.extend(UREA_LABELS + BUN_LABELS)
+        elif kind == 'fasting_sugar_flag':
+            labels.extend(GLUCOSE_LABELS)
+    return list(dict.fromkeys(labels))
+
+
+def extractor_version(disease_id):
+    """
+    The rules and settings behind extract_fields(text, disease_id); cached predictions are keyed by them.
+    """
+    return {
+        "enabled": LOCAL_EXTRACTOR_ENABLED,
+        "min_coverage": LOCAL_EXTRACTOR_MIN_COVERAGE,
+        "rules": repr(FIELD_RULES.get(disease_id)),
+        "units": repr(UNIT_CONVERSIONS),
+    }
+
+
+def extract_fields(text, disease_id):
+    """
+    Extracts the parameters of _get_gemini_response_schema(disease_id) from report text with
+    regex and dictionary rules, converting units and mapping synonyms to the schema's values.
+
+    Returns {'data': {...}, 'coverage': float, 'found': [...], 'missing': [...]}, where coverage is
+    the share of fields found (DEFAULTED_FIELDS excluded), or None for diseases without rules.
+    """
+    rules = FIELD_RULES.get(disease_id)
+    schema = _get_gemini_response_schema(disease_id)
+    if rules is None or schema is None:
+        return None
+
+    data = {"disease": disease_id}
+    found = set()
+    deferred = []
+    for field, rule in rules.items():
+        kind = rule[0]
+        if kind in ('measured', 'fasting_sugar_flag'):
+            # Derived from other fields once they are all extracted
+            deferred.append((field, rule))
+            continue
+        if kind == 'number':
+            value = _find_number(text, rule[1], rule[2])
+        elif kind == 'choice':
+            value = _find_choice(text, rule[1], rule[2])
+        elif kind == 'age':
+            value = _find_age(text)
+        elif kind == 'sex':
+            sex = _find_sex(text)
+            value = rule[1][sex] if sex else None
+        elif kind == 'bp':
+            value = _find_bp(text, rule[1])
+        elif kind == 'bmi':
+            value = _find_bmi(text)
+        elif kind == 'urea':
+            value = _find_urea(text)
+        else:
+            raise ValueError(f"Unknown field rule '{kind}' for {disease_id}.{field}")
+
+        # Values outside a schema enum (e.g. "Albumin: 4.2" g/dL where a 0-5 urine grade is expected) are dropped
+        enum = schema["properties"].get(field, {}).get("enum")
+        if value is not None and enum is not None and value not in enum:
+            value = None
+        if value is not None:
+            data[field] = value
+            found.add(field)
+
+    for field, rule in deferred:
+        if rule[0] == 'measured':
+            data[field] = 1 if rule[1] in found else 0
+        else:
+            glucose = _find_number(text, GLUCOSE_LABELS[:5] + ['fbs'], 'glucose')
+            if glucose is not None:
+                data[field] = 1 if glucose > 120 else 0
+                found.add(field)
+
+    defaulted = DEFAULTED_FIELDS.get(disease_id, set())
+    counted = [f for f in schema["properties"] if f != "disease" and f not in defaulted]
+    missing = [f for f in counted if f not in found]
+    coverage = (len(counted) - len(missing)) / len(counted) if counted else 0.0
+    return {"data": data, "coverage": round(coverage, 3), "found": sorted(found), "missing": missing}
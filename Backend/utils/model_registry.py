@@ -0,0 +1,253 @@
+import os
+import sys
+import pickle
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SAVED_MODELS_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model')
+
+# RandomForest models are served by the array-backed engine in ml_model/inference/forest_engine.py,
+# memory-mapping the exported <model>.forest/ node table when present. Set FOREST_ENGINE=0 to use sklearn.
+FOREST_ENGINE = os.getenv('FOREST_ENGINE', '1').strip().lower() not in ('0', 'false', 'no')
+# LogisticRegression models are folded together with their scaler/preprocessor into one weight vector
+# (ml_model/inference/linear_engine.py). Set LINEAR_ENGINE=0 to use sklearn.
+LINEAR_ENGINE = os.getenv('LINEAR_ENGINE', '1').strip().lower() not in ('0', 'false', 'no')
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from ml_model.inference.forest_engine import CompiledForest, compile_model, file_sha256, read_manifest, FOREST_DIR_EXTENSION
+from ml_model.inference.linear_engine import compile_linear_model
+
+# Artifacts per disease_id. Only 'model' is required; 'scaler' and 'preprocessor'
+# are loaded when the model was trained with a separate transformer.
+MODEL_ARTIFACTS = {
+    'diabetes': {'model': 'diabetes_model.pkl'},
+    'heartDisease': {'model': 'heart_disease_model.pkl', 'scaler': 'heart_disease_scaler.pkl'},
+    'hypertension': {'model': 'hypertension_model.pkl', 'preprocessor': 'hypertension_preprocessor.pkl'},
+    'ckd': {'model': 'ckd_model.pkl'},
+    'liverDisease': {'model': 'liver_disease_model.pkl'},
+    'thyroidDisease': {'model': 'thyroid_model.pkl'},
+    'cancerDisease': {'model': 'cancer_model.pkl'},
+}
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    """
+    Loaded artifacts for one disease. Any artifact that is missing or failed to load is None.
+    """
+    disease_id: str
+    model: Optional[Any] = None
+    scaler: Optional[Any] = None
+    preprocessor: Optional[Any] = None
+    # Compiled, sklearn-compatible replacement for model. It takes the raw rows that go into the
+    # scaler/preprocessor (or pipeline), since any separate transformer is folded into it.
+    compiled: Optional[Any] = None
+
+    @property
+    def is_loaded(self):
+        return self.model is not None
+
+    @property
+    def predictor(self):
+        """
+        The object to call predict/predict_proba on: the compiled engine when available.
+        """
+        return self.compiled if self.compiled is not None else self.model
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of the tabular disease models.
+    Every artifact file is unpickled at most once, on the first get() for its
+    disease; the blueprints and the /predict/upload path all read from the same handles.
+    """
+
+    def __init__(self, artifacts=None, models_dir=SAVED_MODELS_DIR):
+        self._artifacts = artifacts if artifacts is not None else MODEL_ARTIFACTS
+        self._models_dir = models_dir
+        self._handles: Dict[str, ModelHandle] = {}
+        self._lock = threading.Lock()
+        self._loading = None
+        # Node tables mapped by preload_forest_tables(), reused when the model is compiled
+        self._forest_tables: Dict[str, Any] = {}
+        # _forest_dir results; the check hashes the .pkl, so it runs once per disease and process
+        self._forest_dirs: Dict[str, Optional[str]] = {}
+        # (file, size, mtime) of every artifact behind a loaded handle, recorded at load time
+        self._versions: Dict[str, list] = {}
+
+    @property
+    def disease_ids(self):
+        return list(self._artifacts.keys())
+
+    def get(self, disease_id):
+        """
+        Returns the ModelHandle for disease_id, loading its artifacts on the first call.
+        Raises KeyError for unknown disease ids.
+        """
+        handle = self._handles.get(disease_id)
+        if handle is not None:
+            return handle
+
+        if disease_id not in self._artifacts:
+            raise KeyError(f"No model artifacts registered for disease_id '{disease_id}'")
+
+        with self._lock:
+            # Another thread may have finished loading while we waited for the lock.
+            handle = self._handles.get(disease_id)
+            if handle is None:
+                self._loading = disease_id
+                try:
+                    handle = self._load_handle(disease_id)
+                finally:
+                    self._loading = None
+                self._handles[disease_id] = handle
+        return handle
+
+    def load_all(self):
+        """
+        Loads every registered disease model. Returns {disease_id: is_loaded}.
+        """
+        return {disease_id: self.get(disease_id).is_loaded for disease_id in self._artifacts}
+
+    def version(self, disease_id):
+        """
+        Identifies the artifact files behind disease_id's loaded handle (name, size and mtime of
+        each, as they were when loaded), so results cached from an older model can be told apart.
+        Loads the handle if needed.
+        """
+        self.get(disease_id)
+        return self._versions[disease_id]
+
+    def preload_forest_tables(self):
+        """
+        Memory-maps every exported <model>.forest/ node table without unpickling any model.
+        Returns the disease ids whose table was mapped. A later get() (in this process or in a
+        forked worker) compiles its model around the already mapped arrays.
+        """
+        mapped = []
+        for disease_id in self._artifacts:
+            forest_dir = self._forest_dir(disease_id)
+            if forest_dir is None or disease_id in self._forest_tables:
+                continue
+            try:
+                self._forest_tables[disease_id] = CompiledForest.load(forest_dir)
+                mapped.append(disease_id)
+            except Exception as e:
+                logging.error(f"❌ Could not map {forest_dir}: {e}", exc_info=True)
+        return mapped
+
+    def status(self):
+        """
+        Reports the load state of every registered model without triggering a load.
+        Each value is 'loaded', 'loading', 'unavailable' (load attempted but failed
+        or file missing) or 'not_loaded' (not requested yet).
+        """
+        report = {}
+        for disease_id in self._artifacts:
+            handle = self._handles.get(disease_id)
+            if handle is not None:
+                report[disease_id] = 'loaded' if handle.is_loaded else 'unavailable'
+            elif self._loading == disease_id:
+                report[disease_id] = 'loading'
+            else:
+                report[disease_id] = 'not_loaded'
+        return report
+
+    def _artifact_files(self, disease_id):
+        paths = [os.path.join(self._models_dir, filename) for filename in self._artifacts[disease_id].values()]
+        forest_dir = self._forest_dir(disease_id)
+        if forest_dir is not None:
+            paths.append(os.path.join(forest_dir, 'manifest.json'))
+        files = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                files.append([os.path.relpath(path, self._models_dir), stat.st_size, stat.st_mtime_ns])
+            except OSError:
+                files.append([os.path.relpath(path, self._models_dir), None, None])
+        return files
+
+    def _load_handle(self, disease_id):
+        self._versions[disease_id] = self._artifact_files(disease_id)
+        loaded = {}
+        for role, filename in self._artifacts[disease_id].items():
+            loaded[role] = self._load_artifact(disease_id, role, filename)
+        if loaded.get('model') is not None:
+            loaded['compiled'] = self._compile_model(disease_id, loaded)
+        return ModelHandle(disease_id=disease_id, **loaded)
+
+    def _compile_model(self, disease_id, loaded):
+        """
+        Builds the fast inference path for a loaded model, or returns None to keep using sklearn.
+        """
+        model = loaded['model']
+        transformer = loaded['scaler'] if loaded.get('scaler') is not None else loaded.get('preprocessor')
+        # A separate transformer that failed to load cannot be folded in
+        if any(role in loaded and loaded[role] is None for role in ('scaler', 'preprocessor')):
+            return None
+        try:
+            compiled = None
+            if FOREST_ENGINE:
+                compiled = compile_model(model, self._forest_dir(disease_id), self._forest_tables.get(disease_id))
+                if compiled is not None:
+                    logging.info(f"✅ {disease_id} forest compiled for array-backed inference.")
+            if compiled is None and LINEAR_ENGINE:
+                compiled = compile_linear_model(model, transformer)
+                if compiled is not None:
+                    logging.info(f"✅ {disease_id} linear model folded into a single weight vector.")
+            return compiled
+        except Exception as e:
+            logging.error(f"❌ Could not compile {disease_id} model; falling back to sklearn: {e}", exc_info=True)
+            return None
+
+    def _forest_dir(self, disease_id):
+        """
+        Returns the exported <model>.forest/ node table for disease_id if it was exported from the
+        current .pkl: the sha256 in its manifest must match the .pkl's content (mtimes are
+        arbitrary after a checkout, so they cannot tell).
+        """
+        if disease_id not in self._forest_dirs:
+            self._forest_dirs[disease_id] = self._check_forest_dir(disease_id)
+        return self._forest_dirs[disease_id]
+
+    def _check_forest_dir(self, disease_id):
+        path = os.path.join(self._models_dir, self._artifacts[disease_id]['model'])
+        forest_dir = os.path.splitext(path)[0] + FOREST_DIR_EXTENSION
+        if not os.path.isdir(forest_dir) or not os.path.exists(path):
+            return None
+        try:
+            exported_from = read_manifest(forest_dir).get('source_sha256')
+            current = file_sha256(path)
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Could not check {forest_dir} ({e}); rebuilding the forest in memory.")
+            return None
+        if exported_from != current:
+            logging.warning(f"⚠️ {forest_dir} was not exported from the current {path} "
+                            f"(re-run ml_model/training/export_models.py); rebuilding the forest in memory.")
+            return None
+        return forest_dir
+
+    def _load_artifact(self, disease_id, role, filename):
+        # Plain pickle: sklearn estimators copy their arrays into private buffers when unpickled,
+        # so memory-mapping them (joblib mmap_mode) only made loading slower. The shareable part,
+        # the forest node tables, is memory-mapped separately (see _forest_dir).
+        path = os.path.join(self._models_dir, filename)
+        if not os.path.exists(path):
+            logging.warning(f"⚠️ Warning: {disease_id} {role} not found at {path}. Prediction for this disease will not work.")
+            return None
+        try:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+            logging.info(f"✅ {disease_id} {role} loaded successfully from {path}.")
+            return artifact
+        except Exception as e:
+            logging.error(f"❌ Error loading {disease_id} {role} from {path}: {e}", exc_info=True)
+            return None
+
+
+# Shared by every blueprint and by model_utils.predict_from_text
+model_registry = ModelRegistry()
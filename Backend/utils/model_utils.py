@@ -1,58 +1,33 @@
-import pickle
 import os
+import sys
 import json
 import numpy as np
 import logging
 import traceback
 import pandas as pd
+from functools import lru_cache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-SAVED_MODELS_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model')
-
-loaded_models = {}
-
-MODEL_CONFIG = {
-    'diabetes': 'diabetes_model.pkl',
-    'heartDisease': 'heart_disease_model.pkl',
-    'hypertension': 'hypertension_model.pkl',
-    'ckd': 'ckd_model.pkl',
-    'liverDisease': 'liver_disease_model.pkl',
-    'thyroidDisease': 'thyroid_model.pkl', 
-    'cancerDisease': 'cancer_model.pkl', 
-}
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
-for disease_id, model_filename in MODEL_CONFIG.items():
-    model_path = os.path.join(SAVED_MODELS_DIR, model_filename)
-    try:
-        if os.path.exists(model_path):
-            with open(model_path, 'rb') as f:
-                loaded_models[disease_id] = pickle.load(f)
-            logging.info(f"✅ {disease_id} model loaded successfully from {model_path}.")
-        else:
-            logging.warning(f"⚠️ Warning: {disease_id} model not found at {model_path}. Prediction for this disease will not work via report upload.")
-    except Exception as e:
-        logging.error(f"❌ Error loading {disease_id} model from {model_path}: {e}", exc_info=True)
+# Models are loaded once through the shared registry, which the tabular blueprints also use.
+from Backend.utils.model_registry import model_registry
+from Backend.utils.feature_specs import FEATURE_SPECS
 
 
+# Models fed a DataFrame; column names and order come from the feature spec
 MODEL_FEATURE_NAMES = {
-    'cancerDisease': [
-        "age", "gender", "smokingstatus", "alcoholconsumption", "bmi", 
-        "physicalactivity_hoursperweek", "familyhistorycancer", 
-        "chronicdisease_hypertension", "chronicdisease_diabetes", 
-        "genomicmarker_1", "genomicmarker_2", "tumorsize_mm", 
-        "tumormarkerlevel", "biopsyresult", "bloodtest_markera", 
-        "bloodtest_markerb", "symptoms_fatigue", "symptoms_unexplainedweightloss"
-    ],
-    # Add other disease_id: feature_name_list mappings if they also expect DataFrames
-    # 'diabetes': ["pregnancies", "glucose", "blood_pressure", "skin_thickness", "insulin", "bmi", "diabetes_pedigree_function", "age"],
+    'cancerDisease': list(FEATURE_SPECS['cancerDisease'].feature_names),
 }
 
 
 def predict_from_text(structured_data_dict, disease_id):
     logging.info(f"predict_from_text: Received disease_id='{disease_id}'")
-    if disease_id not in loaded_models or loaded_models[disease_id] is None:
+    handle = model_registry.get(disease_id) if disease_id in model_registry.disease_ids else None
+    if handle is None or not handle.is_loaded:
         logging.error(f"predict_from_text: Model for {disease_id} not loaded or found.")
         return {
             'risk_level': 'Error',
@@ -64,7 +39,7 @@ def predict_from_text(structured_data_dict, disease_id):
 
         logging.info(f"predict_from_text: Structured data received for {disease_id}: {structured_data}")
         
-        features = convert_to_features(structured_data, disease_id)
+        features = convert_to_feature_matrix(structured_data, disease_id)
         
         if features is None:
             logging.error(f"predict_from_text: Features could not be generated for {disease_id}. Check convert_to_features logic and Gemini output.")
@@ -73,23 +48,31 @@ def predict_from_text(structured_data_dict, disease_id):
                 'reason': f'Could not extract relevant features for {disease_id} from the report data. Please ensure the report contains the necessary information.'
             }
         
-        if disease_id in MODEL_FEATURE_NAMES:
-            feature_names = MODEL_FEATURE_NAMES[disease_id]
-            if len(features) != len(feature_names):
-                logging.error(f"Feature count mismatch for {disease_id}: Generated {len(features)}, Expected {len(feature_names)}")
+        plan = feature_plan(disease_id)
+        if plan.labels:
+            # Coded categoricals go in as the text the preprocessor was fitted on (hypertension)
+            unknown = plan.unknown_labels(handle.preprocessor)
+            if unknown:
+                logging.error(f"predict_from_text: {disease_id} preprocessor was not fitted on categories {unknown}.")
                 return {
                     'risk_level': 'Error',
-                    'reason': f'Internal error: Feature count mismatch for {disease_id}. Check model_utils.py feature definitions.'
+                    'reason': f'The {disease_id} model does not match its feature spec (unknown categories: {unknown}). Please retrain or update the spec.'
                 }
-            features_df = pd.DataFrame([features], columns=feature_names)
+            features_for_prediction = plan.to_model_rows(features)
+            if handle.compiled is None:
+                # sklearn fallback (LINEAR_ENGINE=0): the compiled model folds this preprocessor in
+                features_for_prediction = handle.preprocessor.transform(pd.DataFrame(features_for_prediction, columns=plan.columns))
+            logging.info(f"predict_from_text: Model input rows for prediction: {features_for_prediction}")
+        elif disease_id in MODEL_FEATURE_NAMES:
+            features_df = pd.DataFrame(features, columns=MODEL_FEATURE_NAMES[disease_id])
             logging.info(f"predict_from_text: Features DataFrame for prediction:\n{features_df}")
             features_for_prediction = features_df
         else:
-            features_array = np.array([features])
-            logging.info(f"predict_from_text: Features array for prediction: {features_array}")
-            features_for_prediction = features_array
+            logging.info(f"predict_from_text: Features array for prediction: {features}")
+            features_for_prediction = features
 
-        model = loaded_models[disease_id]
+        # Compiled array-backed forest when available, otherwise the sklearn model
+        model = handle.predictor
         prediction_outcome = None 
         
         if hasattr(model, 'predict_proba') and disease_id != 'thyroidDisease':
@@ -140,182 +123,140 @@ def predict_from_text(structured_data_dict, disease_id):
             'reason': f'Prediction failed due to an internal ML error: {e}. Check model_utils.py for feature conversion or model issues. Full error logged.'
         }
 
-# (Keep safe_float, convert_to_features, and map_prediction_to_risk_and_reason functions as they were in the previous corrected code)
+class FeaturePlan:
+    """
+    Compiled conversion of structured report data into one disease's model input, built from
+    its feature spec: column order, per-column default, categorical codes and dtype.
+    Converts one dict or a list of dicts into a (rows, columns) matrix in a single pass, so
+    single and batch predictions share the same path. Missing or unparseable values fall back
+    to the column default and are reported in one log line per call, not one per field.
+    """
 
-# Helper function (keep as is)
-def safe_float(value, default=0.0):
-    try:
-        if value is None:
-            return default
-        return float(value)
-    except (ValueError, TypeError):
-        logging.warning(f"Could not convert value '{value}' to float, using default '{default}'")
-        return default
+    def __init__(self, spec, dtype=np.float64):
+        self.disease_id = spec.disease_id
+        self.dtype = np.dtype(dtype)
+        self.columns = spec.feature_names
+        model_fields = [f for f in spec.fields if f.feature]
+        # (column index, field name, {lowercase text: code} or None for numeric fields)
+        self._steps = tuple((j, f.name, f.categories) for j, f in enumerate(model_fields))
+        self.defaults = tuple(self._encode_default(f) for f in model_fields)
+        # (column index, field name, category per code) for coded fields of text-fitted preprocessors
+        self.labels = tuple((j, f.name, f.labels) for j, f in enumerate(model_fields) if f.labels)
+
+    @staticmethod
+    def _encode_default(feature_field):
+        default = feature_field.default
+        if feature_field.categories is not None and isinstance(default, str):
+            return float(feature_field.categories[default.lower()])
+        return float(default)
+
+    @property
+    def width(self):
+        return len(self.columns)
+
+    def to_matrix(self, records, out=None):
+        """
+        records: one dict or a list of dicts. out: optional preallocated (len(records), width)
+        array of this plan's dtype to fill instead of allocating a new one.
+        """
+        if isinstance(records, dict):
+            records = (records,)
+        shape = (len(records), self.width)
+        if out is None:
+            matrix = np.empty(shape, dtype=self.dtype)
+        elif out.shape != shape or out.dtype != self.dtype:
+            raise ValueError(f"Feature buffer for {self.disease_id} must be {shape} {self.dtype}, got {out.shape} {out.dtype}.")
+        else:
+            matrix = out
+
+        invalid = {}
+        for i, record in enumerate(records):
+            row = list(self.defaults)
+            get = record.get
+            for j, name, categories in self._steps:
+                value = get(name)
+                if value is None:
+                    continue
+                if categories is not None:
+                    code = categories.get(str(value).strip().lower())
+                    if code is None:
+                        invalid[name] = value
+                    else:
+                        row[j] = code
+                    continue
+                try:
+                    row[j] = float(value)
+                except (TypeError, ValueError):
+                    invalid[name] = value
+            matrix[i] = row
+
+        if invalid:
+            logging.warning(f"convert_to_features: defaults used for unparseable {self.disease_id} values: {invalid}")
+        return matrix
+
+
+    def to_model_rows(self, matrix):
+        """
+        The feature matrix as the raw rows a text-fitted preprocessor (or the compiled model
+        folding it) expects: an object array whose coded columns hold each code's label.
+        Raises ValueError for a code without a label rather than letting it encode as unknown.
+        """
+        rows = matrix.astype(object)
+        for j, name, labels in self.labels:
+            for i, code in enumerate(matrix[:, j]):
+                if not (float(code).is_integer() and 0 <= code < len(labels)):
+                    raise ValueError(f"Invalid {self.disease_id} code for '{name}': {code} (expected 0-{len(labels) - 1})")
+                rows[i, j] = labels[int(code)]
+        return rows
+
+    def unknown_labels(self, preprocessor):
+        """
+        {field name: [labels]} for labels the fitted preprocessor has no category for (empty when
+        they all match). Such a label would silently encode as all zeros.
+        """
+        fitted = {}
+        for _, step, columns in getattr(preprocessor, 'transformers_', ()):
+            for column, categories in zip(columns, getattr(step, 'categories_', ())):
+                fitted[column] = set(categories)
+        unknown = {}
+        for _, name, labels in self.labels:
+            missing = [label for label in labels if label not in fitted.get(name, ())]
+            if missing:
+                unknown[name] = missing
+        return unknown
+
+
+@lru_cache(maxsize=None)
+def feature_plan(disease_id, dtype=np.float64):
+    """
+    Cached FeaturePlan for disease_id (None for diseases without a feature spec).
+    """
+    spec = FEATURE_SPECS.get(disease_id)
+    return FeaturePlan(spec, dtype) if spec is not None else None
 
-def convert_to_features(structured_data, disease_id):
+
+def convert_to_feature_matrix(records, disease_id, dtype=np.float64, out=None):
     """
-    Converts structured data (dict) into a numerical feature vector
-    for the specific ML model. This is disease-specific.
-    Ensures that missing keys default to 0 or -1, and types are correct.
+    Converts one structured-data dict or a list of them into a (rows, features) matrix for
+    disease_id's model. Returns None for diseases without a feature spec.
     """
-    features = []
-    logging.info(f"convert_to_features: Processing for {disease_id} with data: {structured_data}")
-
-    # --- Diabetes Features ---
-    if disease_id == 'diabetes':
-        features = [
-            safe_float(structured_data.get("pregnancies", 0)),
-            safe_float(structured_data.get("glucose", 0)),
-            safe_float(structured_data.get("blood_pressure", 0)),
-            safe_float(structured_data.get("skin_thickness", 0)),
-            safe_float(structured_data.get("insulin", 0)),
-            safe_float(structured_data.get("bmi", 0)),
-            safe_float(structured_data.get("diabetes_pedigree_function", 0)),
-            safe_float(structured_data.get("age", 0)),
-        ]
-
-    # --- Heart Disease Features ---
-    elif disease_id == 'heartDisease':
-        features = [
-            safe_float(structured_data.get("age", 0)),
-            safe_float(structured_data.get("sex", 0)), # 0 for male, 1 for female
-            safe_float(structured_data.get("chest_pain_type", 0)),
-            safe_float(structured_data.get("trestbps", 0)),
-            safe_float(structured_data.get("cholesterol", 0)),
-            safe_float(structured_data.get("fbs", 0)),
-            safe_float(structured_data.get("restecg", 0)),
-            safe_float(structured_data.get("thalach", 0)),
-            safe_float(structured_data.get("exang", 0)),
-            safe_float(structured_data.get("oldpeak", 0)),
-            safe_float(structured_data.get("slope", 0)),
-            safe_float(structured_data.get("ca", 0)),
-            safe_float(structured_data.get("thal", 0)),
-        ]
-
-    # --- Hypertension Features ---
-    elif disease_id == 'hypertension':
-        features = [
-            safe_float(structured_data.get("Age_yrs", 0)),
-            safe_float(structured_data.get("Gender", 0)),
-            safe_float(structured_data.get("Education_Level", 0)),
-            safe_float(structured_data.get("Occupation", 0)),
-            safe_float(structured_data.get("Physical_Activity", 0)),
-            safe_float(structured_data.get("Smoking_Habits", 0)),
-            safe_float(structured_data.get("BMI", 0)),
-        ]
-
-    # --- CKD Features ---
-    elif disease_id == 'ckd':
-        features = [
-            safe_float(structured_data.get("age", 0)),
-            safe_float(structured_data.get("blood_pressure", 0)),
-            safe_float(structured_data.get("specific_gravity", 0)),
-            safe_float(structured_data.get("albumin", 0)),
-            safe_float(structured_data.get("sugar", 0)),
-            safe_float(structured_data.get("blood_glucose_random", 0)),
-            safe_float(structured_data.get("blood_urea", 0)),
-            safe_float(structured_data.get("serum_creatinine", 0)),
-            safe_float(structured_data.get("sodium", 0)),
-            safe_float(structured_data.get("potassium", 0)),
-            safe_float(structured_data.get("hemoglobin", 0)),
-            safe_float(structured_data.get("packed_cell_volume", 0)),
-            safe_float(structured_data.get("white_blood_cell_count", 0)),
-            safe_float(structured_data.get("red_blood_cell_count", 0)),
-            safe_float(1 if structured_data.get("pus_cell", "normal").lower() == "abnormal" else 0),
-            safe_float(1 if structured_data.get("pus_cell_clumps", "notpresent").lower() == "present" else 0),
-            safe_float(1 if structured_data.get("bacteria", "notpresent").lower() == "present" else 0),
-            safe_float(1 if structured_data.get("hypertension", "no").lower() == "yes" else 0),
-            safe_float(1 if structured_data.get("diabetes_mellitus", "no").lower() == "yes" else 0),
-            safe_float(1 if structured_data.get("coronary_artery_disease", "no").lower() == "yes" else 0),
-            safe_float(1 if structured_data.get("appetite", "good").lower() == "poor" else 0),
-            safe_float(1 if structured_data.get("pedal_edema", "no").lower() == "yes" else 0),
-            safe_float(1 if structured_data.get("anemia", "no").lower() == "yes" else 0),
-        ]
-
-    # --- Liver Disease Features ---
-    elif disease_id == 'liverDisease':
-        features = [
-            safe_float(structured_data.get("Age", 0)),
-            safe_float(structured_data.get("Gender", 0)), # 0 for Male, 1 for Female
-            safe_float(structured_data.get("Total_Bilirubin", 0)),
-            safe_float(structured_data.get("Direct_Bilirubin", 0)),
-            safe_float(structured_data.get("Alkaline_Phosphotase", 0)),
-            safe_float(structured_data.get("Alamine_Aminotransferase", 0)),
-            safe_float(structured_data.get("Aspartate_Aminotransferase", 0)),
-            safe_float(structured_data.get("Total_Protiens", 0)),
-            safe_float(structured_data.get("Albumin", 0)),
-            safe_float(structured_data.get("Albumin_and_Globulin_Ratio", 0)),
-        ]
-
-    # --- Thyroid Disease Features ---
-    elif disease_id == 'thyroidDisease':
-        features = [
-            safe_float(structured_data.get("age", 0)),
-            safe_float(structured_data.get("sex", 0)),
-            safe_float(structured_data.get("on_thyroxine", 0)),
-            safe_float(structured_data.get("query_on_thyroxine", 0)),
-            safe_float(structured_data.get("on_antithyroid_meds", 0)),
-            safe_float(structured_data.get("sick", 0)),
-            safe_float(structured_data.get("pregnant", 0)),
-            safe_float(structured_data.get("thyroid_surgery", 0)),
-            safe_float(structured_data.get("I131_treatment", 0)),
-            safe_float(structured_data.get("query_hypothyroid", 0)),
-            safe_float(structured_data.get("query_hyperthyroid", 0)),
-            safe_float(structured_data.get("lithium", 0)),
-            safe_float(structured_data.get("goitre", 0)),
-            safe_float(structured_data.get("tumor", 0)),
-            safe_float(structured_data.get("hypopituitary", 0)),
-            safe_float(structured_data.get("psych", 0)),
-            safe_float(structured_data.get("TSH_measured", 0)),
-            safe_float(structured_data.get("TSH", -1)), 
-            safe_float(structured_data.get("T3_measured", 0)),
-            safe_float(structured_data.get("T3", -1)),
-            safe_float(structured_data.get("TT4_measured", 0)),
-            safe_float(structured_data.get("TT4", -1)),
-            safe_float(structured_data.get("T4U_measured", 0)),
-            safe_float(structured_data.get("T4U", -1)),
-            safe_float(structured_data.get("FTI_measured", 0)),
-            safe_float(structured_data.get("FTI", -1)),
-            safe_float(structured_data.get("TBG_measured", 0)),
-            safe_float(structured_data.get("TBG", -1)),
-        ]
-
-    # --- Cancer Disease Features (CRITICAL: MUST MATCH TRAINED MODEL EXACTLY) ---
-    elif disease_id == 'cancerDisease':
-        # Map categorical features to numerical values
-        gender_map = {"Male": 0, "Female": 1} 
-        smoking_map = {"Never": 0, "Former": 1, "Current": 2, "Never Smoked": 0, "Former Smoker": 1, "Current Smoker": 2} 
-        biopsy_map = {"Benign": 0, "Malignant": 1, "Not Performed": 2, "Atypical": 3} 
-        
-        # **ASSUMED FEATURE ORDER AND NAMES FOR 18 FEATURES.**
-        # This list MUST EXACTLY match the feature order your cancer_model.pkl was trained on.
-        features = [
-            safe_float(structured_data.get("age", 0)), 
-            safe_float(gender_map.get(structured_data.get("gender", "Male"), 0)), 
-            safe_float(smoking_map.get(structured_data.get("smokingstatus", "Never Smoked"), 0)), 
-            safe_float(structured_data.get("alcoholconsumption", 0)), 
-            safe_float(structured_data.get("bmi", 0)), 
-            safe_float(structured_data.get("physicalactivity_hoursperweek", 0)), 
-            safe_float(structured_data.get("familyhistorycancer", "0")), 
-            safe_float(structured_data.get("chronicdisease_hypertension", "0")), 
-            safe_float(structured_data.get("chronicdisease_diabetes", "0")), 
-            safe_float(structured_data.get("genomicmarker_1", 0)), 
-            safe_float(structured_data.get("genomicmarker_2", 0)), 
-            safe_float(structured_data.get("tumorsize_mm", 0)), 
-            safe_float(structured_data.get("tumormarkerlevel", 0)), 
-            safe_float(biopsy_map.get(structured_data.get("biopsyresult", "Benign"), 0)), 
-            safe_float(structured_data.get("bloodtest_markera", 0.0)), 
-            safe_float(structured_data.get("bloodtest_markerb", 0.0)), 
-            safe_float(structured_data.get("symptoms_fatigue", "0")), 
-            safe_float(structured_data.get("symptoms_unexplainedweightloss", "0")), 
-        ]
-
-    else:
+    plan = feature_plan(disease_id, dtype)
+    if plan is None:
         logging.warning(f"convert_to_features: No feature conversion logic for disease_id: {disease_id}")
-        return None 
+        return None
+    return plan.to_matrix(records, out=out)
 
-    logging.info(f"convert_to_features: Generated features: {features} (Count: {len(features)})")
-    return features
+
+def convert_to_features(structured_data, disease_id):
+    """
+    Converts structured data (dict) into the numerical feature vector (1-D array) for the
+    disease's ML model. Missing keys take the column default from the feature spec.
+    """
+    matrix = convert_to_feature_matrix(structured_data, disease_id)
+    if matrix is None:
+        return None
+    logging.info(f"convert_to_features: Generated features: {matrix[0]} (Count: {matrix.shape[1]})")
+    return matrix[0]
 
 
 def map_prediction_to_risk_and_reason(prediction_outcome, disease_id):
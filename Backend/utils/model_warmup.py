@@ -0,0 +1,140 @@
+import gc
+import os
+import sys
+import time
+import logging
+import threading
+
+from Backend.utils.model_registry import model_registry
+# IMAGE_PREDICT_MODULE: the configured image backend (torch image_predict or onnxruntime onnx_predict)
+from ml_model.inference.cv_backend import IMAGE_PREDICT_MODULE, load_backend
+
+# 'background' (default): bind routes immediately and load models in a daemon thread.
+# 'lazy': load each model only when its first request arrives.
+# 'preload': for pre-forking servers (gunicorn --preload). create_app() maps the exported forest
+#            node tables and freezes the GC before fork; each worker then loads the estimators
+#            and the CV model in the background after fork (torch is never imported in the master).
+MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'background').strip().lower()
+
+_warmup_state = {
+    'started': False,
+    'finished': False,
+    'started_at': None,
+    'duration_seconds': None,
+    'cv_error': None,
+    'gc_frozen': False,
+}
+_warmup_lock = threading.Lock()
+
+
+def _warm_up_models():
+    start = time.perf_counter()
+    try:
+        model_registry.load_all()
+        logging.info("✅ Tabular models warmed up.")
+    except Exception as e:
+        logging.error(f"❌ Tabular model warm-up failed: {e}", exc_info=True)
+
+    try:
+        # Importing the image backend pulls in torch (or onnxruntime), so it is only done here
+        # or on the first image request.
+        load_backend().ensure_cv_model_loaded()
+    except Exception as e:
+        _warmup_state['cv_error'] = str(e)
+        logging.error(f"❌ CV model warm-up failed: {e}")
+    finally:
+        _warmup_state['duration_seconds'] = round(time.perf_counter() - start, 3)
+        _warmup_state['finished'] = True
+        logging.info(f"Model warm-up finished in {_warmup_state['duration_seconds']}s.")
+
+
+def start_background_warmup():
+    """
+    Starts loading every model in a daemon thread, at most once per process.
+    Requests that arrive before a model is ready load it on demand instead.
+    """
+    with _warmup_lock:
+        if _warmup_state['started']:
+            return False
+        _warmup_state['started'] = True
+        _warmup_state['started_at'] = time.time()
+
+    thread = threading.Thread(target=_warm_up_models, name='model-warmup', daemon=True)
+    thread.start()
+    return True
+
+
+def _warm_up_after_fork():
+    # Runs in every child forked after preload_models(): the master's warm-up state and threads
+    # do not carry over, so each worker loads its own models in the background
+    global _warmup_lock
+    _warmup_lock = threading.Lock()
+    _warmup_state.update(started=False, finished=False, started_at=None, duration_seconds=None, cv_error=None)
+    start_background_warmup()
+
+
+def preload_models():
+    """
+    Prepares the shareable part of the models in the calling process before workers are forked.
+
+    Only the exported .forest/ node tables are mapped here. They are read-only, file-backed
+    pages, so every worker shares them through the page cache no matter what happens to the
+    Python objects around them. The sklearn estimators are not loaded in the master: unpickled
+    trees copy their nodes into private buffers and every worker touches their refcounts, so
+    they would be copied anyway. The CV model is also left out, because torch must not be
+    imported (and its thread pools started) before fork. Each forked worker loads the
+    estimators, the compiled models and the CV model in a background thread, as in the
+    default 'background' mode.
+
+    Afterwards gc.freeze() moves the objects created so far (mostly imported modules) into
+    the permanent generation, so the workers' collector does not traverse, and copy, their pages.
+    """
+    with _warmup_lock:
+        if _warmup_state['started']:
+            return False
+        _warmup_state['started'] = True
+        _warmup_state['started_at'] = time.time()
+
+    start = time.perf_counter()
+    mapped = model_registry.preload_forest_tables()
+    _warmup_state['duration_seconds'] = round(time.perf_counter() - start, 3)
+    _warmup_state['finished'] = True
+    logging.info(f"✅ Forest node tables mapped before fork: {mapped or 'none found'}.")
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_warm_up_after_fork)
+
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+        _warmup_state['gc_frozen'] = True
+        logging.info(f"✅ {gc.get_freeze_count()} objects frozen before fork.")
+    return True
+
+
+def _cv_model_status():
+    image_predict = sys.modules.get(IMAGE_PREDICT_MODULE)
+    if image_predict is None or not getattr(image_predict, '_load_attempted', False):
+        return 'unavailable' if _warmup_state['cv_error'] else 'not_loaded'
+    return 'loaded' if image_predict.is_cv_model_loaded() else 'unavailable'
+
+
+def readiness_report():
+    """
+    Snapshot of which models are loaded, for the /ready endpoint.
+    Never triggers a model load.
+    """
+    models = model_registry.status()
+    models['cv_model'] = _cv_model_status()
+    # In lazy mode every model loads on demand, so the process is ready as soon as routes are bound.
+    ready = MODEL_WARMUP == 'lazy' or _warmup_state['finished']
+    return {
+        'ready': ready,
+        'warmup_mode': MODEL_WARMUP,
+        'warmup_started': _warmup_state['started'],
+        'warmup_finished': _warmup_state['finished'],
+        'warmup_duration_seconds': _warmup_state['duration_seconds'],
+        'gc_frozen': _warmup_state['gc_frozen'],
+        'pid': os.getpid(),
+        'models': models,
+    }
@@ -3,8 +3,50 @@ import cv2
 import fitz  # PyMuPDF
 from PIL import Image # Pillow
 import os
+import time
+import threading
+import multiprocessing
+import numpy as np
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
+# DPI used to render scanned PDF pages for Tesseract
+OCR_DPI = 300
+# Size of the scanned-PDF OCR pool. There is one pool per web worker process, shared by all of its
+# requests, so this caps OCR processes per web worker (not per request). Defaults to every
+# available core; with several web workers per node, set it to cores / workers. 1 disables the pool.
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '0')) or (len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1)
+# Start method of the OCR pool processes. Forking a multithreaded web worker can deadlock in the
+# child, so the default is 'forkserver' where available (Linux) and 'spawn' elsewhere.
+OCR_POOL_START_METHOD = os.getenv('OCR_POOL_START_METHOD', '').strip().lower() or (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+# 'fixed': OCR every scanned page rendered whole at OCR_DPI.
+# 'adaptive': render at OCR_DETECT_DPI, locate text blocks with OpenCV and re-render only those regions
+#             at OCR_DPI (see Backend/benchmark_ocr.py for latency/accuracy on sample reports).
+OCR_MODE = os.getenv('OCR_MODE', 'fixed').strip().lower()
+OCR_DETECT_DPI = int(os.getenv('OCR_DETECT_DPI', '72'))
+# If the detected regions cover more than this fraction of the page, the whole page is OCR'd instead
+OCR_ROI_MAX_COVERAGE = float(os.getenv('OCR_ROI_MAX_COVERAGE', '0.85'))
+# White gap (pixels at OCR_DPI) between regions stacked onto the OCR canvas
+_ROI_GAP = 24
+# A PDF page whose text layer has fewer non-whitespace characters than this is treated as scanned and OCR'd
+OCR_MIN_TEXT_CHARS = int(os.getenv('OCR_MIN_TEXT_CHARS', '20'))
+
+
+def ocr_settings():
+    """
+    The settings that change the extracted text; cached OCR text is keyed by them.
+    """
+    return {
+        "mode": OCR_MODE,
+        "dpi": OCR_DPI,
+        "detect_dpi": OCR_DETECT_DPI,
+        "roi_max_coverage": OCR_ROI_MAX_COVERAGE,
+        "min_text_chars": OCR_MIN_TEXT_CHARS,
+    }
+
 
 def extract_text_from_file(filepath, disease_id=None):
     """
@@ -12,79 +54,271 @@ def extract_text_from_file(filepath, disease_id=None):
     Handles both searchable PDFs (direct text extraction) and scanned PDFs/images (OCR).
     Raises ValueError on unsupported file types or extraction errors.
     """
-    ext = os.path.splitext(filepath)[1].lower()
+    text, _ = extract_text_with_metadata(filepath)
+    return text
+
+def extract_text_with_metadata(filepath):
+    """
+    Same as extract_text_from_file, but also returns how each page was read:
+    (text, {"pages": [{"page", "method" ('text' or 'ocr'), "chars", "seconds"}, ...],
+            "ocr_pages": int, "seconds": float})
+    """
+    return _extract_text(filepath, filepath)
+
+def extract_text_from_bytes(data, filename):
+    """
+    In-memory variant of extract_text_with_metadata for uploads already held in memory.
+    PDFs are opened from the bytes with fitz.open(stream=...) and images decoded with
+    cv2.imdecode, so nothing is written to disk. filename only selects the file type.
+    """
+    return _extract_text(data, filename)
+
+def _extract_text(source, filename):
+    """
+    source is a file path or the file's bytes.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    start = time.perf_counter()
+    label = filename if isinstance(source, str) else f"{filename} (in memory, {len(source)} bytes)"
 
     if ext == '.pdf':
-        print(f"OCR: Processing PDF file: {filepath}")
-        return _extract_text_from_pdf(filepath)
+        print(f"OCR: Processing PDF file: {label}")
+        text, pages = _extract_text_from_pdf(source)
     elif ext in ['.png', '.jpg', '.jpeg']:
-        print(f"OCR: Processing image file: {filepath}")
-        return _extract_text_from_image(filepath)
+        print(f"OCR: Processing image file: {label}")
+        text = _extract_text_from_image(source)
+        pages = [{"page": 1, "method": "ocr", "chars": len(text), "seconds": round(time.perf_counter() - start, 3)}]
     else:
         raise ValueError(f"Unsupported file type for OCR: {ext}. Only .pdf, .png, .jpg, .jpeg are supported.")
 
-def _extract_text_from_pdf(pdf_path):
+    metadata = {
+        "pages": pages,
+        "ocr_pages": sum(1 for page in pages if page["method"] == "ocr"),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return text, metadata
+
+def _open_pdf(source):
+    """
+    Opens a PDF from a path or from in-memory bytes.
+    """
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+def _extract_text_from_pdf(source):
     """
-    Extracts text from a PDF document.
-    Attempts direct text extraction first, then falls back to OCR if no text is found.
+    Extracts text from a PDF document (path or bytes) page by page, in a single fitz.open pass.
+    Pages with a usable text layer use get_text(); pages without one (scanned) are OCR'd.
+    Returns (text, per-page metadata).
     """
-    full_text = ""
+    pdf_name = source if isinstance(source, str) else "<in-memory PDF>"
     try:
-        doc = fitz.open(pdf_path)
-        if not doc.page_count:
-            return "" # Empty PDF
-
-        # Attempt direct text extraction first (for searchable PDFs)
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            full_text += page.get_text()
-        
-        doc.close()
+        page_texts = {}
+        pages = {}
+        ocr_page_nums = []
+        with _open_pdf(source) as doc:
+            if not doc.page_count:
+                return "", [] # Empty PDF
 
-        if full_text.strip():
-            print("OCR: Successfully extracted text directly from PDF.")
-            return full_text.strip()
-        else:
-            print("OCR: No direct text found in PDF. Attempting OCR on each page...")
-            # Fallback to OCR if no text was found directly (implies scanned PDF)
-            return _ocr_pdf_pages(pdf_path)
+            for page_num, page in enumerate(doc):
+                start = time.perf_counter()
+                text = page.get_text()
+                if len(text.strip()) >= OCR_MIN_TEXT_CHARS:
+                    page_texts[page_num] = text
+                    pages[page_num] = {"page": page_num + 1, "method": "text", "chars": len(text.strip()),
+                                       "seconds": round(time.perf_counter() - start, 4)}
+                else:
+                    ocr_page_nums.append(page_num)
+
+            use_pool = OCR_WORKERS > 1 and len(ocr_page_nums) > 1
+            if use_pool:
+                # Each task carries only its own page, copied into a one-page PDF
+                page_pdfs = [_single_page_pdf(doc, page_num) for page_num in ocr_page_nums]
+            else:
+                # One scanned page (or OCR_WORKERS=1): OCR it from the already-open document
+                for page_num in ocr_page_nums:
+                    page_texts[page_num], seconds = _ocr_page(doc.load_page(page_num))
+                    pages[page_num] = {"page": page_num + 1, "method": "ocr", "chars": len(page_texts[page_num].strip()),
+                                       "seconds": round(seconds, 4)}
+
+        if use_pool:
+            print(f"OCR: Running OCR on {len(ocr_page_nums)} scanned pages in the shared pool ({OCR_WORKERS} processes)...")
+            for page_num, (text, seconds) in zip(ocr_page_nums, _ocr_in_pool(page_pdfs)):
+                page_texts[page_num] = text
+                pages[page_num] = {"page": page_num + 1, "method": "ocr", "chars": len(text.strip()),
+                                   "seconds": round(seconds, 4)}
+
+        full_text = ""
+        for page_num in sorted(page_texts):
+            if pages[page_num]["method"] == "ocr":
+                full_text += page_texts[page_num] + "\n--- End of Page " + str(page_num + 1) + " ---\n"
+            else:
+                full_text += page_texts[page_num]
+
+        print(f"OCR: Extracted {len(pages) - len(ocr_page_nums)} page(s) from the text layer and OCR'd {len(ocr_page_nums)}.")
+        if not full_text.strip():
+            print(f"OCR: Warning: No significant text extracted from PDF {pdf_name}.")
+        return full_text.strip(), [pages[page_num] for page_num in sorted(pages)]
 
     except Exception as e:
-        print(f"OCR: Error during PDF text extraction (direct or OCR fallback): {e}")
-        # If direct extraction fails, and then OCR fallback also fails, or initial open fails
+        print(f"OCR: Error during PDF text extraction (text layer or OCR): {e}")
         raise ValueError(f"Failed to extract text from PDF: {str(e)}. Ensure PyMuPDF and Tesseract are correctly installed and configured.")
 
-def _ocr_pdf_pages(pdf_path):
+def _ocr_page(page, dpi=OCR_DPI, mode=None):
     """
-    Performs OCR on each page of a PDF by converting pages to images.
+    Renders an open PDF page and runs Tesseract on it. Returns (text, seconds).
     """
-    ocr_text = ""
+    if (mode or OCR_MODE) == 'adaptive':
+        return _ocr_page_adaptive(page, dpi)
+    start = time.perf_counter()
+    # Render page to a high-resolution pixmap (image)
+    pix = page.get_pixmap(dpi=dpi) # Increased DPI for better OCR accuracy
+    # Convert pixmap to PIL Image
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    # Perform OCR using Tesseract
+    return pytesseract.image_to_string(img), time.perf_counter() - start
+
+# Scanned-PDF OCR pool, created on first use and shared by every request of this process
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+def _get_ocr_pool():
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                                mp_context=multiprocessing.get_context(OCR_POOL_START_METHOD))
+    return _ocr_pool
+
+def _single_page_pdf(doc, page_num):
+    """
+    Copies one page of an open PDF into a new one-page PDF (bytes).
+    """
+    with fitz.open() as single:
+        single.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        return single.tobytes()
+
+def _ocr_page_pdf(page_pdf, dpi=OCR_DPI, mode=None):
+    """
+    OCRs a one-page PDF. Runs inside the OCR pool processes, so only the page's PDF bytes and
+    its text cross process boundaries, never the rendered pixmap.
+    """
+    with fitz.open(stream=page_pdf, filetype='pdf') as doc:
+        return _ocr_page(doc.load_page(0), dpi, mode)
+
+def _ocr_in_pool(page_pdfs, dpi=OCR_DPI, mode=None):
+    """
+    OCRs one-page PDFs in the shared pool. Returns [(text, seconds), ...] in input order.
+    If a pool process died, the pool is dropped (the next request starts a new one) and the
+    pages are OCR'd in this process instead.
+    """
+    global _ocr_pool
+    pool = _get_ocr_pool()
     try:
-        doc = fitz.open(pdf_path)
-        for page_num, page in enumerate(doc):
-            # Render page to a high-resolution pixmap (image)
-            pix = page.get_pixmap(dpi=300) # Increased DPI for better OCR accuracy
-            # Convert pixmap to PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            # Perform OCR using Tesseract
-            page_text = pytesseract.image_to_string(img)
-            ocr_text += page_text + "\n--- End of Page " + str(page_num + 1) + " ---\n"
-        doc.close()
-        
-        if not ocr_text.strip():
-            print(f"OCR: Warning: No significant text extracted from PDF {pdf_path} via OCR.")
-        return ocr_text.strip()
+        return list(pool.map(_ocr_page_pdf, page_pdfs, repeat(dpi), repeat(mode or OCR_MODE)))
+    except BrokenProcessPool as e:
+        print(f"OCR: ⚠️ OCR pool failed ({e}); OCR'ing {len(page_pdfs)} pages in this process.")
+        with _ocr_pool_lock:
+            if _ocr_pool is pool:
+                _ocr_pool = None
+        pool.shutdown(wait=False)
+        return [_ocr_page_pdf(page_pdf, dpi, mode) for page_pdf in page_pdfs]
 
-    except Exception as e:
-        print(f"OCR: Error during PDF page OCR for {pdf_path}: {e}")
-        raise ValueError(f"Failed to perform OCR on PDF pages: {str(e)}. Ensure Tesseract OCR is installed and configured.")
+def _render_gray(page, dpi, clip=None):
+    """
+    Renders a page (or a clip of it) to a 2-D uint8 grayscale array.
+    """
+    pix = page.get_pixmap(dpi=dpi, clip=clip, colorspace=fitz.csGRAY, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+def _find_text_regions(gray, detect_dpi=OCR_DETECT_DPI):
+    """
+    Finds text blocks and table regions on a low-resolution grayscale render.
+    Ink is binarized with Otsu, then dilated so characters merge into lines and nearby
+    lines into blocks. Returns (x0, y0, x1, y1) boxes in pixels, in reading order.
+    """
+    if gray.size == 0 or int(gray.min()) > 200:
+        return [] # Blank page
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # Kernel sized for 72 DPI: ~one character wide, ~half a line high
+    scale = detect_dpi / 72.0
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, int(12 * scale)), max(2, int(4 * scale))))
+    dilated = cv2.dilate(binary, kernel, iterations=2)
+    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-def _extract_text_from_image(image_path):
+    min_height = max(3, int(4 * scale))
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < min_height or w * h < 4 * min_height * min_height:
+            continue # Specks, rules and scanner noise
+        regions.append((x, y, x + w, y + h))
+    regions.sort(key=lambda r: (r[1], r[0]))
+
+    # Merge vertically adjacent blocks into bands: fewer clips to re-render and a single
+    # reading order, while blank margins and gaps between sections are still skipped.
+    band_gap = max(2, int(12 * scale))
+    bands = []
+    for x0, y0, x1, y1 in regions:
+        if bands and y0 <= bands[-1][3] + band_gap:
+            bx0, by0, bx1, by1 = bands[-1]
+            bands[-1] = (min(bx0, x0), by0, max(bx1, x1), max(by1, y1))
+        else:
+            bands.append((x0, y0, x1, y1))
+    return bands
+
+def _ocr_page_adaptive(page, dpi=OCR_DPI, detect_dpi=OCR_DETECT_DPI):
     """
-    Extracts text from an image file using Tesseract OCR.
+    Adaptive-resolution OCR: locate text regions on a cheap low-DPI render, re-render only
+    those regions at `dpi`, stack them onto one compact canvas and run Tesseract once.
+    Falls back to the full page when the regions cover most of it, or when no usable region was
+    found (blank or very faint pages, regions clipped away by the page box). Returns (text, seconds).
     """
+    start = time.perf_counter()
+    preview = _render_gray(page, detect_dpi)
+    regions = _find_text_regions(preview, detect_dpi)
+
+    covered = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+    crops = []
+    if covered <= OCR_ROI_MAX_COVERAGE * preview.shape[0] * preview.shape[1]:
+        # Preview pixels -> PDF points, with a little padding so glyph edges are not clipped
+        to_points = 72.0 / detect_dpi
+        pad = 2
+        for x0, y0, x1, y1 in regions:
+            clip = fitz.Rect((x0 - pad) * to_points, (y0 - pad) * to_points,
+                             (x1 + pad) * to_points, (y1 + pad) * to_points) & page.rect
+            if not clip.is_empty:
+                crop = _render_gray(page, dpi, clip)
+                if crop.size:
+                    crops.append(crop)
+
+    if not crops:
+        img = Image.fromarray(_render_gray(page, dpi))
+        return pytesseract.image_to_string(img), time.perf_counter() - start
+
+    width = max(crop.shape[1] for crop in crops) + 2 * _ROI_GAP
+    height = sum(crop.shape[0] for crop in crops) + _ROI_GAP * (len(crops) + 1)
+    canvas = np.full((height, width), 255, dtype=np.uint8)
+    y = _ROI_GAP
+    for crop in crops:
+        canvas[y:y + crop.shape[0], _ROI_GAP:_ROI_GAP + crop.shape[1]] = crop
+        y += crop.shape[0] + _ROI_GAP
+
+    return pytesseract.image_to_string(Image.fromarray(canvas)), time.perf_counter() - start
+
+def _extract_text_from_image(source):
+    """
+    Extracts text from an image (file path or encoded bytes) using Tesseract OCR.
+    """
+    image_path = source if isinstance(source, str) else "<in-memory image>"
     try:
-        image = cv2.imread(image_path)
+        if isinstance(source, str):
+            image = cv2.imread(source)
+        else:
+            # np.frombuffer wraps the upload bytes without copying them
+            image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
         if image is None:
             raise ValueError(f"Could not read image file. Check if file exists and is a valid image: {image_path}")
         
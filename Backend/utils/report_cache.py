@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Layered cache for /predict/upload, keyed by the SHA-256 of the uploaded file:
+#   'text'       sha256@version              -> OCR / PDF text
+#   'gemini'     sha256:disease_id@version   -> structured dict returned by Gemini
+#   'prediction' sha256:disease_id@version   -> final {'risk_level', 'reason'} result
+# version is a version_hash() of everything else the value depends on (OCR settings, Gemini model,
+# prompts and schema, model artifacts), so retraining a model or changing OCR_MODE never serves
+# stale entries; those just age out.
+# Stored in SQLite so entries survive restarts and are shared by every worker process.
+REPORT_CACHE_ENABLED = os.getenv('REPORT_CACHE_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', os.path.join(PROJECT_ROOT, 'Backend', 'cache'))
+REPORT_CACHE_PATH = os.path.join(REPORT_CACHE_DIR, 'report_cache.sqlite3')
+
+# Per-layer (ttl_seconds, max_entries). Older or least-recently-used entries are evicted.
+CACHE_LAYERS = {
+    'text': (
+        int(os.getenv('REPORT_CACHE_TEXT_TTL', str(30 * 24 * 3600))),
+        int(os.getenv('REPORT_CACHE_TEXT_MAX_ENTRIES', '2000')),
+    ),
+    'gemini': (
+        int(os.getenv('REPORT_CACHE_GEMINI_TTL', str(7 * 24 * 3600))),
+        int(os.getenv('REPORT_CACHE_GEMINI_MAX_ENTRIES', '5000')),
+    ),
+    'prediction': (
+        int(os.getenv('REPORT_CACHE_PREDICTION_TTL', str(24 * 3600))),
+        int(os.getenv('REPORT_CACHE_PREDICTION_MAX_ENTRIES', '5000')),
+    ),
+}
+
+
+def file_sha256(data, chunk_size=1024 * 1024):
+    """
+    Hex SHA-256 of the uploaded file: bytes, or a binary stream read in chunks from its current position.
+    """
+    if not hasattr(data, 'read'):
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: data.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def version_hash(*parts):
+    """
+    Short, stable hash of the settings and artifact versions a cached value depends on.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def text_key(sha256, version):
+    return f"{sha256}@{version}"
+
+
+def disease_key(sha256, disease_id, version):
+    return f"{sha256}:{disease_id}@{version}"
+
+
+class ReportCache:
+    """
+    Size-bounded, TTL-expiring LRU cache on top of a single SQLite file.
+    Values are stored as JSON. Every layer has its own TTL and entry limit.
+    """
+
+    def __init__(self, path=REPORT_CACHE_PATH, layers=None, enabled=REPORT_CACHE_ENABLED):
+        self.path = path
+        self.layers = layers if layers is not None else CACHE_LAYERS
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._hits = {layer: 0 for layer in self.layers}
+        self._misses = {layer: 0 for layer in self.layers}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            # WAL lets several worker processes read while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " layer TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL,"
+                " PRIMARY KEY (layer, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (layer, last_access)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def get(self, layer, key):
+        """
+        Returns the cached value, or None on a miss, an expired entry or any cache error.
+        """
+        if not self.enabled:
+            return None
+        ttl, _ = self.layers[layer]
+        now = time.time()
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = self._connect()
+                try:
+                    row = conn.execute(
+                        "SELECT value, created_at FROM cache_entries WHERE layer = ? AND key = ?",
+                        (layer, key)
+                    ).fetchone()
+                    if row is not None and now - row[1] > ttl:
+                        conn.execute("DELETE FROM cache_entries WHERE layer = ? AND key = ?", (layer, key))
+                        conn.commit()
+                        row = None
+                    if row is None:
+                        self._misses[layer] += 1
+                        return None
+                    conn.execute(
+                        "UPDATE cache_entries SET last_access = ? WHERE layer = ? AND key = ?",
+                        (now, layer, key)
+                    )
+                    conn.commit()
+                    self._hits[layer] += 1
+                    return json.loads(row[0])
+                finally:
+                    conn.close()
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logging.warning(f"⚠️ Report cache read failed for {layer}/{key}: {e}")
+            return None
+
+    def set(self, layer, key, value):
+        """
+        Stores value (must be JSON-serializable) and evicts expired and least-recently-used entries
+        beyond the layer's size limit. Cache errors are logged and never raised.
+        """
+        if not self.enabled:
+            return
+        ttl, max_entries = self.layers[layer]
+        now = time.time()
+        try:
+            payload = json.dumps(value)
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cache_entries (layer, key, value, created_at, last_access)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (layer, key, payload, now, now)
+                    )
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE layer = ? AND created_at < ?",
+                        (layer, now - ttl)
+                    )
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE layer = ? AND key NOT IN ("
+                        " SELECT key FROM cache_entries WHERE layer = ? ORDER BY last_access DESC LIMIT ?)",
+                        (layer, layer, max_entries)
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logging.warning(f"⚠️ Report cache write failed for {layer}/{key}: {e}")
+
+    def clear(self, layer=None):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = self._connect()
+            try:
+                if layer is None:
+                    conn.execute("DELETE FROM cache_entries")
+                else:
+                    conn.execute("DELETE FROM cache_entries WHERE layer = ?", (layer,))
+                conn.commit()
+            finally:
+                conn.close()
+
+    def stats(self):
+        """
+        Hit/miss counters of this process per layer.
+        """
+        return {layer: {'hits': self._hits[layer], 'misses': self._misses[layer]} for layer in self.layers}
+
+
+# Shared by the report upload route
+report_cache = ReportCache()
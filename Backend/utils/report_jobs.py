@@ -0,0 +1,351 @@
+import os
+import ssl
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import ipaddress
+import threading
+import http.client
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from Backend.utils.report_cache import REPORT_CACHE_DIR
+
+# Background report analysis for /predict/upload?async=1.
+# Jobs run on a local thread pool; their state lives in SQLite so a poll can be answered
+# by any worker process, not only the one running the job.
+REPORT_JOB_WORKERS = int(os.getenv('REPORT_JOB_WORKERS', '2'))
+# Finished jobs are kept this long (seconds) for polling, then purged
+REPORT_JOB_TTL = int(os.getenv('REPORT_JOB_TTL', str(24 * 3600)))
+REPORT_JOB_DB_PATH = os.getenv('REPORT_JOB_DB_PATH', os.path.join(REPORT_CACHE_DIR, 'report_jobs.sqlite3'))
+REPORT_JOB_CALLBACK_TIMEOUT = float(os.getenv('REPORT_JOB_CALLBACK_TIMEOUT', '10'))
+# Comma-separated hostnames webhooks may be sent to (these may also be internal hosts). Empty allows
+# any http(s) host that resolves only to public addresses: loopback, private, link-local (cloud
+# metadata), reserved and multicast addresses are refused, so uploads cannot make the server call
+# internal services.
+REPORT_JOB_CALLBACK_HOSTS = [h.strip().lower() for h in os.getenv('REPORT_JOB_CALLBACK_HOSTS', '').split(',') if h.strip()]
+# A queued or running job not updated for this long (seconds) was lost to a crash or restart and is
+# marked failed, so clients stop polling it. The process holding a job refreshes it every
+# REPORT_JOB_HEARTBEAT seconds while it waits in the pool or runs a long stage, so only jobs whose
+# process is gone go stale; a job marked failed is never brought back by its worker.
+REPORT_JOB_STALE_AFTER = int(os.getenv('REPORT_JOB_STALE_AFTER', str(30 * 60)))
+REPORT_JOB_HEARTBEAT = float(os.getenv('REPORT_JOB_HEARTBEAT', '60'))
+
+# Stages a job moves through, in order
+JOB_STAGES = ['queued', 'reading', 'ocr', 'gemini', 'prediction', 'done']
+
+
+def _public_addresses(hostname, port):
+    """
+    Resolves hostname and returns its addresses. Raises ValueError if it does not resolve or if
+    any address is not globally routable.
+    """
+    try:
+        infos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"callback_url host '{hostname}' could not be resolved: {e}")
+    addresses = []
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host '{hostname}' resolves to a non-public address ({address}).")
+        addresses.append(str(address))
+    return list(dict.fromkeys(addresses))
+
+
+def validate_callback_url(callback_url):
+    """
+    Raises ValueError unless callback_url is an http(s) URL on an allowed host: one listed in
+    REPORT_JOB_CALLBACK_HOSTS or, without a list, one resolving only to public addresses.
+    Returns (parsed url, address to connect to).
+    """
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("callback_url must be an absolute http(s) URL.")
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    except ValueError:
+        raise ValueError("callback_url has an invalid port.")
+    if REPORT_JOB_CALLBACK_HOSTS:
+        if parsed.hostname.lower() not in REPORT_JOB_CALLBACK_HOSTS:
+            raise ValueError(f"callback_url host '{parsed.hostname}' is not allowed.")
+        return parsed, parsed.hostname
+    return parsed, _public_addresses(parsed.hostname, port)[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """
+    Connects to an address resolved (and checked) beforehand, so DNS cannot change between the
+    check and the request. The Host header still carries the URL's hostname.
+    """
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self._address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self._address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """
+    HTTPS variant of _PinnedHTTPConnection; the certificate is verified against the URL's hostname.
+    """
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout, context=ssl.create_default_context())
+        self._address = address
+
+    def connect(self):
+        sock = socket.create_connection((self._address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def post_callback(callback_url, payload, timeout=REPORT_JOB_CALLBACK_TIMEOUT):
+    """
+    POSTs JSON bytes to callback_url after re-validating it. Redirects are not followed.
+    Returns the HTTP status code.
+    """
+    parsed, address = validate_callback_url(callback_url)
+    connection_class = _PinnedHTTPSConnection if parsed.scheme == 'https' else _PinnedHTTPConnection
+    conn = connection_class(parsed.hostname, parsed.port, address, timeout)
+    try:
+        path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        conn.request('POST', path, body=payload, headers={'Content-Type': 'application/json'})
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+class ReportJobQueue:
+    """
+    Runs report analyses in the background and records their progress.
+
+    submit(task) queues task(on_stage) on the pool; task reports progress by calling
+    on_stage(stage_name) and returns (response_body, http_status). get(job_id) returns the
+    job's status, current stage, per-stage timings and, once finished, the response body.
+    """
+
+    def __init__(self, db_path=REPORT_JOB_DB_PATH, workers=REPORT_JOB_WORKERS, ttl=REPORT_JOB_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._initialized = False
+        # Jobs submitted by this process and not finished yet, refreshed by the heartbeat thread
+        self._active = set()
+        self._heartbeat = None
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_jobs ("
+                " job_id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT NOT NULL,"
+                " stages TEXT NOT NULL, disease_ids TEXT NOT NULL, callback_url TEXT,"
+                " result TEXT, http_status INTEGER, error TEXT, callback TEXT,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def _pool(self):
+        # Created on first use so importing this module never starts threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='report-job')
+            return self._executor
+
+    def _start_heartbeat(self):
+        # One thread per process; after a fork the parent's thread is not running in the child
+        with self._lock:
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._beat, name='report-job-heartbeat', daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self):
+        # Several beats per stale window, so one slow beat cannot let a live job go stale
+        interval = min(REPORT_JOB_HEARTBEAT, REPORT_JOB_STALE_AFTER / 3)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                job_ids = list(self._active)
+            if not job_ids:
+                continue
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        f"UPDATE report_jobs SET updated_at = ? WHERE status IN ('queued', 'running')"
+                        f" AND job_id IN ({', '.join('?' * len(job_ids))})", (time.time(), *job_ids)
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logging.warning(f"⚠️ Report job heartbeat failed: {e}")
+
+    def _update(self, job_id, live_only=False, **fields):
+        """
+        Updates a job's columns. With live_only=True only a queued or running job is updated, so a
+        job already marked failed stays failed. Returns True if the row was updated.
+        """
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        query = f"UPDATE report_jobs SET {columns} WHERE job_id = ?"
+        if live_only:
+            query += " AND status IN ('queued', 'running')"
+        conn = self._connect()
+        try:
+            updated = conn.execute(query, (*fields.values(), job_id)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return updated > 0
+
+    def _row(self, job_id):
+        conn = self._connect()
+        try:
+            self._fail_stale(conn, job_id)
+            conn.commit()
+            conn.row_factory = sqlite3.Row
+            return conn.execute("SELECT * FROM report_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def _fail_stale(self, conn, job_id=None):
+        # Jobs whose worker died (crash, restart) would otherwise stay queued/running forever
+        now = time.time()
+        query = ("UPDATE report_jobs SET status = 'failed', http_status = 500, error = ?, updated_at = ?"
+                 " WHERE status IN ('queued', 'running') AND updated_at < ?")
+        params = ["Job was interrupted (server restart or crash) before it finished. Please upload the report again.",
+                  now, now - REPORT_JOB_STALE_AFTER]
+        if job_id is not None:
+            query += " AND job_id = ?"
+            params.append(job_id)
+        conn.execute(query, params)
+
+    def _purge_expired(self):
+        conn = self._connect()
+        try:
+            self._fail_stale(conn)
+            conn.execute(
+                "DELETE FROM report_jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (time.time() - self.ttl,)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def submit(self, task, disease_ids, callback_url=None):
+        """
+        Queues task and returns the new job id.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        stages = [{"name": "queued", "started_at": now, "finished_at": None}]
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO report_jobs (job_id, status, stage, stages, disease_ids, callback_url, created_at, updated_at)"
+                " VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(stages), json.dumps(disease_ids), callback_url, now, now)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._purge_expired()
+        with self._lock:
+            self._active.add(job_id)
+        self._start_heartbeat()
+        self._pool().submit(self._run, job_id, task, stages)
+        return job_id
+
+    def _run(self, job_id, task, stages):
+        try:
+            self._run_job(job_id, task, stages)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _run_job(self, job_id, task, stages):
+        def on_stage(stage):
+            now = time.time()
+            stages[-1]["finished_at"] = now
+            stages.append({"name": stage, "started_at": now, "finished_at": None})
+            self._update(job_id, live_only=True, stage=stage, stages=json.dumps(stages))
+            print(f"⏳ Report job {job_id}: stage '{stage}'")
+
+        if not self._update(job_id, live_only=True, status='running'):
+            print(f"⚠️ Report job {job_id} was already marked failed or purged; not running it.")
+            return
+        try:
+            body, http_status = task(on_stage)
+            status = 'succeeded' if http_status < 400 else 'failed'
+            error = body.get('error') if status == 'failed' and isinstance(body, dict) else None
+        except Exception as e:
+            logging.error(f"❌ Report job {job_id} crashed: {e}", exc_info=True)
+            body, http_status, status, error = None, 500, 'failed', str(e)
+
+        now = time.time()
+        stages[-1]["finished_at"] = now
+        stages.append({"name": "done", "started_at": now, "finished_at": now})
+        if not self._update(job_id, live_only=True, status=status, stage='done', stages=json.dumps(stages),
+                            result=json.dumps(body), http_status=http_status, error=error):
+            print(f"⚠️ Report job {job_id} finished after it was marked failed; its result was discarded.")
+            return
+        print(f"✅ Report job {job_id} {status} in {now - stages[0]['started_at']:.2f}s")
+
+        row = self._row(job_id)
+        if row is not None and row['callback_url']:
+            self._send_callback(job_id, row['callback_url'])
+
+    def _send_callback(self, job_id, callback_url):
+        """
+        POSTs the finished job (same JSON as GET /predict/jobs/<id>) to the client's webhook.
+        """
+        payload = json.dumps(self.get(job_id)).encode('utf-8')
+        try:
+            # Checked again here: the host's DNS may have changed since the upload was accepted
+            callback = {"status_code": post_callback(callback_url, payload), "sent_at": time.time()}
+        except Exception as e:
+            logging.warning(f"⚠️ Webhook for report job {job_id} to {callback_url} failed: {e}")
+            callback = {"error": str(e), "sent_at": time.time()}
+        self._update(job_id, callback=json.dumps(callback))
+
+    def get(self, job_id):
+        """
+        Returns the public view of a job, or None if it does not exist (or has expired).
+        """
+        row = self._row(job_id)
+        if row is None:
+            return None
+        job = {
+            "job_id": row['job_id'],
+            "status": row['status'],
+            "stage": row['stage'],
+            "stages": json.loads(row['stages']),
+            "disease_ids": json.loads(row['disease_ids']),
+            "created_at": row['created_at'],
+            "updated_at": row['updated_at'],
+        }
+        if row['status'] in ('succeeded', 'failed'):
+            job["http_status"] = row['http_status']
+            job["result"] = json.loads(row['result']) if row['result'] else None
+            job["error"] = row['error']
+        if row['callback']:
+            job["callback"] = json.loads(row['callback'])
+        return job
+
+
+# Shared by the report upload route
+report_jobs = ReportJobQueue()
@@ -0,0 +1,109 @@
+import os
+import importlib
+import numpy as np
+
+from ml_model.inference.image_preprocess import IMAGE_SIZE
+
+# Which implementation serves /predict-image. Both expose the same functions
+# (ensure_cv_model_loaded, is_cv_model_loaded, predict_disease_from_image,
+# predict_top_k_from_images, batching_stats):
+#   'torch': ml_model/inference/image_predict.py (torch + torchvision, eager/TorchScript/int8)
+#   'onnx':  ml_model/inference/onnx_predict.py (onnxruntime + numpy + Pillow; torch is never imported)
+# This module itself is torch-free, so the web process can pick a backend without importing torch.
+CV_BACKEND = os.getenv('CV_BACKEND', 'torch').strip().lower()
+CV_BACKEND_MODULES = {
+    'torch': 'ml_model.inference.image_predict',
+    'onnx': 'ml_model.inference.onnx_predict',
+}
+IMAGE_PREDICT_MODULE = CV_BACKEND_MODULES.get(CV_BACKEND, CV_BACKEND_MODULES['torch'])
+
+# Micro-batching of concurrent single-image requests, used by both backends
+CV_BATCHING_ENABLED = os.getenv('CV_BATCHING_ENABLED', '1').strip().lower() not in ('0', 'false', 'no')
+CV_BATCH_MAX_SIZE = int(os.getenv('CV_BATCH_MAX_SIZE', '8'))
+CV_BATCH_MAX_WAIT_MS = float(os.getenv('CV_BATCH_MAX_WAIT_MS', '5'))
+
+# ONNX export of the trained ResNet18 (ml_model/training/cv_export.py); class names are
+# stored in the model's metadata under ONNX_CLASS_NAMES_KEY
+SAVED_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'saved-model')
+ONNX_MODEL_PATH = os.path.join(SAVED_MODEL_DIR, 'cv_model.onnx')
+ONNX_CLASS_NAMES_KEY = 'class_names'
+
+
+def load_backend():
+    """
+    Imports the configured backend module (on first use; later calls hit sys.modules).
+    """
+    if CV_BACKEND not in CV_BACKEND_MODULES:
+        print(f"⚠️ Unknown CV_BACKEND '{CV_BACKEND}'. Using the torch backend.")
+    return importlib.import_module(IMAGE_PREDICT_MODULE)
+
+
+def batch_array(n, size=IMAGE_SIZE):
+    """
+    An uninitialized (n, 3, height, width) float32 model input batch; preprocess writes rows into it.
+    """
+    return np.empty((n, 3, size[1], size[0]), dtype=np.float32)
+
+
+def batch_collator(max_batch):
+    """
+    For a MicroBatcher's run_batch: returns collate(arrays), which copies the per-request
+    (3, H, W) arrays into one (max_batch, 3, H, W) buffer allocated here once and returns its
+    filled leading rows, so batches never allocate. The buffer is reused by the next batch, so
+    only call collate from the batcher's worker thread.
+    """
+    buffer = batch_array(max_batch)
+
+    def collate(arrays):
+        return np.stack(arrays, out=buffer[:len(arrays)])
+    return collate
+
+
+def top_k(probabilities, k, class_names):
+    """
+    The k most likely classes of one probability row, most likely first.
+    """
+    candidates = np.argpartition(probabilities, -k)[-k:]
+    ranked = candidates[np.argsort(probabilities[candidates])[::-1]]
+    return [{"class": class_names[i], "probability": round(float(probabilities[i]), 6)} for i in ranked]
+
+
+def rank_images(images, k, aggregate, preprocess, predict_proba, class_names):
+    """
+    Shared by both backends' predict_top_k_from_images: decodes every (filename, image_bytes)
+    with preprocess(image_bytes, out=row) straight into one preallocated batch array, runs
+    predict_proba once on the decoded rows (an (n, n_classes) array) and ranks the top k
+    classes per image. Images that cannot be decoded get an 'error' entry and their row is
+    reused by the next image. With aggregate=True a per-visit ranking is added, from each
+    class's mean probability.
+    """
+    k = max(1, min(int(k), len(class_names)))
+    batch = batch_array(len(images))
+    per_image, positions = [], []
+    for filename, image_bytes in images:
+        entry = {"filename": filename}
+        try:
+            preprocess(image_bytes, out=batch[len(positions)])
+            positions.append(len(per_image))
+        except Exception as e:
+            entry["error"] = f"Invalid image: {e}"
+        per_image.append(entry)
+
+    result = {"top_k": k, "images": per_image, "decoded": len(positions)}
+    if not positions:
+        return result
+    try:
+        probabilities = np.asarray(predict_proba(batch[:len(positions)]))
+    except Exception as e:
+        raise ValueError(f"Error during batch prediction: {e}")
+
+    for position, row in zip(positions, probabilities):
+        ranked = top_k(row, k, class_names)
+        per_image[position].update(prediction=ranked[0]["class"], top_k=ranked)
+    if aggregate:
+        result["visit"] = {
+            "method": "mean_probability",
+            "images_used": len(positions),
+            "top_k": top_k(probabilities.mean(axis=0), k, class_names),
+        }
+    return result
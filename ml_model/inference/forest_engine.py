@@ -0,0 +1,231 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Bump when the on-disk layout written by CompiledForest.save changes
+FOREST_FORMAT_VERSION = 1
+FOREST_DIR_EXTENSION = '.forest'
+
+_ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'missing_left', 'leaf_value', 'roots')
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous numpy arrays.
+
+    All trees share one node table (feature, threshold, left, right, missing_left, leaf_value);
+    roots holds the index of each tree's root. Leaves point to themselves, so traversal is a
+    fixed number of vectorized steps over an (n_samples, n_trees) index matrix with no
+    per-tree Python calls.
+
+    predict_proba reproduces sklearn's arithmetic (float32 inputs, per-tree leaf
+    normalization, accumulation in tree order, division by n_estimators), so the
+    probabilities are bit-identical to RandomForestClassifier.predict_proba.
+    """
+
+    def __init__(self, arrays, classes, max_depth, n_features):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.missing_left = arrays['missing_left']
+        self.leaf_value = arrays['leaf_value']
+        self.roots = arrays['roots']
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """
+        Flattens a fitted sklearn RandomForestClassifier (single output).
+        """
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("CompiledForest only supports single-output forests.")
+        n_classes = len(forest.classes_)
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+            is_leaf = tree.children_left < 0
+
+            # Leaves loop back to themselves and test feature 0, so extra traversal steps are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(np.asarray(tree.threshold, dtype=np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)), dtype=bool))
+
+            # Same normalization as DecisionTreeClassifier.predict_proba, done once per node
+            proba = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            'feature': np.ascontiguousarray(np.concatenate(features)),
+            'threshold': np.ascontiguousarray(np.concatenate(thresholds)),
+            'left': np.ascontiguousarray(np.concatenate(lefts)),
+            'right': np.ascontiguousarray(np.concatenate(rights)),
+            'missing_left': np.ascontiguousarray(np.concatenate(missing)),
+            'leaf_value': np.ascontiguousarray(np.concatenate(values)),
+            'roots': np.asarray(roots, dtype=np.int64),
+        }
+        return cls(arrays, forest.classes_, max_depth, forest.n_features_in_)
+
+    def apply(self, X):
+        """
+        Returns the global leaf index reached in every tree, shape (n_samples, n_estimators).
+        """
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}.")
+
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators)).copy()
+        check_missing = bool(np.isnan(X).any())
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if check_missing:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], len(self.classes_)), dtype=np.float64)
+        # Accumulate tree by tree, in estimator order, exactly like RandomForestClassifier
+        for t in range(self.n_estimators):
+            proba += self.leaf_value[leaves[:, t]]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def save(self, directory, source_sha256=None):
+        """
+        Writes the node table as raw .npy files plus a manifest.json. source_sha256 (see
+        file_sha256) identifies the .pkl the table was exported from, so a loader can tell
+        whether the table still matches that model.
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+            'right': self.right, 'missing_left': self.missing_left,
+            'leaf_value': self.leaf_value, 'roots': self.roots,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+        manifest = {
+            'format_version': FOREST_FORMAT_VERSION,
+            'classes': self.classes_.tolist(),
+            'max_depth': self.max_depth,
+            'n_features': self.n_features_in_,
+            'n_estimators': self.n_estimators,
+            'n_nodes': int(len(self.feature)),
+            'source_sha256': source_sha256,
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Opens a saved node table. With mmap_mode='r' the arrays are mapped from disk,
+        so every worker process shares the same physical pages.
+        """
+        manifest = read_manifest(directory)
+        if manifest.get('format_version') != FOREST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version {manifest.get('format_version')} in {directory}")
+        # np.asarray drops the np.memmap subclass (cheaper fancy indexing) but keeps the mapped buffer
+        arrays = {name: np.asarray(np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode))
+                  for name in _ARRAY_NAMES}
+        return cls(arrays, manifest['classes'], manifest['max_depth'], manifest['n_features'])
+
+
+class CompiledForestPipeline:
+    """
+    Drop-in replacement for a fitted Pipeline(preprocessor, RandomForestClassifier).
+    The preprocessing steps still run through sklearn; only the forest is swapped out.
+    """
+
+    def __init__(self, pipeline, forest):
+        self.pipeline = pipeline
+        self.forest = forest
+        self.preprocess = pipeline[:-1] if len(pipeline.steps) > 1 else None
+        self.classes_ = forest.classes_
+
+    def _transform(self, X):
+        return self.preprocess.transform(X) if self.preprocess is not None else X
+
+    def predict_proba(self, X):
+        return self.forest.predict_proba(self._transform(X))
+
+    def predict(self, X):
+        return self.forest.predict(self._transform(X))
+
+
+def file_sha256(path):
+    """
+    Hex sha256 of a file's content (model pickles are at most a few MB).
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        return json.load(f)
+
+
+def final_forest(model):
+    """
+    Returns the RandomForestClassifier at the end of model (a Pipeline or a bare forest), or None.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    estimator = model.steps[-1][1] if hasattr(model, 'steps') else model
+    return estimator if isinstance(estimator, RandomForestClassifier) else None
+
+
+def compile_model(model, forest_dir=None, compiled_forest=None):
+    """
+    Wraps a fitted forest or forest pipeline with the compiled engine.
+    compiled_forest (an already loaded node table) is used as is; otherwise, if forest_dir holds a
+    saved node table it is memory-mapped instead of re-flattening the trees.
+    Returns None when model does not end in a RandomForestClassifier.
+    """
+    forest = final_forest(model)
+    if forest is None:
+        return None
+
+    if compiled_forest is not None:
+        compiled = compiled_forest
+    elif forest_dir and os.path.isdir(forest_dir):
+        compiled = CompiledForest.load(forest_dir)
+    else:
+        compiled = CompiledForest.from_sklearn(forest)
+
+    if hasattr(model, 'steps'):
+        return CompiledForestPipeline(model, compiled)
+    return compiled
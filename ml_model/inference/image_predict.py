@@ -1,9 +1,17 @@
 import os
+import json
 import torch
 import torch.nn as nn
 from torchvision import transforms, models
 from PIL import Image
 import io
+import threading
+import numpy as np
+
+from ml_model.inference.micro_batcher import MicroBatcher
+from ml_model.inference.forest_engine import file_sha256
+from ml_model.inference.image_preprocess import preprocess_array, CV_FAST_PREPROCESS
+from ml_model.inference.cv_backend import rank_images, batch_collator, CV_BATCHING_ENABLED, CV_BATCH_MAX_SIZE, CV_BATCH_MAX_WAIT_MS
 
 # --- Model Loading (to be used by Flask) ---
 # Get the absolute path to the 'ml_model' directory
@@ -12,71 +20,234 @@ ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Thi
 # Path to the saved PyTorch model
 MODEL_PATH = os.path.join(ML_MODEL_DIR, 'saved-model', 'cv_model.pth')
 
+# Which variant of the CV model to serve. 'eager' rebuilds torchvision's resnet18 from
+# cv_model.pth; 'torchscript' (frozen fp32 graph) and 'int8' (statically quantized graph) are
+# written by ml_model/training/cv_export.py. No exports are committed: a variant that is missing,
+# exported from another cv_model.pth or fails to load falls back to eager with a warning, and
+# /predict-image/stats shows the variant actually served and why.
+CV_MODEL_VARIANT = os.getenv('CV_MODEL_VARIANT', 'eager').strip().lower()
+MODEL_VARIANT_PATHS = {
+    'torchscript': os.path.join(ML_MODEL_DIR, 'saved-model', 'cv_model.torchscript.pt'),
+    'int8': os.path.join(ML_MODEL_DIR, 'saved-model', 'cv_model.int8.torchscript.pt'),
+}
+# Stored inside the TorchScript archives, so they do not need cv_model.pth
+CLASS_NAMES_FILE = 'class_names.json'
+# sha256 of the cv_model.pth an archive was exported from; when that checkpoint is present it must match
+SOURCE_HASH_FILE = 'source_sha256'
+
 # Initialize model and class_names globally so they are loaded once
 model = None
 class_names = []
 transform = None
+loaded_variant = None
+# Why CV_MODEL_VARIANT is not the variant being served (None when it is)
+variant_fallback_reason = None
 
-def load_cv_model():
-    """Loads the PyTorch CV model and its associated assets."""
-    global model, class_names, transform # Declare intent to modify global variables
+def make_transform():
+    # Must be the same as training (ml_model/training/cv_train.py)
+    return transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor()
+    ])
 
-    if os.path.exists(MODEL_PATH):
-        try:
-            checkpoint = torch.load(MODEL_PATH, map_location=torch.device('cpu'))
+def select_quantized_engine():
+    """
+    Picks the int8 kernel backend for this CPU (fbgemm/x86 on Intel/AMD, qnnpack on ARM).
+    """
+    engines = torch.backends.quantized.supported_engines
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError(f"No int8 quantization engine available (supported: {engines}).")
 
-            # Recreate the model architecture (e.g., ResNet18)
-            model = models.resnet18(pretrained=False)
+def build_eager_model(checkpoint_path=MODEL_PATH):
+    """
+    Rebuilds the fp32 ResNet18 from a cv_train.py checkpoint. Returns (model, class_names).
+    """
+    checkpoint = torch.load(checkpoint_path, map_location=torch.device('cpu'))
 
-            # Ensure class_names exist in checkpoint to set FC layer correctly
-            loaded_class_names = checkpoint.get('class_names')
-            if loaded_class_names is None or not isinstance(loaded_class_names, list) or len(loaded_class_names) == 0:
-                raise ValueError("Class names not found or invalid in checkpoint.")
+    # Ensure class_names exist in checkpoint to set FC layer correctly
+    loaded_class_names = checkpoint.get('class_names')
+    if loaded_class_names is None or not isinstance(loaded_class_names, list) or len(loaded_class_names) == 0:
+        raise ValueError("Class names not found or invalid in checkpoint.")
 
-            model.fc = nn.Linear(model.fc.in_features, len(loaded_class_names))
-            model.load_state_dict(checkpoint['model_state_dict'])
-            model.eval() # Set model to evaluation mode
+    # Recreate the model architecture (e.g., ResNet18)
+    eager_model = models.resnet18(pretrained=False)
+    eager_model.fc = nn.Linear(eager_model.fc.in_features, len(loaded_class_names))
+    eager_model.load_state_dict(checkpoint['model_state_dict'])
+    eager_model.eval() # Set model to evaluation mode
+    return eager_model, loaded_class_names
 
-            class_names = loaded_class_names
-            print(f"✅ CV Model loaded successfully from {MODEL_PATH}. Classes: {class_names}")
+def variant_extra_files(class_names, checkpoint_path=MODEL_PATH):
+    """
+    The _extra_files cv_export.py stores in a TorchScript archive exported from checkpoint_path.
+    """
+    return {CLASS_NAMES_FILE: json.dumps(class_names), SOURCE_HASH_FILE: file_sha256(checkpoint_path)}
 
-            # Define the transforms (must be the same as training)
-            transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor()
-            ])
+def load_scripted_model(path):
+    """
+    Loads a TorchScript archive written by cv_export.py. Returns (model, class_names, source_sha256),
+    source_sha256 being '' for archives exported without it.
+    """
+    extra_files = {CLASS_NAMES_FILE: '', SOURCE_HASH_FILE: ''}
+    scripted = torch.jit.load(path, map_location=torch.device('cpu'), _extra_files=extra_files)
+    scripted.eval()
+    source_sha256 = extra_files[SOURCE_HASH_FILE]
+    if isinstance(source_sha256, bytes):
+        source_sha256 = source_sha256.decode()
+    return scripted, json.loads(extra_files[CLASS_NAMES_FILE]), source_sha256
+
+def _load_variant(variant):
+    """
+    Loads an exported variant. Returns ((model, class_names), None), or (None, reason) to fall back to eager.
+    """
+    path = MODEL_VARIANT_PATHS.get(variant)
+    if path is None:
+        return None, f"unknown variant '{variant}'"
+    if not os.path.exists(path):
+        return None, f"{path} not found (run ml_model/training/cv_export.py)"
+    try:
+        if variant == 'int8':
+            select_quantized_engine()
+        scripted, loaded_class_names, source_sha256 = load_scripted_model(path)
+    except Exception as e:
+        return None, f"failed to load {path}: {e}"
+    # Content hash, not mtimes (arbitrary after a checkout): the export must come from the checkpoint eager would serve
+    if os.path.exists(MODEL_PATH) and source_sha256 != file_sha256(MODEL_PATH):
+        return None, f"{path} was not exported from the current {MODEL_PATH} (re-run ml_model/training/cv_export.py)"
+    return (scripted, loaded_class_names), None
+
+def load_cv_model():
+    """Loads the PyTorch CV model and its associated assets."""
+    global model, class_names, transform, loaded_variant, variant_fallback_reason # Declare intent to modify global variables
+
+    variant_fallback_reason = None
+    if CV_MODEL_VARIANT != 'eager':
+        loaded, variant_fallback_reason = _load_variant(CV_MODEL_VARIANT)
+        if variant_fallback_reason:
+            print(f"⚠️ CV_MODEL_VARIANT={CV_MODEL_VARIANT}: {variant_fallback_reason}. Using the eager model.")
+        if loaded is not None:
+            model, class_names = loaded
+            transform = make_transform()
+            loaded_variant = CV_MODEL_VARIANT
+            print(f"✅ CV Model ({CV_MODEL_VARIANT}) loaded from {MODEL_VARIANT_PATHS[CV_MODEL_VARIANT]}. Classes: {class_names}")
+            return
+
+    if os.path.exists(MODEL_PATH):
+        try:
+            model, class_names = build_eager_model(MODEL_PATH)
+            transform = make_transform()
+            loaded_variant = 'eager'
+            print(f"✅ CV Model loaded successfully from {MODEL_PATH}. Classes: {class_names}")
 
         except Exception as e:
             print(f"❌ Failed to load CV model or process checkpoint: {e}")
             model = None # Ensure model is None on failure
             class_names = []
             transform = None
+            loaded_variant = None
     else:
         print(f"⚠️ CV Model file not found at {MODEL_PATH}. Prediction will not work.")
         model = None
         class_names = []
         transform = None
+        loaded_variant = None
+
+# The model is loaded on first use (or by the background warm-up in Backend/app.py),
+# not when this module is imported.
+_load_lock = threading.Lock()
+_load_attempted = False
+
+def ensure_cv_model_loaded():
+    """
+    Loads the CV model once per process. Safe to call from concurrent requests.
+    Returns True if the model is available.
+    """
+    global _load_attempted
+    if not _load_attempted:
+        with _load_lock:
+            if not _load_attempted:
+                load_cv_model()
+                _load_attempted = True
+    return model is not None
+
+def is_cv_model_loaded():
+    return model is not None
+
+def preprocess_image(image_bytes, out=None):
+    """
+    Decodes raw image bytes into the model's (3, 224, 224) float32 input array, written into out
+    when given (a row of a batch array). By default uses the reduced-size JPEG decode in
+    image_preprocess.py; CV_FAST_PREPROCESS=0 runs the training transform.
+    """
+    if CV_FAST_PREPROCESS:
+        return preprocess_array(image_bytes, out)
+    pixels = transform(Image.open(io.BytesIO(image_bytes)).convert('RGB')).numpy()
+    if out is None:
+        return pixels
+    np.copyto(out, pixels)
+    return out
+
+def predict_tensor_batch(batch):
+    """
+    Runs one forward pass over an (n, 3, 224, 224) float32 array of preprocessed images and
+    returns one class name per image, in order. The array is wrapped, not copied.
+    """
+    with torch.no_grad():
+        output = model(torch.from_numpy(batch))
+        predicted = torch.argmax(output, dim=1)
+    return [class_names[i] for i in predicted.tolist()]
+
+# Concurrent /predict-image requests share forward passes: each request decodes its own image,
+# then waits while the batcher copies up to CV_BATCH_MAX_SIZE images (or whatever arrived within
+# CV_BATCH_MAX_WAIT_MS of the first one) into one reused batch buffer. Set CV_BATCHING_ENABLED=0 for batch-1.
+_collate = batch_collator(CV_BATCH_MAX_SIZE)
+image_batcher = MicroBatcher(lambda arrays: predict_tensor_batch(_collate(arrays)), max_batch=CV_BATCH_MAX_SIZE,
+                             max_wait_ms=CV_BATCH_MAX_WAIT_MS, name='cv-batcher')
 
-# Load the model when this module is imported
-load_cv_model()
+def predict_proba_batch(batch):
+    """
+    Runs one forward pass over an (n, 3, 224, 224) float32 array of preprocessed images and
+    returns an (n_images, n_classes) numpy array of softmax probabilities.
+    """
+    with torch.no_grad():
+        return torch.softmax(model(torch.from_numpy(batch)), dim=1).numpy()
+
+def predict_top_k_from_images(images, k=5, aggregate=False):
+    """
+    Ranks the k most likely classes for several images (e.g. all photos of one visit) in a
+    single forward pass. images is a list of (filename, image_bytes); images that cannot be
+    decoded get an 'error' entry and the rest are still ranked.
+
+    With aggregate=True a per-visit ranking is added, from the mean probability of each class
+    over the decoded images.
+    """
+    ensure_cv_model_loaded()
+    if model is None or transform is None or not class_names:
+        raise RuntimeError("CV model not loaded or initialized properly. Cannot make prediction.")
+    return rank_images(images, k, aggregate, preprocess_image, predict_proba_batch, class_names)
+
+def batching_stats():
+    """
+    Micro-batching metrics (queue depth, batch sizes, wait and run times).
+    """
+    return dict(image_batcher.stats(), enabled=CV_BATCHING_ENABLED, model_variant=loaded_variant,
+                model_variant_requested=CV_MODEL_VARIANT, model_variant_fallback=variant_fallback_reason)
 
 def predict_disease_from_image(image_bytes):
     """
     Predicts the disease from raw image bytes using the loaded CV model.
     """
+    ensure_cv_model_loaded()
     if model is None or transform is None or not class_names:
         raise RuntimeError("CV model not loaded or initialized properly. Cannot make prediction.")
 
     try:
-        # Open image from bytes stream
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        image = transform(image).unsqueeze(0) # Add batch dimension
-
-        with torch.no_grad():
-            output = model(image)
-            _, predicted = torch.max(output, 1)
-
-        return class_names[predicted.item()]
+        image = preprocess_image(image_bytes)
+        if CV_BATCHING_ENABLED:
+            return image_batcher.predict(image)
+        return predict_tensor_batch(image[np.newaxis])[0]
     except Exception as e:
         raise ValueError(f"Error during image processing or prediction: {e}")
 
@@ -0,0 +1,54 @@
+import io
+import os
+import numpy as np
+from PIL import Image
+
+# Fast decode + resize for the CV backends (torch-free, shared by image_predict.py and onnx_predict.py).
+# The training transform (ml_model/training/cv_train.py: Resize((224, 224)) + ToTensor) decodes the
+# full image and resizes it with PIL bilinear; for a 12 MP phone photo that full-resolution decode
+# and resize cost far more than the forward pass. Here:
+#   - JPEGs are decoded by libjpeg at a reduced scale (1/2, 1/4 or 1/8, via Image.draft), keeping
+#     at least CV_DECODE_SCALE x the target size, so the bilinear filter still sees enough pixels
+#   - other formats are shrunk by an integer box reduce first (resize reducing_gap)
+#   - the uint8 result is scaled to [0, 1] and laid out CHW in one numpy pass, straight into a row
+#     of the caller's preallocated batch array when given (cv_backend.rank_images)
+# Output stays within a few 1/255 steps of the training transform (Backend/test_image_preprocess.py).
+# CV_FAST_PREPROCESS=0 restores the exact full-resolution path.
+CV_FAST_PREPROCESS = os.getenv('CV_FAST_PREPROCESS', '1').strip().lower() not in ('0', 'false', 'no')
+CV_DECODE_SCALE = max(1, int(os.getenv('CV_DECODE_SCALE', '2')))
+
+IMAGE_SIZE = (224, 224)
+# Integer reduce only while the image stays 3x larger than the target (PIL's recommended quality setting)
+REDUCING_GAP = 3.0
+
+
+def decode_resized(image_bytes, size=IMAGE_SIZE, fast=CV_FAST_PREPROCESS):
+    """
+    Decodes raw image bytes to a (height, width, 3) uint8 RGB array resized to size (width, height),
+    bilinear like transforms.Resize. fast=False decodes at full resolution (the training transform).
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if not fast:
+        return np.asarray(image.convert('RGB').resize(size, Image.BILINEAR))
+    if image.format == 'JPEG':
+        # Must run before the pixels are loaded; picks the largest DCT scaling that keeps both sides >= the request
+        image.draft('RGB', (size[0] * CV_DECODE_SCALE, size[1] * CV_DECODE_SCALE))
+    return np.asarray(image.convert('RGB').resize(size, Image.BILINEAR, reducing_gap=REDUCING_GAP))
+
+
+def to_chw_float(pixels, out=None):
+    """
+    (H, W, 3) uint8 -> (3, H, W) float32 in [0, 1], the numpy equivalent of ToTensor.
+    Written into out when given (e.g. a row of a preallocated batch array).
+    """
+    if out is None:
+        out = np.empty((pixels.shape[2], pixels.shape[0], pixels.shape[1]), dtype=np.float32)
+    np.divide(pixels.transpose(2, 0, 1), np.float32(255), out=out, dtype=np.float32)
+    return out
+
+
+def preprocess_array(image_bytes, out=None, size=IMAGE_SIZE, fast=CV_FAST_PREPROCESS):
+    """
+    Raw image bytes -> the model's (3, 224, 224) float32 input as a numpy array.
+    """
+    return to_chw_float(decode_resized(image_bytes, size, fast), out)
@@ -0,0 +1,138 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching for per-request inference.
+
+    Request threads call submit(item) and wait on the returned Future. One worker thread takes
+    the first waiting item, then keeps collecting until it has max_batch items or max_wait_ms
+    has passed since that first item, calls run_batch(items) once for the whole batch and hands
+    result i to the i-th caller. run_batch must return one result per item, in order; if it
+    raises, every caller in that batch gets the exception.
+
+    Batching only adds latency when requests are sparse (at most max_wait_ms); under load the
+    batch fills before the deadline and one forward pass serves several requests.
+    """
+
+    def __init__(self, run_batch, max_batch=8, max_wait_ms=5.0, name='micro-batcher'):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1.")
+        self.run_batch = run_batch
+        self.max_batch = int(max_batch)
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'batches': 0,
+            'items': 0,
+            'errors': 0,
+            'max_queue_depth': 0,
+            'max_batch_seen': 0,
+            'queue_wait_seconds': 0.0,
+            'run_seconds': 0.0,
+        }
+        self._batch_sizes = {}
+
+    def _ensure_worker(self):
+        # Started on first use so importing or constructing a batcher never starts threads
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def submit(self, item):
+        """
+        Queues item for the next batch. Returns a Future resolving to its result.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats['submitted'] += 1
+            if depth > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = depth
+        return future
+
+    def predict(self, item, timeout=None):
+        """
+        submit(item) and wait for its result.
+        """
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Callers that gave up (cancelled futures) are dropped before the forward pass
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = self.run_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: run_batch returned {len(results)} results for {len(batch)} items.")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                failed = True
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+                failed = False
+            finished = time.perf_counter()
+
+            with self._stats_lock:
+                stats = self._stats
+                stats['batches'] += 1
+                stats['items'] += len(batch)
+                stats['errors'] += int(failed)
+                stats['max_batch_seen'] = max(stats['max_batch_seen'], len(batch))
+                stats['queue_wait_seconds'] += sum(started - queued_at for _, _, queued_at in batch)
+                stats['run_seconds'] += finished - started
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def stats(self):
+        """
+        Queue depth and batching metrics since start-up.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+        batches, items = stats['batches'], stats['items']
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': stats['max_queue_depth'],
+            'submitted': stats['submitted'],
+            'batches': batches,
+            'items': items,
+            'errors': stats['errors'],
+            'mean_batch_size': round(items / batches, 3) if batches else None,
+            'max_batch_seen': stats['max_batch_seen'],
+            'batch_size_histogram': batch_sizes,
+            'mean_queue_wait_ms': round(stats['queue_wait_seconds'] / items * 1000, 3) if items else None,
+            'mean_batch_run_ms': round(stats['run_seconds'] / batches * 1000, 3) if batches else None,
+        }
@@ -0,0 +1,129 @@
+import os
+import json
+import threading
+import numpy as np
+import onnxruntime as ort
+
+from ml_model.inference.micro_batcher import MicroBatcher
+from ml_model.inference.image_preprocess import preprocess_array
+from ml_model.inference.cv_backend import (rank_images, batch_collator, CV_BATCHING_ENABLED, CV_BATCH_MAX_SIZE, CV_BATCH_MAX_WAIT_MS,
+                                           ONNX_MODEL_PATH, ONNX_CLASS_NAMES_KEY)
+
+# onnxruntime backend for image prediction (CV_BACKEND=onnx): same functions as image_predict.py,
+# but only onnxruntime, numpy and Pillow are imported, so web workers never load torch.
+# The model is the ONNX export of the ResNet18 written by ml_model/training/cv_export.py.
+
+# Threads for one forward pass. 0 lets onnxruntime use one per physical core; with several
+# web workers per node, set it to cores / workers so the workers do not oversubscribe the CPU.
+CV_ORT_INTRA_OP_THREADS = int(os.getenv('CV_ORT_INTRA_OP_THREADS', '0'))
+CV_ORT_INTER_OP_THREADS = int(os.getenv('CV_ORT_INTER_OP_THREADS', '1'))
+
+session = None
+input_name = None
+class_names = []
+
+def load_cv_model():
+    """Creates the onnxruntime session and reads the class names from the model metadata."""
+    global session, input_name, class_names
+
+    if not os.path.exists(ONNX_MODEL_PATH):
+        print(f"⚠️ ONNX CV model not found at {ONNX_MODEL_PATH} (run ml_model/training/cv_export.py). Prediction will not work.")
+        session, input_name, class_names = None, None, []
+        return
+    try:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = CV_ORT_INTRA_OP_THREADS
+        options.inter_op_num_threads = CV_ORT_INTER_OP_THREADS
+        loaded = ort.InferenceSession(ONNX_MODEL_PATH, sess_options=options, providers=['CPUExecutionProvider'])
+
+        metadata = loaded.get_modelmeta().custom_metadata_map
+        loaded_class_names = json.loads(metadata.get(ONNX_CLASS_NAMES_KEY, '[]'))
+        if not loaded_class_names:
+            raise ValueError("Class names not found in the ONNX model metadata.")
+
+        session, input_name, class_names = loaded, loaded.get_inputs()[0].name, loaded_class_names
+        print(f"✅ ONNX CV Model loaded from {ONNX_MODEL_PATH} "
+              f"(intra-op threads: {CV_ORT_INTRA_OP_THREADS or 'auto'}). Classes: {class_names}")
+    except Exception as e:
+        print(f"❌ Failed to load ONNX CV model: {e}")
+        session, input_name, class_names = None, None, []
+
+# The model is loaded on first use (or by the background warm-up in Backend/app.py)
+_load_lock = threading.Lock()
+_load_attempted = False
+
+def ensure_cv_model_loaded():
+    """
+    Loads the CV model once per process. Safe to call from concurrent requests.
+    Returns True if the model is available.
+    """
+    global _load_attempted
+    if not _load_attempted:
+        with _load_lock:
+            if not _load_attempted:
+                load_cv_model()
+                _load_attempted = True
+    return session is not None
+
+def is_cv_model_loaded():
+    return session is not None
+
+def preprocess_image(image_bytes, out=None):
+    """
+    Decodes raw image bytes into a (3, 224, 224) float32 array (written into out when given), the
+    numpy equivalent of the training transform (Resize((224, 224)) + ToTensor); see image_preprocess.py.
+    """
+    return preprocess_array(image_bytes, out)
+
+def predict_array_batch(batch):
+    """
+    One forward pass over an (n, 3, 224, 224) float32 batch; one class name per image, in order.
+    """
+    return [class_names[i] for i in session.run(None, {input_name: batch})[0].argmax(axis=1)]
+
+def predict_proba_batch(batch):
+    """
+    One forward pass over an (n, 3, 224, 224) float32 batch; (n_images, n_classes) softmax probabilities.
+    """
+    logits = session.run(None, {input_name: batch})[0]
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+# Each request decodes its own image; the batcher's worker copies them into one reused batch buffer
+_collate = batch_collator(CV_BATCH_MAX_SIZE)
+image_batcher = MicroBatcher(lambda arrays: predict_array_batch(_collate(arrays)), max_batch=CV_BATCH_MAX_SIZE,
+                             max_wait_ms=CV_BATCH_MAX_WAIT_MS, name='cv-batcher')
+
+def predict_top_k_from_images(images, k=5, aggregate=False):
+    """
+    Ranks the k most likely classes for several (filename, image_bytes) in one forward pass;
+    see image_predict.predict_top_k_from_images.
+    """
+    ensure_cv_model_loaded()
+    if session is None or not class_names:
+        raise RuntimeError("CV model not loaded or initialized properly. Cannot make prediction.")
+    return rank_images(images, k, aggregate, preprocess_image, predict_proba_batch, class_names)
+
+def batching_stats():
+    """
+    Micro-batching metrics (queue depth, batch sizes, wait and run times).
+    """
+    return dict(image_batcher.stats(), enabled=CV_BATCHING_ENABLED, model_variant='onnx')
+
+def predict_disease_from_image(image_bytes):
+    """
+    Predicts the disease from raw image bytes using the ONNX CV model.
+    """
+    ensure_cv_model_loaded()
+    if session is None or not class_names:
+        raise RuntimeError("CV model not loaded or initialized properly. Cannot make prediction.")
+
+    try:
+        image = preprocess_image(image_bytes)
+        if CV_BATCHING_ENABLED:
+            return image_batcher.predict(image)
+        return predict_array_batch(image[np.newaxis])[0]
+    except Exception as e:
+        raise ValueError(f"Error during image processing or prediction: {e}")
@@ -0,0 +1,210 @@
+import os
+import sys
+import copy
+import json
+import time
+import torch
+import numpy as np
+from torchvision import datasets
+from torch.utils.data import DataLoader, Subset
+
+# Exports the trained CV model (cv_train.py -> saved-model/cv_model.pth) for CPU serving:
+#   - cv_model.torchscript.pt: traced, frozen and inference-optimized fp32 graph
+#   - cv_model.int8.torchscript.pt: FX graph mode static int8 quantization, calibrated on a
+#     held-out split, then traced and frozen
+#   - cv_model.onnx: ONNX graph with a dynamic batch axis, for the onnxruntime backend
+# and writes saved-model/cv_export_report.json comparing fp32 eager, TorchScript, int8 and
+# (if onnxruntime is installed) ONNX (latency at batch 1 and 8, file size, top-1 accuracy and
+# agreement with fp32 eager).
+# Serve a variant with CV_MODEL_VARIANT=torchscript or CV_MODEL_VARIANT=int8, or the ONNX
+# model without torch with CV_BACKEND=onnx. None of these files are committed; until this script
+# has been run against the current cv_model.pth, the server warns and serves the eager model.
+# Run from the project root: python ml_model/training/cv_export.py
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml_model.inference.image_predict import (MODEL_PATH, MODEL_VARIANT_PATHS, build_eager_model, load_scripted_model,
+                                              make_transform, select_quantized_engine, variant_extra_files)
+from ml_model.inference.cv_backend import ONNX_MODEL_PATH, ONNX_CLASS_NAMES_KEY
+
+DATA_DIR = os.path.join(BASE_DIR, 'data', 'images')
+REPORT_PATH = os.path.join(os.path.dirname(MODEL_PATH), 'cv_export_report.json')
+
+# Share of the dataset set aside (fixed seed): the first half calibrates int8, the second is scored
+HOLDOUT_FRACTION = float(os.getenv('CV_EXPORT_HOLDOUT_FRACTION', '0.2'))
+# Upper bound on calibration images; a few hundred are enough for activation ranges
+CALIBRATION_IMAGES = int(os.getenv('CV_EXPORT_CALIBRATION_IMAGES', '256'))
+SPLIT_SEED = int(os.getenv('CV_EXPORT_SEED', '42'))
+BENCHMARK_RUNS = int(os.getenv('CV_EXPORT_BENCHMARK_RUNS', '30'))
+ONNX_OPSET = int(os.getenv('CV_EXPORT_ONNX_OPSET', '17'))
+
+
+def holdout_split(dataset):
+    """
+    Fixed-seed (calibration, evaluation) subsets of dataset.
+    cv_train.py currently trains on every image, so accuracies below are not a generalization
+    estimate; the deltas between the variants are what this report is for.
+    """
+    order = torch.randperm(len(dataset), generator=torch.Generator().manual_seed(SPLIT_SEED)).tolist()
+    holdout = order[:max(2, int(len(dataset) * HOLDOUT_FRACTION))]
+    half = len(holdout) // 2
+    return Subset(dataset, holdout[:half][:CALIBRATION_IMAGES]), Subset(dataset, holdout[half:])
+
+
+def export_torchscript(eager_model, example, class_names, path=MODEL_VARIANT_PATHS['torchscript']):
+    with torch.no_grad():
+        traced = torch.jit.trace(eager_model, example)
+        frozen = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    torch.jit.save(frozen, path, _extra_files=variant_extra_files(class_names))
+    print(f"✅ TorchScript model saved at {path}")
+    return frozen
+
+
+def export_int8(eager_model, example, calibration_loader, class_names, path=MODEL_VARIANT_PATHS['int8']):
+    """
+    Static post-training quantization: conv/linear weights and activations in int8, with
+    observer ranges from the calibration images (BatchNorm is folded into the convs first).
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    engine = select_quantized_engine()
+    prepared = prepare_fx(copy.deepcopy(eager_model).eval(), get_default_qconfig_mapping(engine),
+                          example_inputs=(example,))
+    with torch.no_grad():
+        for images, _ in calibration_loader:
+            prepared(images)
+        quantized = convert_fx(prepared)
+        frozen = torch.jit.freeze(torch.jit.trace(quantized, example))
+    torch.jit.save(frozen, path, _extra_files=variant_extra_files(class_names))
+    print(f"✅ int8 model ({engine}) saved at {path}")
+    return frozen
+
+
+def export_onnx(eager_model, example, class_names, path=ONNX_MODEL_PATH):
+    """
+    ONNX graph with a dynamic batch axis; the class names go into the model metadata, so
+    onnx_predict.py needs neither torch nor cv_model.pth.
+    """
+    import onnx
+
+    with torch.no_grad():
+        torch.onnx.export(eager_model, example, path, input_names=['input'], output_names=['logits'],
+                          dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}}, opset_version=ONNX_OPSET)
+    onnx_model = onnx.load(path)
+    entry = onnx_model.metadata_props.add()
+    entry.key, entry.value = ONNX_CLASS_NAMES_KEY, json.dumps(class_names)
+    onnx.checker.check_model(onnx_model)
+    onnx.save(onnx_model, path)
+    print(f"✅ ONNX model (opset {ONNX_OPSET}) saved at {path}")
+
+
+class OnnxRunner:
+    """
+    Calls an onnxruntime session like a torch module (tensor in, logits tensor out), so the
+    benchmark and evaluation below treat all variants the same way.
+    """
+
+    def __init__(self, path):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, images):
+        return torch.from_numpy(self.session.run(None, {self.input_name: images.numpy()})[0])
+
+
+def benchmark(model, batch_size, runs=BENCHMARK_RUNS):
+    """
+    Median and p90 forward-pass latency (ms) for a random batch, after warm-up runs
+    (which also let TorchScript finish its profiling passes).
+    """
+    batch = torch.rand(batch_size, 3, 224, 224)
+    timings = []
+    with torch.no_grad():
+        for _ in range(3):
+            model(batch)
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(batch)
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(float(np.median(timings)), 2),
+        "p90_ms": round(float(np.percentile(timings, 90)), 2),
+        "images_per_second": round(batch_size * 1000 / float(np.median(timings)), 1),
+    }
+
+
+def evaluate(model, loader):
+    """
+    Softmax probabilities and labels over loader.
+    """
+    probabilities, labels = [], []
+    with torch.no_grad():
+        for images, targets in loader:
+            probabilities.append(torch.softmax(model(images), dim=1).numpy())
+            labels.append(targets.numpy())
+    return np.concatenate(probabilities), np.concatenate(labels)
+
+
+def export_and_compare():
+    eager_model, class_names = build_eager_model(MODEL_PATH)
+    dataset = datasets.ImageFolder(root=DATA_DIR, transform=make_transform())
+    if dataset.classes != class_names:
+        raise ValueError("Class folders in the dataset do not match the checkpoint's class_names; retrain first.")
+    calibration, evaluation = holdout_split(dataset)
+    print(f"📦 {len(calibration)} calibration and {len(evaluation)} evaluation images")
+    example = torch.rand(1, 3, 224, 224)
+
+    export_torchscript(eager_model, example, class_names)
+    export_int8(eager_model, example, DataLoader(calibration, batch_size=16), class_names)
+    export_onnx(eager_model, example, class_names)
+
+    # Reload from disk, so the report measures exactly what the server will load
+    variants = {
+        "fp32_eager": (eager_model, MODEL_PATH),
+        "torchscript": (load_scripted_model(MODEL_VARIANT_PATHS['torchscript'])[0], MODEL_VARIANT_PATHS['torchscript']),
+        "int8": (load_scripted_model(MODEL_VARIANT_PATHS['int8'])[0], MODEL_VARIANT_PATHS['int8']),
+    }
+    try:
+        variants["onnx"] = (OnnxRunner(ONNX_MODEL_PATH), ONNX_MODEL_PATH)
+    except ImportError:
+        print("⚠️ onnxruntime is not installed; the ONNX model is exported but not benchmarked.")
+    eval_loader = DataLoader(evaluation, batch_size=16)
+    reference = None
+    report = {"torch": torch.__version__, "threads": torch.get_num_threads(),
+              "quantized_engine": torch.backends.quantized.engine,
+              "evaluation_images": len(evaluation), "variants": {}}
+    for name, (variant_model, path) in variants.items():
+        probabilities, labels = evaluate(variant_model, eval_loader)
+        predicted = probabilities.argmax(axis=1)
+        if reference is None:
+            reference = (probabilities, predicted)
+        accuracy = float((predicted == labels).mean())
+        report["variants"][name] = {
+            "file_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+            "batch_1": benchmark(variant_model, 1),
+            "batch_8": benchmark(variant_model, 8),
+            "top1_accuracy": round(accuracy, 4),
+            "accuracy_delta_vs_fp32": round(accuracy - report["variants"].get("fp32_eager", {}).get("top1_accuracy", accuracy), 4),
+            "agreement_with_fp32": round(float((predicted == reference[1]).mean()), 4),
+            "max_abs_probability_diff": round(float(np.abs(probabilities - reference[0]).max()), 5),
+        }
+
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n{'variant':<12} {'MB':>7} {'b1 ms':>8} {'b8 ms':>8} {'top-1':>7} {'Δ acc':>7} {'agree':>7}")
+    for name, row in report["variants"].items():
+        print(f"{name:<12} {row['file_mb']:>7} {row['batch_1']['median_ms']:>8} {row['batch_8']['median_ms']:>8} "
+              f"{row['top1_accuracy']:>7} {row['accuracy_delta_vs_fp32']:>7} {row['agreement_with_fp32']:>7}")
+    print(f"\n✅ Report written to {REPORT_PATH}")
+    return report
+
+
+if __name__ == '__main__':
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"❌ Trained CV model not found at {MODEL_PATH}. Run ml_model/training/cv_train.py first.")
+    export_and_compare()
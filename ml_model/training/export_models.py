@@ -0,0 +1,57 @@
+import os
+import sys
+import pickle
+import traceback
+import joblib
+
+# Define the project root dynamically
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+SAVE_MODEL_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'saved-model')
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from ml_model.inference.forest_engine import CompiledForest, FOREST_DIR_EXTENSION, final_forest, file_sha256
+
+
+def _load_pickled_artifact(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except pickle.UnpicklingError:
+        # Some artifacts (e.g. cancer_scaler.pkl) were written with joblib.dump
+        return joblib.load(path)
+
+
+def export_compiled_forests(save_dir=SAVE_MODEL_DIR):
+    """
+    Writes the flattened node table (raw .npy arrays + manifest.json) of every RandomForest
+    model in save_dir to <model>.forest/, for ml_model/inference/forest_engine.py. The manifest
+    records the .pkl's sha256; the registry ignores the table once the .pkl content changes.
+    Returns the list of written directories.
+    """
+    written = []
+    for filename in sorted(os.listdir(save_dir)):
+        if not filename.endswith('.pkl'):
+            continue
+        pkl_path = os.path.join(save_dir, filename)
+        try:
+            forest = final_forest(_load_pickled_artifact(pkl_path))
+        except Exception:
+            forest = None
+        if forest is None:
+            continue
+        forest_dir = os.path.splitext(pkl_path)[0] + FOREST_DIR_EXTENSION
+        try:
+            CompiledForest.from_sklearn(forest).save(forest_dir, source_sha256=file_sha256(pkl_path))
+            written.append(forest_dir)
+            print(f"✅ Exported {filename} forest -> {os.path.basename(forest_dir)}/")
+        except Exception as e:
+            print(f"❌ Could not export forest from {filename}: {e}")
+            traceback.print_exc()
+    return written
+
+
+if __name__ == '__main__':
+    print(f"Save Model Directory: {SAVE_MODEL_DIR}")
+    export_compiled_forests()
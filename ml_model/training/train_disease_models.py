@@ -641,4 +641,18 @@ except FileNotFoundError:
     print(f"⚠️ Dataset file not found at {CANCER_DATA_PATH}. Skipping training.")
 except Exception as e:
     print(f"❌ Error during training: {e}")
-    traceback.print_exc()
\ No newline at end of file
+    traceback.print_exc()
+
+# --- 8. Export Compiled Forests ---
+# Writes the flattened node arrays of each RandomForest. Backend/utils/model_registry.py opens
+# them memory-mapped, so worker processes share the arrays instead of copying them.
+print("\n--- Exporting compiled forest node tables ---")
+try:
+    import sys
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    from ml_model.training.export_models import export_compiled_forests
+    export_compiled_forests(SAVE_MODEL_DIR)
+except Exception as e:
+    print(f"❌ Error exporting compiled forests: {e}")
+    traceback.print_exc()